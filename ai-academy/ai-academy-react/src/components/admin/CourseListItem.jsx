@@ -3,15 +3,12 @@ import React from 'react';
 import { Link } from 'react-router-dom'; // <-- ADD THIS IMPORT
 
 function CourseListItem({ course, onPublish, onDelete }) {
-  // Calculate lesson count
-  const lessonCount = course.modules.reduce((acc, mod) => acc + (mod.lessons?.length || 0), 0);
-
   return (
     <div className="course-list-item">
       <div className="course-info">
         <p className="course-title">{course.title}</p>
         <p className="course-details">
-          {course.modules?.length || 0} Modules, {lessonCount} Lessons
+          {course.module_count} Modules, {course.lesson_count} Lessons
         </p>
         <p className="course-details">
           Status: <strong className={course.status.toLowerCase()}>{course.status}</strong>
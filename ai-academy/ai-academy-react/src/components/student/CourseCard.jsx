@@ -7,8 +7,11 @@ function CourseCard({ course, onViewCourse }) {
       <h3>{course.title}</h3>
       <p>{course.description || 'A new course awaits.'}</p>
       <div className="course-meta">
-        <span><i className="fas fa-layer-group"></i> {course.modules.length} Modules</span>
+        <span><i className="fas fa-layer-group"></i> {course.module_count} Modules</span>
         <span><i className="fas fa-user"></i> {course.creator_username || 'Admin'}</span>
+        {course.percent_complete > 0 && (
+          <span><i className="fas fa-check-circle"></i> {course.percent_complete}% complete</span>
+        )}
       </div>
     </div>
   );
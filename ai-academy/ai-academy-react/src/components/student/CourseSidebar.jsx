@@ -1,7 +1,7 @@
 // src/components/student/CourseSidebar.jsx
 import React, { useState } from 'react';
 
-function Module({ module, currentItem, onSelectItem, allItems }) {
+function Module({ module, currentItem, onSelectItem, allItems, completedLessons }) {
   const [isOpen, setIsOpen] = useState(true);
 
   // Determine if this module contains the currently viewed item
@@ -51,7 +51,7 @@ function Module({ module, currentItem, onSelectItem, allItems }) {
                     fontSize: '0.9rem'
                   }}
                 >
-                  <i className="fas fa-play-circle" style={{ marginRight: '8px', fontSize: '0.8em', opacity: 0.7 }}></i>
+                  <i className={`fas ${completedLessons.has(lesson.id) ? 'fa-check-circle' : 'fa-play-circle'}`} style={{ marginRight: '8px', fontSize: '0.8em', opacity: 0.7 }}></i>
                   {lesson.title}
                 </a>
               </li>
@@ -91,7 +91,7 @@ function Module({ module, currentItem, onSelectItem, allItems }) {
   );
 }
 
-function CourseSidebar({ course, currentItem, onSelectItem, allItems }) {
+function CourseSidebar({ course, currentItem, onSelectItem, allItems, completedLessons = new Set() }) {
   return (
     <div className="course-sidebar-inner">
       <h3 style={{ marginBottom: '1rem', paddingBottom: '0.5rem', borderBottom: '1px solid var(--border-color)' }}>Course Content</h3>
@@ -103,6 +103,7 @@ function CourseSidebar({ course, currentItem, onSelectItem, allItems }) {
             currentItem={currentItem}
             onSelectItem={onSelectItem}
             allItems={allItems}
+            completedLessons={completedLessons}
           />
         ))}
       </div>
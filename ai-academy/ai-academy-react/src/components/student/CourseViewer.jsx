@@ -1,5 +1,6 @@
 // src/components/student/CourseViewer.jsx
-import React, { useState, useMemo } from 'react';
+import React, { useState, useMemo, useEffect } from 'react';
+import { getCourseProgress, markLessonComplete } from '../../services/api.jsx';
 import CourseSidebar from './CourseSidebar';
 import LessonContent from './LessonContent';
 import StudentQuizView from './StudentQuizView'; // <-- Import new component
@@ -27,6 +28,27 @@ function CourseViewer({ course, onBack }) {
   const [currentIndex, setCurrentIndex] = useState(0);
   const currentItem = allItems[currentIndex];
 
+  // Lesson ids this student has completed, kept on the server
+  const [completedLessons, setCompletedLessons] = useState(new Set());
+
+  useEffect(() => {
+    getCourseProgress(course.id)
+      .then(progress => {
+        const done = Object.entries(progress.lessons)
+          .filter(([, lesson]) => lesson.completed)
+          .map(([lessonId]) => Number(lessonId));
+        setCompletedLessons(new Set(done));
+      })
+      .catch(() => {}); // Progress is a nice-to-have; the course still works without it
+  }, [course.id]);
+
+  const completeCurrentLesson = () => {
+    if (!currentItem || currentItem.type !== 'lesson' || completedLessons.has(currentItem.data.id)) return;
+    const lessonId = currentItem.data.id;
+    setCompletedLessons(prev => new Set(prev).add(lessonId));
+    markLessonComplete(lessonId).catch(() => {});
+  };
+
   if (!currentItem) {
     return (
       <div className="container" style={{padding: '2rem'}}>
@@ -38,6 +60,7 @@ function CourseViewer({ course, onBack }) {
   }
 
   const goToNext = () => {
+    completeCurrentLesson();
     if (currentIndex < allItems.length - 1) {
       setCurrentIndex(currentIndex + 1);
       window.scrollTo(0, 0);
@@ -69,6 +92,7 @@ function CourseViewer({ course, onBack }) {
           currentItem={currentItem}
           onSelectItem={handleSelectItem}
           allItems={allItems} // Pass the flattened list to help map indices
+          completedLessons={completedLessons}
         />
       </aside>
       
@@ -1,28 +1,36 @@
 // src/components/student/StudentQuizView.jsx
 import React, { useState } from 'react';
+import { submitQuiz } from '../../services/api.jsx';
 
 function StudentQuizView({ quiz, onComplete }) {
   const [answers, setAnswers] = useState({}); // { questionId: "selectedOption" }
   const [submitted, setSubmitted] = useState(false);
   const [score, setScore] = useState(0);
+  const [graded, setGraded] = useState({}); // { questionId: true/false }, from the server
+  const [error, setError] = useState('');
 
   const handleOptionChange = (questionId, option) => {
     if (submitted) return;
     setAnswers(prev => ({ ...prev, [questionId]: option }));
   };
 
-  const handleSubmit = (e) => {
+  const handleSubmit = async (e) => {
     e.preventDefault();
-    
-    let correctCount = 0;
-    quiz.questions.forEach(q => {
-      if (answers[q.id] === q.correct_answer) {
-        correctCount++;
-      }
-    });
+    setError('');
 
-    setScore(correctCount);
-    setSubmitted(true);
+    try {
+      // Answers are graded (and recorded) on the server.
+      const attempt = await submitQuiz(quiz.id, answers);
+      // The server only says whether each answer was right, never what the right one is.
+      const results = {};
+      attempt.results.forEach(r => { results[r.question_id] = r.is_correct; });
+
+      setGraded(results);
+      setScore(attempt.score);
+      setSubmitted(true);
+    } catch (err) {
+      setError(`Could not submit your answers: ${err.message}`);
+    }
   };
 
   if (!quiz || !quiz.questions || quiz.questions.length === 0) {
@@ -37,8 +45,8 @@ function StudentQuizView({ quiz, onComplete }) {
 
       <form onSubmit={handleSubmit} className="quiz-form">
         {quiz.questions.map((q, index) => {
-          const isCorrect = submitted && answers[q.id] === q.correct_answer;
-          const isWrong = submitted && answers[q.id] !== q.correct_answer && answers[q.id];
+          const isCorrect = submitted && graded[q.id] === true;
+          const isWrong = submitted && graded[q.id] === false && answers[q.id];
           
           return (
             <div key={q.id} className="quiz-question-card" style={{ 
@@ -62,8 +70,8 @@ function StudentQuizView({ quiz, onComplete }) {
                       disabled={submitted}
                     />
                     <span style={{ 
-                      color: submitted && opt === q.correct_answer ? 'var(--success-color)' : 'inherit',
-                      fontWeight: submitted && opt === q.correct_answer ? 'bold' : 'normal'
+                      color: isCorrect && opt === answers[q.id] ? 'var(--success-color)' : 'inherit',
+                      fontWeight: isCorrect && opt === answers[q.id] ? 'bold' : 'normal'
                     }}>
                       {opt}
                     </span>
@@ -80,6 +88,8 @@ function StudentQuizView({ quiz, onComplete }) {
           );
         })}
 
+        {error && <p style={{ color: 'var(--error-color)' }}>{error}</p>}
+
         {!submitted ? (
           <button type="submit" className="btn btn-primary" style={{ width: '100%', marginTop: '1rem' }}>
             Submit Test
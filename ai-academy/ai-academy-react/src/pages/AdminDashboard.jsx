@@ -1,10 +1,11 @@
 // src/pages/AdminDashboard.jsx
 import React, { useState, useEffect, useCallback } from 'react';
-import { generateCourse, getCourses, deleteCourse, publishCourse } from '../services/api.jsx';
+import { streamCourseGeneration, getCourses, deleteCourse, publishCourse } from '../services/api.jsx';
 import CourseListItem from '../components/admin/CourseListItem.jsx';
 
 function AdminDashboard() {
   const [courses, setCourses] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -24,7 +25,8 @@ function AdminDashboard() {
       setLoading(true);
       setError('');
       const data = await getCourses();
-      setCourses(data);
+      setCourses(data.results);
+      setNextPage(data.next);
     } catch (err) {
       setError(err.message || 'Failed to load courses.');
     } finally {
@@ -36,6 +38,16 @@ function AdminDashboard() {
     loadCourses();
   }, [loadCourses]);
 
+  const loadMoreCourses = async () => {
+    try {
+      const data = await getCourses(nextPage);
+      setCourses(prev => [...prev, ...data.results]);
+      setNextPage(data.next);
+    } catch (err) {
+      setError(err.message || 'Failed to load courses.');
+    }
+  };
+
   const handlePublish = async (courseId) => {
     if (!window.confirm('Are you sure you want to publish this course?')) return;
     try {
@@ -62,14 +74,24 @@ function AdminDashboard() {
     setGenerateStatus('🤖 Generating course... This is a complex task and may take several minutes.');
     
     try {
-      // 👇 --- PASS NEW PARAMS --- 👇
-      await generateCourse(
-        prompt, 
-        numContentModules, 
-        numLessonsPerModule, 
-        numTestModules
+      // Modules are saved as they finish, so show each one as it arrives.
+      await streamCourseGeneration(
+        {
+          prompt,
+          num_content_modules: numContentModules,
+          num_lessons_per_module: numLessonsPerModule,
+          num_test_modules: numTestModules,
+        },
+        (event, data) => {
+          if (event === 'outline') {
+            loadCourses(); // The (draft) course exists from here on
+          } else if (event === 'progress') {
+            setGenerateStatus(`🤖 Generating course... ${data.percent}% (${data.stage})`);
+          } else if (event === 'module' || event === 'quiz') {
+            setGenerateStatus(`🤖 Saved "${data.title}"`);
+          }
+        }
       );
-      // ---------------------------
       
       setGenerateStatus('✅ Course generated successfully!');
       setPrompt('');
@@ -168,6 +190,11 @@ function AdminDashboard() {
                   onDelete={handleDelete}
                 />
               ))}
+              {!loading && nextPage && (
+                <button className="btn btn-secondary" style={{ width: '100%' }} onClick={loadMoreCourses}>
+                  Load more
+                </button>
+              )}
             </div>
           </div>
         </div>
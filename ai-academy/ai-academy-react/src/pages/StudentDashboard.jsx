@@ -1,7 +1,7 @@
 // src/pages/StudentDashboard.jsx
 import React, { useState, useEffect, useCallback } from 'react';
 import { useSearchParams } from 'react-router-dom';
-import { getCourses, getCourseById, generateCourse } from '../services/api.jsx';
+import { getCourses, getCourseById, generateCourse, waitForGenerationJob } from '../services/api.jsx';
 import { useAuth } from '../services/AuthContext.jsx';
 import CourseCard from '../components/student/CourseCard.jsx';
 import CourseViewer from '../components/student/CourseViewer.jsx';
@@ -20,6 +20,7 @@ function StudentDashboard() {
   };
 
   const [allCourses, setAllCourses] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [selectedCourse, setSelectedCourse] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
@@ -37,7 +38,8 @@ function StudentDashboard() {
     setError('');
     try {
       const data = await getCourses();
-      setAllCourses(data);
+      setAllCourses(data.results);
+      setNextPage(data.next);
     } catch (err) {
       setError(err.message || 'Failed to load courses.');
     } finally {
@@ -49,6 +51,22 @@ function StudentDashboard() {
     loadCourses();
   }, [loadCourses]);
 
+  const loadMoreCourses = async () => {
+    try {
+      const data = await getCourses(nextPage);
+      setAllCourses(prev => [...prev, ...data.results]);
+      setNextPage(data.next);
+    } catch (err) {
+      setError(err.message || 'Failed to load courses.');
+    }
+  };
+
+  const loadMoreButton = !loading && nextPage && (
+    <button className="btn btn-secondary" style={{ width: '100%', marginTop: '1rem' }} onClick={loadMoreCourses}>
+      Load more courses
+    </button>
+  );
+
   const handleViewCourse = async (courseId) => {
     setLoading(true);
     setError('');
@@ -73,7 +91,8 @@ function StudentDashboard() {
     e.preventDefault();
     setIsGenerating(true);
     try {
-      await generateCourse(prompt, numModules, 2, 1); 
+      const job = await generateCourse(prompt, numModules, 2, 1);
+      await waitForGenerationJob(job.job_id);
       alert('Course generated successfully!');
       setPrompt('');
       loadCourses(); 
@@ -132,6 +151,7 @@ function StudentDashboard() {
                   )
                 )}
               </div>
+              {loadMoreButton}
             </section>
           )}
 
@@ -214,6 +234,7 @@ function StudentDashboard() {
                   )
                 )}
               </div>
+              {loadMoreButton}
             </section>
           )}
 
@@ -56,7 +56,13 @@ export const registerUser = (username, email, password) => {
 // =====================================================================
 //  COURSES
 // =====================================================================
-export const getCourses = () => apiFetch('/courses/');
+// The catalog is cursor-paginated: { next, previous, results }.
+// Pass the `next` URL of a page to fetch the page after it.
+export const getCourses = (nextUrl = null) => {
+  if (!nextUrl) return apiFetch('/courses/');
+  const cursor = new URL(nextUrl).searchParams.get('cursor');
+  return apiFetch(`/courses/?cursor=${encodeURIComponent(cursor)}`);
+};
 export const getCourseById = (id) => apiFetch(`/courses/${id}/`);
 
 export const publishCourse = (id) => {
@@ -85,6 +91,65 @@ export const generateCourse = (prompt, num_content_modules, num_lessons_per_modu
   });
 };
 
+export const getGenerationJob = (jobId) => apiFetch(`/courses/generate/${jobId}/`);
+
+// Course generation runs in a background worker. Polls the job until it
+// finishes, calling onProgress(job) after every check.
+export const waitForGenerationJob = async (jobId, onProgress, intervalMs = 3000) => {
+  for (;;) {
+    const job = await getGenerationJob(jobId);
+    if (onProgress) onProgress(job);
+    if (job.status === 'SUCCEEDED') return job;
+    if (job.status === 'FAILED') throw new Error(job.error || 'Course generation failed.');
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+  }
+};
+
+// Same generation, streamed over Server-Sent Events. Modules are saved as
+// they finish; onEvent(name, data) is called for every event
+// (outline, lesson_plan, lesson, module, quiz, progress, complete, error).
+// Resolves with the `complete` data, or throws on an `error` event.
+export const streamCourseGeneration = async (payload, onEvent) => {
+  const token = localStorage.getItem('accessToken');
+  const response = await fetch(`${API_BASE_URL}/courses/generate/stream/`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
+      ...(token ? { 'Authorization': `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify(payload),
+  });
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const message = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of message.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      const parsed = data ? JSON.parse(data) : {};
+      if (onEvent) onEvent(event, parsed);
+      if (event === 'error') throw new Error(parsed.error || parsed.detail || 'Course generation failed.');
+      if (event === 'complete') return parsed;
+    }
+  }
+  throw new Error(response.ok ? 'Connection closed before generation finished.' : response.statusText);
+};
+
 // 👇 --- UPDATED TO SUPPORT MODULE TYPE --- 👇
 export const generateModuleForCourse = (courseId, prompt, moduleType = 'CONTENT') => {
   return apiFetch(`/courses/${courseId}/generate-module/`, {
@@ -159,6 +224,22 @@ export const updateQuiz = (quizId, quizData) => {
   });
 };
 
+// --- Student Progress ---
+export const getCourseProgress = (courseId) => apiFetch(`/courses/${courseId}/progress/`);
+
+export const markLessonComplete = (lessonId) => {
+  return apiFetch(`/lessons/${lessonId}/complete/`, { method: 'POST' });
+};
+
+// Quizzes are graded on the server. `answers` is { questionId: "option" };
+// the response has score, total and per-question results.
+export const submitQuiz = (quizId, answers) => {
+  return apiFetch(`/quizzes/${quizId}/submit/`, {
+    method: 'POST',
+    body: JSON.stringify({ answers }),
+  });
+};
+
 // --- Question Functions ---
 export const createQuestion = (quizId, question_text, order, options, correct_answer) => {
   return apiFetch('/questions/', { 
@@ -54,6 +54,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.profiling.ProfilingMiddleware', # Opt-in, see PROFILING
     'whitenoise.middleware.WhiteNoiseMiddleware', # <--- Added for Production Static Files
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -181,4 +182,191 @@ if os.environ.get('CORS_ALLOWED_ORIGINS'):
 CORS_ALLOW_HEADERS = [
     'content-type',
     'authorization',
-]
\ No newline at end of file
+]
+
+
+# ==============================================================================
+#  AI GENERATION PIPELINE
+# ==============================================================================
+
+# Independent pipeline calls (module plans, lesson searches, lesson writes,
+# quizzes) run in a bounded thread pool. Each provider gets its own cap so
+# we stay under its rate limits.
+AI_MAX_WORKERS = int(os.environ.get('AI_MAX_WORKERS', 8))
+
+# A RUNNING generation job whose worker has not reported progress or saved
+# a checkpoint (its heartbeat) for this many seconds is presumed dead and
+# may be resumed from its checkpoints.
+GENERATION_JOB_STALE_AFTER = int(os.environ.get('GENERATION_JOB_STALE_AFTER', 15 * 60))
+
+AI_PROVIDER_CONCURRENCY = {
+    'gemini': int(os.environ.get('GEMINI_CONCURRENCY', 4)),
+    'openai': int(os.environ.get('OPENAI_CONCURRENCY', 4)),
+    'stub': int(os.environ.get('AI_STUB_CONCURRENCY', 16)),
+    'youtube': int(os.environ.get('YOUTUBE_CONCURRENCY', 4)),
+}
+
+# LLM providers (core/providers.py). BACKEND is 'gemini', 'openai' or 'stub'
+# (offline, deterministic; for local runs and load tests). Requests to a
+# provider are spaced to stay under REQUESTS_PER_MINUTE (0 = no limit).
+# GENERATION_CONFIG is sent with every request (Gemini's generation_config,
+# extra arguments to OpenAI's chat.completions.create) and is part of the
+# LLM cache key, so changing it never serves responses made under the old one.
+AI_PROVIDERS = {
+    'gemini': {
+        'BACKEND': 'gemini',
+        'MODEL': os.environ.get('GEMINI_MODEL', 'gemini-2.5-flash'),
+        'REQUESTS_PER_MINUTE': int(os.environ.get('GEMINI_REQUESTS_PER_MINUTE', 0)),
+        'GENERATION_CONFIG': {'temperature': float(os.environ.get('GEMINI_TEMPERATURE', 1.0))},
+    },
+    'openai': {
+        'BACKEND': 'openai',
+        'MODEL': os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'),
+        'REQUESTS_PER_MINUTE': int(os.environ.get('OPENAI_REQUESTS_PER_MINUTE', 0)),
+        'GENERATION_CONFIG': {'temperature': float(os.environ.get('OPENAI_TEMPERATURE', 1.0))},
+    },
+    'stub': {
+        'BACKEND': 'stub',
+        'LATENCY': float(os.environ.get('AI_STUB_LATENCY', 0)),
+        'FIXTURES': os.environ.get('AI_STUB_FIXTURES', ''),
+    },
+}
+
+# Retries and circuit breakers for Gemini, OpenAI and YouTube calls
+# (core/resilience.py). Transient failures are retried up to MAX_ATTEMPTS
+# times with jittered exponential backoff between BASE_DELAY and MAX_DELAY
+# seconds (longer if the provider sends Retry-After). After
+# BREAKER_FAILURES failures in a row a provider is skipped for
+# BREAKER_RESET seconds. TIMEOUT / YOUTUBE_TIMEOUT bound each call.
+AI_RESILIENCE = {
+    'MAX_ATTEMPTS': int(os.environ.get('AI_RETRY_ATTEMPTS', 4)),
+    'BASE_DELAY': float(os.environ.get('AI_RETRY_BASE_DELAY', 1.0)),
+    'MAX_DELAY': float(os.environ.get('AI_RETRY_MAX_DELAY', 30.0)),
+    'BREAKER_FAILURES': int(os.environ.get('AI_BREAKER_FAILURES', 5)),
+    'BREAKER_RESET': float(os.environ.get('AI_BREAKER_RESET', 30.0)),
+    'TIMEOUT': float(os.environ.get('AI_REQUEST_TIMEOUT', 120.0)),
+    'YOUTUBE_TIMEOUT': float(os.environ.get('YOUTUBE_REQUEST_TIMEOUT', 15.0)),
+}
+
+# Provider for every pipeline stage, unless AI_STAGE_PROVIDERS routes the
+# stage elsewhere, e.g. AI_STAGE_PROVIDERS="quiz=openai,lesson_plan=openai".
+# Stages: outline, lesson_plan, lesson, quiz.
+AI_PROVIDER = os.environ.get('AI_PROVIDER', 'gemini')
+AI_STAGE_PROVIDERS = dict(
+    route.split('=', 1) for route in os.environ.get('AI_STAGE_PROVIDERS', '').replace(' ', '').split(',') if '=' in route
+)
+
+# Lessons of a module written per Gemini call. 0 or 1 writes each lesson
+# with its own call; e.g. 3 sends the course framing once for three
+# lessons. Lessons whose batched output is invalid are retried one by one.
+AI_LESSON_BATCH_SIZE = int(os.environ.get('AI_LESSON_BATCH_SIZE', 0))
+
+# Token budget for the lesson context sent with each quiz prompt. Lessons
+# are compacted into per-module summaries that fit it (core/compaction.py).
+AI_QUIZ_CONTEXT_TOKENS = int(os.environ.get('AI_QUIZ_CONTEXT_TOKENS', 6000))
+
+# Persistent cache of raw LLM responses, keyed by (model, prompt, params),
+# where params are the provider's GENERATION_CONFIG. BACKEND is 'db',
+# 'filesystem' or 'none'. Entries expire after TTL seconds and the least
+# recently used are evicted beyond MAX_ENTRIES, checked every EVICT_EVERY
+# writes (so the cache may briefly hold up to that many extra entries).
+LLM_CACHE = {
+    'BACKEND': os.environ.get('LLM_CACHE_BACKEND', 'db'),
+    'LOCATION': os.environ.get('LLM_CACHE_DIR', str(BASE_DIR / 'llm_cache')),
+    'TTL': int(os.environ.get('LLM_CACHE_TTL', 60 * 60 * 24 * 7)),
+    'MAX_ENTRIES': int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 5000)),
+    'EVICT_EVERY': int(os.environ.get('LLM_CACHE_EVICT_EVERY', 100)),
+}
+
+# YouTube search results are cached per normalized query (in the default
+# Django cache) for this many seconds.
+YOUTUBE_SEARCH_CACHE_TTL = int(os.environ.get('YOUTUBE_SEARCH_CACHE_TTL', 60 * 60 * 24))
+
+
+# ==============================================================================
+#  METRICS AND PROFILING
+# ==============================================================================
+
+# Pipeline latency, token and cache metrics are served in the Prometheus
+# format at /metrics (core/metrics.py); generation workers serve their own
+# with `run_generation_worker --metrics-port`. Scrapers must send
+# "Authorization: Bearer <METRICS_TOKEN>"; while it is unset, /metrics
+# answers 403 (outside DEBUG).
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Each generation run is logged as one JSON record by the "core.metrics"
+# logger: per-stage calls and timings, tokens and cache hits. Sampled
+# request profiles (PROFILING, below) go to "core.profiling".
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'message'},
+    },
+    'loggers': {
+        'core.metrics': {
+            'handlers': ['console'],
+            'level': os.environ.get('METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Per-request profiling of the API (core/profiling.py): query count, DB
+# and serializer time, response size and N+1 suspects (a query shape run
+# N_PLUS_ONE_THRESHOLD or more times). Off unless API_PROFILING=True. In
+# DEBUG every response gets X-Profile headers; otherwise SAMPLE_RATE of
+# requests are logged as JSON by the "core.profiling" logger.
+PROFILING = {
+    'ENABLED': os.environ.get('API_PROFILING', 'False') == 'True',
+    'PATH_PREFIX': '/api/',
+    'SAMPLE_RATE': float(os.environ.get('API_PROFILING_SAMPLE_RATE', 0.01)),
+    'N_PLUS_ONE_THRESHOLD': int(os.environ.get('API_PROFILING_N_PLUS_ONE', 3)),
+}
+
+
+# ==============================================================================
+#  STUDENT PROGRESS
+# ==============================================================================
+
+# Lesson watch-time pings are buffered in each process and written in bulk
+# once this many (user, lesson) entries are pending or the oldest is this
+# many seconds old; completions are written at once (see core/progress.py).
+PROGRESS_BUFFER_MAX_ENTRIES = int(os.environ.get('PROGRESS_BUFFER_MAX_ENTRIES', 500))
+PROGRESS_FLUSH_INTERVAL = float(os.environ.get('PROGRESS_FLUSH_INTERVAL', 10))
+
+
+# ==============================================================================
+#  CACHING
+# ==============================================================================
+
+# Single-node deploys can use the in-process 'locmem' cache or a shared
+# 'file' cache, so every worker process sees the same entries.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'django_cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ai-academy',
+        }
+    }
+
+# Serialized course trees (see core/course_cache.py) are kept this long.
+# Edits bump the course's version, so this only bounds memory use.
+COURSE_CACHE_TIMEOUT = int(os.environ.get('COURSE_CACHE_TIMEOUT', 60 * 60 * 24))
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Profile, Course, Module, Lesson, Quiz, Question
+from .models import Profile, Course, Module, Lesson, Quiz, Question, GenerationJob, Attempt, Answer, LessonProgress
 
 # Unregister the old, non-existent models if they were there
 # (This is good practice but optional, the main fix is the new registrations)
@@ -57,4 +57,29 @@ class LessonAdmin(admin.ModelAdmin):
 class QuestionAdmin(admin.ModelAdmin):
     list_display = ('question_text', 'quiz', 'order')
     list_filter = ('quiz',)
-    search_fields = ('question_text',)
\ No newline at end of file
+    search_fields = ('question_text',)
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created_by', 'status', 'stage', 'percent', 'course', 'created_at')
+    list_filter = ('status',)
+    readonly_fields = ('started_at', 'finished_at')
+
+class AnswerInline(admin.TabularInline):
+    model = Answer
+    extra = 0
+    readonly_fields = ('question', 'selected_answer', 'is_correct')
+
+@admin.register(Attempt)
+class AttemptAdmin(admin.ModelAdmin):
+    list_display = ('user', 'quiz', 'score', 'total', 'submitted_at')
+    list_filter = ('quiz',)
+    search_fields = ('user__username', 'quiz__title')
+    inlines = [AnswerInline]
+
+
+@admin.register(LessonProgress)
+class LessonProgressAdmin(admin.ModelAdmin):
+    list_display = ('user', 'lesson', 'seconds_watched', 'completed_at', 'updated_at')
+    list_filter = ('completed_at',)
+    search_fields = ('user__username', 'lesson__title')
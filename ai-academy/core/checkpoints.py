@@ -0,0 +1,99 @@
+import threading
+from concurrent.futures import Future
+
+from django.utils import timezone
+
+from .models import GenerationCheckpoint, GenerationJob
+
+# core/checkpoints.py
+
+# ==============================================================================
+#  GENERATION CHECKPOINTS
+# ==============================================================================
+# Each finished pipeline step of a generation job (outline, a module's
+# lesson plan, a lesson, a quiz) is saved as a GenerationCheckpoint the
+# moment it is done. When a failed or interrupted job runs again, every
+# step that has a checkpoint is restored instead of regenerated, so the
+# job picks up from the last finished lesson.
+
+
+class CheckpointStore:
+    """
+    The checkpoints of one job. All existing ones are loaded with a single
+    query up front; new ones are written one at a time as steps finish
+    (from any pipeline thread).
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._data = {
+            key: data["result"]
+            for key, data in GenerationCheckpoint.objects.filter(job_id=job_id).values_list('key', 'data')
+        }
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def save(self, key, result):
+        with self._lock:
+            if key in self._data:
+                return
+            # Results are wrapped so that None (e.g. a skipped quiz) can be stored too.
+            GenerationCheckpoint.objects.bulk_create(
+                [GenerationCheckpoint(job_id=self.job_id, key=key, data={"result": result})],
+                ignore_conflicts=True,
+            )
+            # A saved step is proof of life; see jobs.resume_job().
+            GenerationJob.objects.filter(pk=self.job_id).update(heartbeat_at=timezone.now())
+            self._data[key] = result
+
+    def scope(self, prefix):
+        return ScopedCheckpoints(self, prefix)
+
+    def clear(self):
+        GenerationCheckpoint.objects.filter(job_id=self.job_id).delete()
+        self._data = {}
+
+
+class ScopedCheckpoints:
+    """A view of a CheckpointStore whose keys are prefixed, e.g. one module's lessons."""
+
+    def __init__(self, store, prefix):
+        self.store = store
+        self.prefix = prefix
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def __contains__(self, key):
+        return self._key(key) in self.store
+
+    def get(self, key):
+        return self.store.get(self._key(key))
+
+    def save(self, key, result):
+        self.store.save(self._key(key), result)
+
+
+def checkpointed(checkpoints, key, fn, *args, **kwargs):
+    """Returns the checkpoint saved under `key`, or runs fn(*args, **kwargs) and saves its result."""
+    if checkpoints is None:
+        return fn(*args, **kwargs)
+    if key in checkpoints:
+        return checkpoints.get(key)
+    result = fn(*args, **kwargs)
+    checkpoints.save(key, result)
+    return result
+
+
+def completed_future(result):
+    future = Future()
+    future.set_result(result)
+    return future
@@ -0,0 +1,161 @@
+import re
+from collections import Counter
+from html.parser import HTMLParser
+
+# core/compaction.py
+
+# ==============================================================================
+#  CONTEXT COMPACTION FOR QUIZ PROMPTS
+# ==============================================================================
+# Quizzes used to be generated from the raw HTML of every lesson, cut off at
+# 25,000 characters, so later modules of a big course were never tested and
+# much of the prompt was markup. Here lessons are reduced to plain text,
+# repeated sentences are dropped, and each module gets an extractive summary
+# sized so the whole course fits in a token budget.
+
+# Rough size of a token for English text; good enough for budgeting.
+CHARS_PER_TOKEN = 4
+# Every lesson may spend at least this much on its overview sentence, even
+# when the module's budget is used up by lesson titles.
+MIN_LESSON_TOKENS = 30
+
+_BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "pre", "code", "h1", "h2", "h3", "h4", "h5", "h6",
+    "table", "tr", "td", "th", "blockquote", "section",
+}
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_WORD = re.compile(r"[a-z0-9][a-z0-9_+#.-]*")
+_STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from has have how if in into is it its
+of on or so such than that the their them then there these they this to was we were what when
+where which while who will with would you your not no also more most other some only just
+""".split())
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        self.parts.append(data)
+
+
+def strip_html(html):
+    """Returns the text of an HTML fragment, one line per block element."""
+    parser = _TextExtractor()
+    parser.feed(html or "")
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def split_sentences(text):
+    sentences = []
+    for line in text.splitlines():
+        sentences.extend(s.strip() for s in _SENTENCE_END.split(line) if s.strip())
+    return sentences
+
+
+def _words(sentence):
+    return [w for w in _WORD.findall(sentence.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+
+def _normalize(sentence):
+    return " ".join(_words(sentence))
+
+
+def summarize_module(module, token_budget, seen=None):
+    """
+    Extractive summary of one generated module ({"title", "lessons"}) that
+    fits in `token_budget`. Sentences already in `seen` (normalized) are
+    skipped, and the sentences this summary keeps are added to it; ones
+    left out for budget can still appear in a later module.
+
+    Every lesson keeps its title and, budget permitting, its opening
+    sentence (the lesson overview). The remaining budget goes to the
+    sentences whose words are most frequent across the module.
+    """
+    if seen is None:
+        seen = set()
+
+    lessons = []
+    # (lesson, sentence) -> normalized key; `seen` only gets the kept ones.
+    keys, candidates = {}, set()
+    for li, lesson in enumerate(module.get("lessons", [])):
+        sentences = []
+        for sentence in split_sentences(strip_html(lesson.get("text_content", ""))):
+            key = _normalize(sentence)
+            if key and key not in seen and key not in candidates:
+                candidates.add(key)
+                keys[(li, len(sentences))] = key
+                sentences.append(sentence)
+        lessons.append((lesson.get("title", ""), sentences))
+
+    frequencies = Counter(w for _, sentences in lessons for s in sentences for w in _words(s))
+
+    def score(sentence):
+        words = _words(sentence)
+        return sum(frequencies[w] for w in words) / (len(words) + 1) if words else 0
+
+    header = f"## Module: {module.get('title', '')}\n"
+    # Titles are always written; whatever they leave (never below zero) is
+    # shared out so each lesson's overview gets at least MIN_LESSON_TOKENS.
+    budget = max(0, token_budget * CHARS_PER_TOKEN - len(header) - sum(len(title) + 5 for title, _ in lessons))
+    per_lesson = max(MIN_LESSON_TOKENS * CHARS_PER_TOKEN, budget // max(1, len(lessons)))
+    chosen = set()
+
+    # Lesson overviews first, so every lesson is represented.
+    for li, (title, sentences) in enumerate(lessons):
+        if sentences and len(sentences[0]) + 1 <= per_lesson:
+            chosen.add((li, 0))
+            budget = max(0, budget - len(sentences[0]) - 1)
+
+    ranked = sorted(
+        ((score(s), li, si) for li, (_, sentences) in enumerate(lessons) for si, s in enumerate(sentences)
+         if (li, si) not in chosen),
+        reverse=True,
+    )
+    for _, li, si in ranked:
+        cost = len(lessons[li][1][si]) + 1
+        if cost <= budget:
+            chosen.add((li, si))
+            budget -= cost
+
+    out = [header]
+    for li, (title, sentences) in enumerate(lessons):
+        out.append(f"### {title}\n")
+        kept = [s for si, s in enumerate(sentences) if (li, si) in chosen]
+        seen.update(keys[(li, si)] for si in range(len(sentences)) if (li, si) in chosen)
+        if kept:
+            out.append(" ".join(kept) + "\n")
+    return "".join(out)
+
+
+def compact_course_content(modules, token_budget):
+    """
+    Compacts generated modules into quiz context of about `token_budget`
+    tokens, split evenly so every module is covered (budget a short module
+    leaves unused goes to the ones after it). Sentences repeated across
+    lessons or modules are kept only once.
+    """
+    seen = set()
+    summaries = []
+    remaining = token_budget
+    for i, module in enumerate(modules):
+        summary = summarize_module(module, max(1, remaining // (len(modules) - i)), seen)
+        remaining = max(0, remaining - estimate_tokens(summary))
+        summaries.append(summary)
+    return "\n".join(summaries)
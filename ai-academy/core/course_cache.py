@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Profile, Course
+from .serializers import CourseDetailSerializer
+
+# core/course_cache.py
+
+# ==============================================================================
+#  SERIALIZED COURSE TREE CACHE
+# ==============================================================================
+# Course detail responses are cached in the default Django cache, keyed by
+# course id, content version and serializer. Any change to a course or
+# anything inside it bumps Course.content_version (see core/signals.py), so
+# stale trees are never served; they simply age out.
+#
+#   course-tree:<id>:v<version>:<variant>  -> serialized tree
+#
+# The version, status and owner are read from the database on every request
+# (one single-row query), never cached: the default cache is per process,
+# so a cached copy would miss edits and (un)publishing done by other web
+# workers or the generation worker. A hot course is served from that query
+# plus one cache read, and the query alone answers a conditional GET.
+
+
+def _tree_key(course_id, version, variant):
+    return f"course-tree:{course_id}:v{version}:{variant}"
+
+
+def get_course_meta(course_id):
+    """
+    Returns the course's current content version, last-modified timestamp,
+    status and creator id, or None if the course does not exist.
+    """
+    row = Course.objects.filter(pk=course_id).values(
+        'content_version', 'updated_at', 'status', 'created_by_id'
+    ).first()
+    if row is None:
+        return None
+    return {
+        "version": row["content_version"],
+        "updated_at": row["updated_at"].timestamp(),
+        "status": row["status"],
+        "created_by_id": row["created_by_id"],
+    }
+
+
+def course_etag(course_id, meta):
+    return f'"course-{course_id}-v{meta["version"]}"'
+
+
+def invalidate_course(course_id):
+    """
+    Bumps the course's content version and updated_at. Called by the model
+    signals; code that writes with bulk_create() or update() must call it itself.
+    """
+    Course.objects.filter(pk=course_id).update(
+        content_version=F('content_version') + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def _is_admin(user):
+    return hasattr(user, 'profile') and user.profile.role == Profile.Role.ADMIN
+
+
+def can_view(user, meta):
+    """Same rule as CourseQuerySet.visible_to(), checked against the course meta."""
+    if meta["status"] == Course.Status.PUBLISHED or meta["created_by_id"] == user.pk:
+        return True
+    return _is_admin(user)
+
+
+def can_edit(user, meta):
+    """Admins and the course's creator get the editor tree, with correct answers."""
+    return meta["created_by_id"] == user.pk or _is_admin(user)
+
+
+def get_course_tree(course_id, meta, serializer_class=CourseDetailSerializer):
+    """
+    Returns the serialized course tree for the version in `meta`, building and
+    caching it on a miss. Callers check can_view() first.
+    """
+    key = _tree_key(course_id, meta["version"], serializer_class.__name__)
+    data = cache.get(key)
+    if data is None:
+        course = Course.objects.with_tree().filter(pk=course_id).first()
+        if course is None:
+            return None
+        data = serializer_class(course).data
+        cache.set(key, data, settings.COURSE_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,165 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import SLOT_WAIT_SECONDS
+
+# core/executor.py
+
+
+def _run_task(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        # Tasks may touch the ORM (e.g. progress updates). Django opens one
+        # connection per thread, so release it before the thread goes idle.
+        connections.close_all()
+
+
+class PipelineExecutor:
+    """
+    Bounded thread pool for the AI generation pipeline.
+
+    Every external provider ("gemini", "youtube", ...) gets its own
+    concurrency cap, so independent calls run in parallel without
+    flooding a single API. Tasks can also be chained with `after()`,
+    which starts a task only once all of its dependencies are done.
+    """
+
+    def __init__(self, max_workers=None, limits=None):
+        if limits is None:
+            limits = settings.AI_PROVIDER_CONCURRENCY
+        self._slots = {
+            provider: threading.BoundedSemaphore(max(1, int(cap)))
+            for provider, cap in limits.items()
+        }
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or settings.AI_MAX_WORKERS,
+            thread_name_prefix="ai-pipeline",
+        )
+
+    @contextmanager
+    def slot(self, provider):
+        """
+        Context manager holding one concurrency slot for `provider`.
+        Providers without a configured cap are not limited. Time spent
+        waiting for the slot is observed in SLOT_WAIT_SECONDS, which shows
+        when a cap (or the pool) is too small.
+        """
+        semaphore = self._slots.get(provider)
+        if semaphore is None:
+            yield
+            return
+        start = time.perf_counter()
+        with semaphore:
+            SLOT_WAIT_SECONDS.observe(time.perf_counter() - start, provider=provider)
+            yield
+
+    def submit(self, fn, *args, **kwargs):
+        # Run in a copy of the caller's context so context variables
+        # (e.g. the LLM cache bypass flag) follow the work into the pool.
+        context = contextvars.copy_context()
+        return self._pool.submit(context.run, _run_task, fn, args, kwargs)
+
+    def after(self, dependencies, fn, *args, **kwargs):
+        """
+        Schedules `fn(results, *args, **kwargs)` once every future in
+        `dependencies` has finished, where `results` is the list of their
+        results in order. If a dependency fails, the returned future fails
+        with the same exception and `fn` is never run.
+
+        No pool thread is ever blocked waiting for a dependency.
+        """
+        dependencies = list(dependencies)
+        # _start() runs in whichever thread finishes the last dependency,
+        # outside any task's context, so keep the caller's context for fn.
+        context = contextvars.copy_context()
+        outer = Future()
+        remaining = [len(dependencies)]
+        lock = threading.Lock()
+
+        def _chain(inner):
+            if inner.cancelled():
+                outer.cancel()
+            elif inner.exception() is not None:
+                outer.set_exception(inner.exception())
+            else:
+                outer.set_result(inner.result())
+
+        def _start():
+            failed = next((d for d in dependencies if d.cancelled() or d.exception() is not None), None)
+            if failed is not None:
+                if failed.cancelled():
+                    outer.cancel()
+                else:
+                    outer.set_exception(failed.exception())
+                return
+            try:
+                inner = context.run(self.submit, fn, [d.result() for d in dependencies], *args, **kwargs)
+            except RuntimeError as e:
+                # The pool was shut down while we were waiting.
+                outer.set_exception(e)
+                return
+            inner.add_done_callback(_chain)
+
+        def _on_done(_):
+            with lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                _start()
+
+        if not dependencies:
+            _start()
+        for dependency in dependencies:
+            dependency.add_done_callback(_on_done)
+        return outer
+
+    def split(self, future, count):
+        """
+        Splits a future whose result is a list into `count` futures, one
+        per item, so batched work can be consumed like individual tasks.
+        If the list does not have exactly `count` items, every part fails
+        with ValueError rather than being left unresolved.
+        """
+        parts = [Future() for _ in range(count)]
+
+        def _done(f):
+            if f.cancelled():
+                for part in parts:
+                    part.cancel()
+                return
+            error = f.exception()
+            if error is None:
+                result = f.result()
+                try:
+                    if len(result) == count:
+                        for part, item in zip(parts, result):
+                            part.set_result(item)
+                        return
+                    error = ValueError(f"Expected {count} results, got {len(result)}")
+                except TypeError as e:
+                    error = ValueError(f"Expected a list of {count} results: {e}")
+            for part in parts:
+                if not part.done():
+                    part.set_exception(error)
+
+        future.add_done_callback(_done)
+        return parts
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # On failure, drop queued work instead of paying for LLM calls
+        # whose results nobody will read.
+        self.shutdown(wait=True, cancel_futures=exc_type is not None)
+        return False
@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Attempt, Answer, Question, Quiz
+
+# core/grading.py
+
+# ==============================================================================
+#  SERVER-SIDE QUIZ GRADING
+# ==============================================================================
+# Each quiz's answer key is loaded with one query into a
+# {question_id: correct_answer} map and kept in the default Django cache,
+# keyed by the course's content version. Grading a submission is then a
+# dictionary lookup per question; recording it is one INSERT for the
+# attempts and one for the answers, however many students or questions
+# there are.
+#
+# The version is read from the database on each submission (one small
+# query) rather than the cache being cleared on edits: the default cache is
+# per process, so a delete in the process that saved a question would leave
+# every other worker grading against the old key. Question edits bump the
+# course version (see core/signals.py), which moves everyone to a new key.
+
+
+def _answer_map_key(quiz_id, version):
+    return f"quiz-answers:{quiz_id}:v{version}"
+
+
+def get_answer_map(quiz_id):
+    """Returns {question_id: correct_answer} for the quiz, in question order."""
+    version = Quiz.objects.filter(pk=quiz_id).values_list('module__course__content_version', flat=True).first()
+    key = _answer_map_key(quiz_id, version)
+    answer_map = cache.get(key)
+    if answer_map is None:
+        answer_map = dict(
+            Question.objects.filter(quiz_id=quiz_id).order_by('order', 'pk').values_list('pk', 'correct_answer')
+        )
+        cache.set(key, answer_map, settings.COURSE_CACHE_TIMEOUT)
+    return answer_map
+
+
+def _normalize_answers(answers):
+    """
+    Accepts {"<question_id>": "option"} or [{"question": id, "answer": "option"}]
+    and returns {question_id: "option"}.
+    """
+    if isinstance(answers, dict):
+        items = answers.items()
+    elif isinstance(answers, list):
+        items = ((a.get("question"), a.get("answer")) for a in answers if isinstance(a, dict))
+    else:
+        raise ValueError("'answers' must be an object or a list.")
+
+    normalized = {}
+    for question_id, selected in items:
+        try:
+            normalized[int(question_id)] = "" if selected is None else str(selected)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid question id: {question_id!r}")
+    return normalized
+
+
+def grade(answer_map, answers):
+    """
+    Grades one submission against an answer map. Questions the student
+    skipped count as wrong; answers to questions not in the quiz are ignored.
+
+    Returns (score, results) where results is a list of
+    (question_id, selected_answer, is_correct), in question order.
+    """
+    answers = _normalize_answers(answers)
+    results = []
+    score = 0
+    for question_id, correct_answer in answer_map.items():
+        selected = answers.get(question_id, "")
+        is_correct = selected == correct_answer
+        score += is_correct
+        results.append((question_id, selected, is_correct))
+    return score, results
+
+
+@transaction.atomic
+def record_attempts(quiz_id, submissions):
+    """
+    Grades and saves many submissions of one quiz, e.g. a classroom import.
+    `submissions` is a list of (user, answers). Returns the saved Attempts
+    with a `results` attribute holding each one's graded answers.
+    """
+    answer_map = get_answer_map(quiz_id)
+
+    attempts = []
+    graded = []
+    for user, answers in submissions:
+        score, results = grade(answer_map, answers)
+        attempts.append(Attempt(user=user, quiz_id=quiz_id, score=score, total=len(answer_map)))
+        graded.append(results)
+
+    Attempt.objects.bulk_create(attempts)
+    Answer.objects.bulk_create([
+        Answer(attempt=attempt, question_id=question_id, selected_answer=selected[:255], is_correct=is_correct)
+        for attempt, results in zip(attempts, graded)
+        for question_id, selected, is_correct in results
+    ])
+
+    for attempt, results in zip(attempts, graded):
+        attempt.results = results
+    return attempts
+
+
+def record_attempt(quiz_id, user, answers):
+    return record_attempts(quiz_id, [(user, answers)])[0]
@@ -0,0 +1,123 @@
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .checkpoints import CheckpointStore
+from .llm_cache import bypass_llm_cache
+from .metrics import generation_run
+from .models import GenerationJob
+from .pipeline import generate_course_content, save_course_pipeline
+
+# core/jobs.py
+
+# ==============================================================================
+#  BACKGROUND COURSE GENERATION JOBS
+# ==============================================================================
+# Jobs live in the GenerationJob table and are processed by
+# `python manage.py run_generation_worker`. No external broker is needed:
+# workers claim jobs with a conditional UPDATE, so any number of them can
+# poll the same table safely. Every finished pipeline step is checkpointed
+# (core/checkpoints.py), so a failed or interrupted job can be put back in
+# the queue with resume_job() and carries on where it stopped.
+
+
+def enqueue_course_generation(user, params):
+    """Records a new PENDING job and returns it. The web request ends here."""
+    return GenerationJob.objects.create(created_by=user, params=params)
+
+
+def claim_next_job():
+    """
+    Atomically moves the oldest PENDING job to RUNNING and returns it,
+    or returns None if the queue is empty.
+    """
+    while True:
+        job = GenerationJob.objects.filter(status=GenerationJob.Status.PENDING).order_by('created_at').first()
+        if job is None:
+            return None
+
+        now = timezone.now()
+        claimed = GenerationJob.objects.filter(pk=job.pk, status=GenerationJob.Status.PENDING).update(
+            status=GenerationJob.Status.RUNNING,
+            stage='starting',
+            started_at=now,
+            heartbeat_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+        # Another worker got there first; try the next one.
+
+
+def resume_job(job):
+    """
+    Puts a FAILED job, or a RUNNING one whose worker has been silent for
+    GENERATION_JOB_STALE_AFTER seconds, back in the queue. Returns False if
+    the job can't be resumed (e.g. it is still running or already done).
+    Silence is measured from the last heartbeat, not the start, so a long
+    job that is still making progress is never run twice.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.GENERATION_JOB_STALE_AFTER)
+    resumed = GenerationJob.objects.filter(
+        Q(status=GenerationJob.Status.FAILED)
+        | Q(status=GenerationJob.Status.RUNNING, heartbeat_at__lt=stale_before)
+        | Q(status=GenerationJob.Status.RUNNING, heartbeat_at__isnull=True, started_at__lt=stale_before),
+        pk=job.pk,
+    ).update(status=GenerationJob.Status.PENDING, stage='queued', error='', finished_at=None)
+    job.refresh_from_db()
+    return bool(resumed)
+
+
+def update_job_progress(job_id, stage, percent):
+    GenerationJob.objects.filter(pk=job_id).update(stage=stage, percent=percent, heartbeat_at=timezone.now())
+
+
+def run_job(job):
+    """Runs the full generation pipeline for a claimed job and records the outcome."""
+    params = job.params
+    try:
+        # Inside the try: a database error loading checkpoints fails the job
+        # instead of leaving it RUNNING.
+        checkpoints = CheckpointStore(job.pk)
+        if len(checkpoints):
+            print(f"✅ Resuming job {job.pk} from {len(checkpoints)} checkpoints...")
+        with generation_run("job", job_id=job.pk, resumed_steps=len(checkpoints)):
+            with bypass_llm_cache() if params.get("bypass_cache") else nullcontext():
+                course_title, generated_modules, intermediate_quizzes, ultimate_quiz = generate_course_content(
+                    params["prompt"],
+                    int(params.get("num_content_modules", 3)),
+                    int(params.get("num_lessons_per_module", 3)),
+                    int(params.get("num_test_modules", 1)),
+                    progress=lambda stage, percent: update_job_progress(job.pk, stage, percent),
+                    checkpoints=checkpoints,
+                )
+
+            print("✅ [5/5] Saving entire course to database...")
+            update_job_progress(job.pk, 'saving', 99)
+            with transaction.atomic():
+                course = save_course_pipeline(course_title, job.created_by, generated_modules, intermediate_quizzes, ultimate_quiz)
+                GenerationJob.objects.filter(pk=job.pk).update(
+                    status=GenerationJob.Status.SUCCEEDED,
+                    stage='complete',
+                    percent=100,
+                    course=course,
+                    finished_at=timezone.now(),
+                )
+                checkpoints.clear()
+        print("🎉 Course generation complete!")
+
+    except Exception as e:
+        traceback.print_exc()
+        GenerationJob.objects.filter(pk=job.pk).update(
+            status=GenerationJob.Status.FAILED,
+            error=str(e),
+            finished_at=timezone.now(),
+        )
+
+    job.refresh_from_db()
+    return job
@@ -0,0 +1,173 @@
+import json
+import re
+
+# core/jsonextract.py
+
+# ==============================================================================
+#  JSON EXTRACTION FROM LLM OUTPUT
+# ==============================================================================
+# Models wrap their JSON in ``` fences, prose, or both, and lesson bodies are
+# full of "{" and "}" inside strings (HTML, code samples). One string-aware
+# scanner finds the first complete top-level JSON object (or, failing that,
+# the first array) and parses it exactly once.
+
+# Characters that can open a JSON value we care about.
+_START = re.compile(r"[\[{]")
+# Characters that matter while scanning a value; everything else is skipped
+# by the regex engine instead of a Python loop.
+_STRUCTURAL = re.compile(r'["\\\[\]{}]')
+_IN_STRING = re.compile(r'["\\]')
+# A bracket followed by a string, object or array: the model's JSON, not prose.
+_JSON_LIKE = re.compile(r'[\[{]\s*["{\[]')
+
+
+def _looks_like_json(text, start):
+    return _JSON_LIKE.match(text, start) is not None
+
+
+def _decode(candidate, text, start):
+    try:
+        return json.loads(candidate)
+    except RecursionError:
+        # Pathologically deep nesting ("[[[[..."); treat it as unparseable.
+        raise json.JSONDecodeError("JSON nested too deeply", doc=text, pos=start) from None
+
+
+def extract_json_from_text(text):
+    """
+    Returns the first JSON object found in `text`, or the first array if
+    there is no object. Raises json.JSONDecodeError if there is neither, or
+    if a value that looks like JSON is malformed or cut off.
+    """
+    if not text or not isinstance(text, str):
+        raise json.JSONDecodeError("Empty or non-string input", doc=str(text), pos=0)
+
+    extractor = StreamingJSONExtractor()
+    extractor.feed(text)
+    return extractor.result()
+
+
+class StreamingJSONExtractor:
+    """
+    Finds the first complete JSON value in output that may arrive in
+    chunks. Each chunk is scanned once, skipping brackets inside string
+    literals; feed() returns True as soon as a value is complete (or known
+    to be malformed), so the caller can stop reading.
+
+        extractor = StreamingJSONExtractor()
+        for chunk in response:
+            if extractor.feed(chunk.text):
+                break
+        data = extractor.result()
+
+    Only top-level candidates are tried. A balanced candidate that isn't
+    valid JSON is skipped as a whole if it is prose ("{the}"), but ends the
+    search with an error if it looks like JSON (a trailing comma, say):
+    retrying at brackets inside it would return a fragment of the answer.
+
+    Every caller wants an object, so an array ("see [1]") doesn't end the
+    search: it is only returned if the output holds no object at all.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0          # next index of self._text to scan
+        self._start = None     # index where the current candidate value begins
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False  # the character at self._pos is escaped
+        self._value = None
+        self._array = None     # first array found, returned if no object follows
+        self._error = None
+        self.done = False
+
+    def feed(self, chunk):
+        """Adds a chunk of output. Returns True once the search is over."""
+        if self.done or not chunk:
+            return self.done
+        self._text += chunk
+        self._scan()
+        return self.done
+
+    def result(self):
+        """
+        Returns the extracted value. Call it once the stream has ended; raises
+        json.JSONDecodeError if there was no valid value.
+        """
+        # An unclosed bracket in prose ("a { b") hides any value after it;
+        # step past it and keep looking. An unclosed JSON value was cut off.
+        while not self.done and self._start is not None:
+            if _looks_like_json(self._text, self._start):
+                raise json.JSONDecodeError("Truncated JSON in response text", doc=self._text, pos=self._start)
+            self._pos = self._start + 1
+            self._start = None
+            self._escaped = False
+            self._scan()
+
+        if self._error is not None:
+            raise self._error
+        if not self.done and self._array is not None:
+            return self._array
+        if not self.done:
+            raise json.JSONDecodeError("Unable to extract JSON from response text", doc=self._text, pos=0)
+        return self._value
+
+    def _scan(self):
+        text = self._text
+        pos = self._pos
+
+        while not self.done:
+            if self._start is None:
+                match = _START.search(text, pos)
+                if match is None:
+                    # Nothing can start in what we have; drop it.
+                    self._text, self._pos = "", 0
+                    return
+                # Forget everything before the candidate.
+                self._text = text = text[match.start():]
+                self._start = pos = 0
+                self._depth = 0
+                self._in_string = False
+
+            if self._escaped:
+                if pos >= len(text):
+                    break
+                self._escaped = False
+                pos += 1
+
+            match = (_IN_STRING if self._in_string else _STRUCTURAL).search(text, pos)
+            if match is None:
+                pos = len(text)
+                break
+
+            ch = match.group()
+            pos = match.end()
+            if ch == "\\":
+                self._escaped = self._in_string
+            elif ch == '"':
+                self._in_string = not self._in_string
+            elif ch in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish(text, pos)
+                    if not self.done:
+                        # Prose such as "{the}", or an array: carry on after it.
+                        self._start = None
+
+        self._pos = pos
+
+    def _finish(self, text, end):
+        try:
+            value = _decode(text[self._start:end], text, self._start)
+        except json.JSONDecodeError as e:
+            if _looks_like_json(text, self._start):
+                self._error = e
+                self.done = True
+            return
+        if isinstance(value, dict):
+            self._value = value
+            self.done = True
+        elif self._array is None:
+            self._array = value
@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LLMResponse
+
+# core/llm_cache.py
+
+# ==============================================================================
+#  LLM RESPONSE CACHE
+# ==============================================================================
+# Responses are keyed by a hash of (model name, prompt text, generation
+# params), so regenerating the same outline, lesson or quiz costs nothing.
+# Configured with settings.LLM_CACHE; BACKEND is "db", "filesystem" or "none".
+# Size limits are enforced every EVICT_EVERY writes, not on each one.
+
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass_llm_cache():
+    """
+    Within this block, cached responses are ignored and every prompt goes to
+    the model. Fresh responses still replace the cached ones. Pipeline worker
+    threads inherit the flag from the thread that started them.
+    """
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def make_cache_key(model_name, prompt_text, params=None):
+    payload = json.dumps(
+        {"model": model_name, "prompt": prompt_text, "params": params or {}},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _EvictionSchedule:
+    """
+    Says when a backend should enforce max_entries: on every `every`-th
+    write, since counting (or scanning) every entry on each write would
+    cost more than the write itself.
+    """
+
+    def __init__(self, every):
+        self.every = max(1, int(every or 1))
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def due(self):
+        with self._lock:
+            self._writes += 1
+            return self._writes % self.every == 0
+
+
+class DatabaseBackend:
+    """Stores entries in the LLMResponse table."""
+
+    def __init__(self, ttl, max_entries, evict_every=1, **kwargs):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._eviction = _EvictionSchedule(evict_every)
+
+    def get(self, key):
+        entry = LLMResponse.objects.filter(key=key).only("pk", "response", "created_at").first()
+        if entry is None:
+            return None
+        now = timezone.now()
+        if self.ttl and entry.created_at < now - timedelta(seconds=self.ttl):
+            entry.delete()
+            return None
+        LLMResponse.objects.filter(pk=entry.pk).update(last_used_at=now, hits=F("hits") + 1)
+        return entry.response
+
+    def set(self, key, model_name, response):
+        LLMResponse.objects.update_or_create(
+            key=key,
+            defaults={
+                "model_name": model_name,
+                "response": response,
+                "created_at": timezone.now(),
+                "last_used_at": timezone.now(),
+            },
+        )
+        self._evict()
+
+    def delete(self, key):
+        LLMResponse.objects.filter(key=key).delete()
+
+    def clear(self):
+        LLMResponse.objects.all().delete()
+
+    def _evict(self):
+        if not self.max_entries or not self._eviction.due():
+            return
+        overflow = LLMResponse.objects.count() - self.max_entries
+        if overflow > 0:
+            stale = LLMResponse.objects.order_by("last_used_at").values_list("pk", flat=True)[:overflow]
+            LLMResponse.objects.filter(pk__in=list(stale)).delete()
+
+
+class FileSystemBackend:
+    """
+    Stores one JSON file per entry under LOCATION. A file's mtime is its
+    last-used time, so LRU eviction only needs a directory scan.
+    """
+
+    def __init__(self, ttl, max_entries, location, evict_every=1, **kwargs):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.location = location
+        self._eviction = _EvictionSchedule(evict_every)
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.location, key[:2], f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.ttl and entry["created_at"] < time.time() - self.ttl:
+            self.delete(key)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["response"]
+
+    def set(self, key, model_name, response):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model_name": model_name, "response": response, "created_at": time.time()}, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        for path, _ in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.location):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        entries.append((path, os.path.getmtime(path)))
+                    except OSError:
+                        pass
+        return entries
+
+    def _evict(self):
+        if not self.max_entries or not self._eviction.due():
+            return
+        with self._lock:
+            entries = self._entries()
+            overflow = len(entries) - self.max_entries
+            if overflow > 0:
+                for path, _ in sorted(entries, key=lambda e: e[1])[:overflow]:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+
+BACKENDS = {
+    "db": DatabaseBackend,
+    "filesystem": FileSystemBackend,
+}
+
+
+class LLMResponseCache:
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, model_name, prompt_text, params=None):
+        """Returns the cached response, or None on a miss (or when bypassed)."""
+        if self.backend is None or _bypass.get():
+            return None
+        response = self.backend.get(make_cache_key(model_name, prompt_text, params))
+        with self._lock:
+            if response is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return response
+
+    def set(self, model_name, prompt_text, response, params=None):
+        if self.backend is not None:
+            self.backend.set(make_cache_key(model_name, prompt_text, params), model_name, response)
+
+    def discard(self, model_name, prompt_text, params=None):
+        """Drops an entry, e.g. when the cached response turned out to be unusable."""
+        if self.backend is not None:
+            self.backend.delete(make_cache_key(model_name, prompt_text, params))
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Returns the process-wide cache, built from settings.LLM_CACHE on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = settings.LLM_CACHE
+                backend_cls = BACKENDS.get(config.get("BACKEND"))
+                backend = None
+                if backend_cls is not None:
+                    backend = backend_cls(
+                        ttl=config.get("TTL"),
+                        max_entries=config.get("MAX_ENTRIES"),
+                        location=config.get("LOCATION"),
+                        evict_every=config.get("EVICT_EVERY", 1),
+                    )
+                _cache = LLMResponseCache(backend)
+    return _cache
@@ -0,0 +1,327 @@
+import os
+import json
+import logging
+import itertools
+import time
+import threading
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, redirect_stdout
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from core.models import Course, Module, Profile
+from core.pipeline import CourseGraphWriter
+from core.profiling import profile
+
+# Scale and load of a run; baselines are only compared at the same scale.
+SCALE_OPTIONS = ("courses", "modules", "lessons", "questions")
+PASSWORD = "benchmark-password"
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, "benchmarks", "api_baseline.json")
+# Timings below this many ms apart are noise, whatever the tolerance says.
+MIN_SLACK_MS = 2.0
+
+
+# --- Synthetic data ---
+def seed_data(courses, modules, lessons, questions):
+    """
+    Creates an admin, a student, and `courses` published courses of
+    `modules` content modules x `lessons` lessons plus a final test of
+    `questions` questions. Returns the ids the scenarios need.
+    """
+    admin = User.objects.create_user(username="bench-admin", password=PASSWORD)
+    Profile.objects.create(user=admin, role=Profile.Role.ADMIN)
+    student = User.objects.create_user(username="bench-student", password=PASSWORD)
+    Profile.objects.create(user=student, role=Profile.Role.STUDENT)
+
+    course_ids = []
+    for c in range(courses):
+        course = Course.objects.create(title=f"Benchmark Course {c + 1}", created_by=admin, status=Course.Status.PUBLISHED)
+        writer = CourseGraphWriter(course)
+        for m in range(modules):
+            writer.add_content_module(f"Module {m + 1}", [
+                {"title": f"Lesson {m + 1}.{l + 1}", "text_content": f"<p>Lesson {m + 1}.{l + 1} of course {c + 1}.</p>" * 20}
+                for l in range(lessons)
+            ])
+        writer.add_assessment_module("Final Test", {"questions": [
+            {"question_text": f"Question {q + 1}?", "options": ["A", "B", "C", "D"], "correct_answer": "A"}
+            for q in range(questions)
+        ]})
+        writer.save()
+        course_ids.append(course.pk)
+
+    module_ids = list(Module.objects.filter(
+        course_id__in=course_ids, module_type=Module.ModuleType.CONTENT
+    ).values_list('pk', flat=True))
+    return {"admin": admin, "student": student, "course_ids": course_ids, "module_ids": module_ids}
+
+
+# --- Clients ---
+class BenchmarkClient:
+    """An API client that times every request and counts its queries."""
+
+    def __init__(self, username=None):
+        # Server errors are counted, not raised, like a real client would see them.
+        self.client = APIClient(raise_request_exception=False)
+        self.samples = []   # (ms, queries, ok)
+        if username:
+            response = self.client.post("/api/token/", {"username": username, "password": PASSWORD}, format="json")
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def request(self, method, url, data=None):
+        with profile() as request_profile:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(url, data, format="json")
+            if response.streaming:
+                b"".join(response.streaming_content)
+            ms = (time.perf_counter() - start) * 1000
+        self.samples.append((ms, request_profile.query_count, response.status_code < 400))
+        return response
+
+
+def stub_search_youtube(query, max_results=20):
+    return [
+        {"video_id": f"{abs(hash(query)) % 10 ** 8}-{i}", "title": query, "description": "", "channelTitle": "Stub"}
+        for i in range(3)
+    ]
+
+
+# --- Scenarios ---
+# Each takes (client, seed, i) and makes one or more requests. `slow`
+# scenarios (password hashing, generation) run --slow-requests times
+# instead of --requests.
+def course_list(client, seed, i):
+    client.request("get", "/api/courses/")
+
+
+def course_detail(client, seed, i):
+    client.request("get", f"/api/courses/{seed['course_ids'][i % len(seed['course_ids'])]}/")
+
+
+def lesson_crud(client, seed, i):
+    module_id = seed["module_ids"][i % len(seed["module_ids"])]
+    created = client.request("post", "/api/lessons/", {
+        "module": module_id, "title": f"Benchmark lesson {i}", "content": "<p>Body</p>", "order": 100 + i,
+    })
+    if created.status_code == 201:
+        lesson_id = created.data["id"]
+        client.request("get", f"/api/lessons/{lesson_id}/")
+        client.request("patch", f"/api/lessons/{lesson_id}/", {"title": f"Benchmark lesson {i} (edited)"})
+        client.request("delete", f"/api/lessons/{lesson_id}/")
+
+
+_usernames = itertools.count(1)
+
+
+def register(client, seed, i):
+    client.request("post", "/api/register/", {
+        "username": f"bench-user-{next(_usernames)}", "email": "", "password": PASSWORD,
+    })
+
+
+def token(client, seed, i):
+    client.request("post", "/api/token/", {"username": "bench-student", "password": PASSWORD})
+
+
+def generate_job(client, seed, i):
+    client.request("post", "/api/courses/generate/", {"prompt": f"Benchmark topic {i}"})
+
+
+def generate_module(client, seed, i):
+    course_id = seed["course_ids"][i % len(seed["course_ids"])]
+    client.request("post", f"/api/courses/{course_id}/generate-module/", {"prompt": f"Extra module {i}", "num_lessons": 3})
+
+
+def generate_stream(client, seed, i):
+    client.request("post", "/api/courses/generate/stream/", {
+        "prompt": f"Streamed topic {i}", "num_content_modules": 2, "num_lessons_per_module": 2, "num_test_modules": 1,
+    })
+
+
+# name -> (scenario, user it runs as, slow)
+SCENARIOS = {
+    "course_list": (course_list, "bench-student", False),
+    "course_detail": (course_detail, "bench-student", False),
+    "lesson_crud": (lesson_crud, "bench-admin", False),
+    "register": (register, None, True),
+    "token": (token, None, True),
+    "generate_job": (generate_job, "bench-admin", False),
+    "generate_module": (generate_module, "bench-admin", True),
+    "generate_stream": (generate_stream, "bench-admin", True),
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(name, seed, clients, requests):
+    """Runs `requests` iterations of a scenario over `clients` threads, each with its own client."""
+    scenario, username, _ = SCENARIOS[name]
+    local = threading.local()
+    all_clients = []
+    lock = threading.Lock()
+
+    def _iteration(i):
+        if not hasattr(local, "client"):
+            local.client = BenchmarkClient(username)
+            with lock:
+                all_clients.append(local.client)
+            local.client.samples.clear()   # the token request made while logging in
+        scenario(local.client, seed, i)
+
+    with ThreadPoolExecutor(max_workers=clients, thread_name_prefix="bench") as pool:
+        # Log every client in before the clock starts.
+        list(pool.map(_iteration, range(min(clients, requests))))
+        for client in all_clients:
+            client.samples.clear()
+        start = time.perf_counter()
+        list(pool.map(_iteration, range(requests)))
+        elapsed = time.perf_counter() - start
+
+    samples = [sample for client in all_clients for sample in client.samples]
+    latencies = sorted(ms for ms, _, _ in samples)
+    queries = [q for _, q, _ in samples]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, ok in samples if not ok),
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_queries": round(statistics.mean(queries), 1) if queries else 0,
+        "max_queries": max(queries, default=0),
+    }
+
+
+def run_benchmark(seed, scenarios, clients, requests, slow_requests, stub_latency=0.0):
+    """
+    Runs each scenario in turn. Generation goes through the offline stub
+    provider and a stub YouTube search, so no API keys or network are used.
+    """
+    stub = {**settings.AI_PROVIDERS, "stub": {"BACKEND": "stub", "LATENCY": stub_latency}}
+    results = {}
+    with override_settings(AI_PROVIDERS=stub, AI_PROVIDER="stub", AI_STAGE_PROVIDERS={}), \
+            mock.patch("core.pipeline.search_youtube", stub_search_youtube):
+        for name in scenarios:
+            slow = SCENARIOS[name][2]
+            results[name] = run_scenario(name, seed, clients, slow_requests if slow else requests)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions against a baseline: p95 latency more than `tolerance` over
+    it, more queries per request, or more errors.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        allowed_p95 = max(base["p95_ms"] * (1 + tolerance), base["p95_ms"] + MIN_SLACK_MS)
+        if result["p95_ms"] > allowed_p95:
+            regressions.append(f"{name}: p95 {result['p95_ms']} ms > {allowed_p95:.2f} ms (baseline {base['p95_ms']} ms)")
+        if result["max_queries"] > base["max_queries"]:
+            regressions.append(f"{name}: {result['max_queries']} queries per request > baseline {base['max_queries']}")
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: {result['errors']} errors > baseline {base['errors']}")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = ("Load-tests the API against a throwaway database of synthetic courses and reports "
+            "throughput, latency percentiles and query counts, compared with a saved baseline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=50)
+        parser.add_argument('--modules', type=int, default=5, help="Content modules per course.")
+        parser.add_argument('--lessons', type=int, default=4, help="Lessons per module.")
+        parser.add_argument('--questions', type=int, default=10, help="Questions in each course's final test.")
+        parser.add_argument('--clients', type=int, default=8, help="Concurrent clients.")
+        parser.add_argument('--requests', type=int, default=200, help="Iterations per scenario.")
+        parser.add_argument('--slow-requests', type=int, default=20,
+                            help="Iterations for registration, token and generation scenarios.")
+        parser.add_argument('--stub-latency', type=float, default=0.0, help="Seconds the stub LLM takes per call.")
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), dest='scenarios',
+                            help="Run only this scenario (repeatable).")
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON file.")
+        parser.add_argument('--save-baseline', action='store_true', help="Save this run as the baseline.")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Allowed p95 slowdown against the baseline, as a fraction.")
+
+    def handle(self, *args, **options):
+        scale = {key: options[key] for key in SCALE_OPTIONS}
+        scenarios = options['scenarios'] or list(SCENARIOS)
+
+        # A throwaway test database, so the real one is never touched. SQLite's
+        # in-memory test database fails concurrent writes outright, so on
+        # SQLite it is a temporary file instead, where writers wait their turn.
+        setup_test_environment()
+        tmp = tempfile.TemporaryDirectory()
+        if connection.vendor == "sqlite":
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tmp.name, "benchmark.sqlite3")
+            connection.settings_dict["OPTIONS"].update({
+                "transaction_mode": "IMMEDIATE",
+                "timeout": 30,
+                "init_command": "PRAGMA journal_mode=WAL;",
+            })
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(override_settings(DEBUG=False))
+                if options['verbosity'] < 2:
+                    # The pipeline's progress prints and run logs would bury the report.
+                    stack.enter_context(redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+                    logging.disable(logging.INFO)
+                    stack.callback(logging.disable, logging.NOTSET)
+                start = time.perf_counter()
+                seed = seed_data(**scale)
+                self.stdout.write(f"Seeded {scale['courses']} courses x {scale['modules']} modules x "
+                                  f"{scale['lessons']} lessons x {scale['questions']} questions "
+                                  f"in {time.perf_counter() - start:.1f}s.")
+                results = run_benchmark(seed, scenarios, options['clients'], options['requests'],
+                                        options['slow_requests'], options['stub_latency'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            tmp.cleanup()
+
+        self.stdout.write(f"\n{'scenario':<16} {'reqs':>6} {'errors':>6} {'req/s':>8} "
+                          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>9}")
+        for name, r in results.items():
+            self.stdout.write(f"{name:<16} {r['requests']:>6} {r['errors']:>6} {r['rps']:>8} {r['p50_ms']:>8} "
+                              f"{r['p95_ms']:>8} {r['p99_ms']:>8} {r['mean_queries']:>5}/{r['max_queries']:<3}")
+
+        run = {"scale": scale, "clients": options['clients'], "scenarios": results}
+        baseline_path = options['baseline']
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+            with open(baseline_path, "w", encoding="utf-8") as f:
+                json.dump(run, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\nSaved baseline to {baseline_path}."))
+            return
+
+        if not os.path.exists(baseline_path):
+            self.stdout.write(f"\nNo baseline at {baseline_path}; run with --save-baseline to create one.")
+            return
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != scale or baseline.get("clients") != options['clients']:
+            self.stdout.write(self.style.WARNING("\nBaseline was recorded at a different scale; not compared."))
+            return
+
+        regressions = compare(results, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError("Performance regressions against the baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("\nNo regressions against the baseline."))
@@ -0,0 +1,103 @@
+import re
+import json
+import time
+import statistics
+
+from django.core.management.base import BaseCommand
+
+from core.jsonextract import StreamingJSONExtractor, extract_json_from_text
+
+
+def legacy_extract_json_from_text(text):
+    """The previous extractor: regex fence strip, json.loads, then a string-unaware brace scan."""
+    cleaned = text.strip()
+    cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned, flags=re.IGNORECASE)
+    cleaned = re.sub(r"\s*```$", "", cleaned, flags=re.IGNORECASE)
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        pass
+
+    depth = 0
+    start_idx = None
+    for i, ch in enumerate(cleaned):
+        if ch == "{":
+            if start_idx is None:
+                start_idx = i
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                return json.loads(cleaned[start_idx:i + 1])
+    raise json.JSONDecodeError("Unable to extract JSON from response text", doc=cleaned, pos=0)
+
+
+def make_lesson_response(size_kb, wrapped):
+    """A lesson response like generate_deep_lesson_content() gets: HTML and code full of braces."""
+    section = (
+        "<h2>Dictionaries</h2><p>A dict literal looks like {\"key\": \"value\"} and sets use {1, 2}.</p>"
+        "<pre><code>def merge(a, b):\n    return {**a, **b}  # \"quoted\" {braces}\n</code></pre>"
+        "<p>Escapes such as \\\\ and \\\" must not confuse the scanner.</p>"
+    )
+    html = ""
+    while len(html) < size_kb * 1024:
+        html += section
+    payload = json.dumps({"text_content": html, "video_id": "dQw4w9WgXcQ"})
+    if wrapped:
+        return f"Sure! Here is the lesson {{as requested}}:\n```json\n{payload}\n```\nLet me know if you need {{more}}."
+    return f"```json\n{payload}\n```"
+
+
+class Command(BaseCommand):
+    help = "Benchmarks JSON extraction from large LLM lesson responses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-kb', type=int, default=25, help="Approximate size of each response.")
+        parser.add_argument('--runs', type=int, default=50, help="Timed runs per case.")
+        parser.add_argument('--chunk-size', type=int, default=256, help="Chunk size for the streaming extractor.")
+
+    def time_it(self, fn, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+        chunk_size = options['chunk_size']
+
+        def streaming(text):
+            extractor = StreamingJSONExtractor()
+            for i in range(0, len(text), chunk_size):
+                if extractor.feed(text[i:i + chunk_size]):
+                    break
+            return extractor.result()
+
+        extractors = [
+            ("legacy", legacy_extract_json_from_text),
+            ("extract_json_from_text", extract_json_from_text),
+            (f"streaming ({chunk_size}B chunks)", streaming),
+        ]
+
+        for label, wrapped in (("fenced JSON", False), ("JSON inside prose", True)):
+            text = make_lesson_response(options['size_kb'], wrapped)
+            expected = extract_json_from_text(text)
+            self.stdout.write(f"\n{label}: {len(text) / 1024:.1f} KB, median of {runs} runs")
+
+            for name, fn in extractors:
+                try:
+                    correct = fn(text) == expected
+                except json.JSONDecodeError:
+                    correct = False
+                ms = self.time_it(lambda: _swallow(fn, text), runs)
+                status = "ok" if correct else "WRONG RESULT"
+                self.stdout.write(f"  {name:<32} {ms:8.3f} ms  {status}")
+
+
+def _swallow(fn, text):
+    try:
+        fn(text)
+    except json.JSONDecodeError:
+        pass
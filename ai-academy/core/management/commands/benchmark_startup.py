@@ -0,0 +1,69 @@
+import os
+import sys
+import statistics
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Modules a worker loads to serve the API: settings, apps, and every view.
+STARTUP_CODE = (
+    "import django; django.setup(); import {module}; {extra}"
+    "import resource; print('maxrss', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+)
+# Imported by the generation pipeline only when it first calls a provider.
+PROVIDER_MODULES = ("google.generativeai", "googleapiclient", "grpc")
+
+
+def measure_startup(module="core.urls", extra=""):
+    """
+    Imports `module` in a fresh interpreter under `python -X importtime`.
+    Returns {"imports": {name: cumulative_us}, "total_us": ..., "maxrss_kb": ...}.
+    """
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "backend.settings")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_CODE.format(module=module, extra=extra)],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+
+    imports = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = int(cumulative)
+        if not name.startswith("  "):
+            total += int(cumulative)   # top-level import; nested ones are inside it
+
+    maxrss = next((int(l.split()[1]) for l in result.stdout.splitlines() if l.startswith("maxrss")), 0)
+    return {"imports": imports, "total_us": total, "maxrss_kb": maxrss}
+
+
+def provider_imports(imports):
+    return sorted(name for name in imports if name.startswith(PROVIDER_MODULES))
+
+
+class Command(BaseCommand):
+    help = "Measures worker start-up import time and memory, with and without the AI provider libraries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per case.")
+        parser.add_argument('--top', type=int, default=10, help="Slowest imports to list.")
+
+    def handle(self, *args, **options):
+        cases = [
+            ("API startup (providers lazy)", ""),
+            ("API startup + provider clients", "from core.providers import get_genai; get_genai(); import googleapiclient.discovery; "),
+        ]
+        for label, extra in cases:
+            runs = [measure_startup(extra=extra) for _ in range(options['runs'])]
+            total_ms = statistics.median(r["total_us"] for r in runs) / 1000
+            maxrss_mb = statistics.median(r["maxrss_kb"] for r in runs) / 1024
+            self.stdout.write(f"\n{label}: imports {total_ms:.0f} ms, max RSS {maxrss_mb:.1f} MB "
+                              f"(median of {options['runs']})")
+
+            slowest = sorted(runs[-1]["imports"].items(), key=lambda item: -item[1])[:options['top']]
+            for name, cumulative in slowest:
+                self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {name}")
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import metrics
+from core.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Processes queued AI course generation jobs. Run one or more of these next to the web server."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help="Seconds to wait between checks when the queue is empty.",
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Process every pending job, then exit instead of polling.",
+        )
+        parser.add_argument(
+            '--metrics-port',
+            type=int,
+            default=0,
+            help="Serve this worker's pipeline metrics for Prometheus on this port (0 = off).",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Generation worker started.")
+        if options['metrics_port']:
+            metrics.serve(options['metrics_port'])
+            self.stdout.write(f"Serving metrics on port {options['metrics_port']}.")
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Running job {job.pk}: {job.params.get('prompt')}")
+            job = run_job(job)
+            self.stdout.write(f"Job {job.pk} finished with status {job.status}.")
@@ -0,0 +1,309 @@
+import json
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import resilience
+
+# core/metrics.py
+
+# ==============================================================================
+#  GENERATION PIPELINE METRICS
+# ==============================================================================
+# Every timed step of the pipeline is observed in process-wide histograms
+# and counters, rendered in the Prometheus text format by render() (served
+# at /metrics, and by `run_generation_worker --metrics-port` for workers):
+#
+#   ai_academy_generation_call_seconds{stage}    one provider call / DB save
+#   ai_academy_generation_stage_seconds{stage}   wall-clock time of a stage in one run
+#   ai_academy_generation_run_seconds{kind,status}
+#   ai_academy_slot_wait_seconds{provider}       time spent waiting for a concurrency slot
+#   ai_academy_llm_tokens_total{provider,type}
+#   ai_academy_cache_requests_total{cache,result}
+#   ai_academy_provider_events_total{provider,event}  (core/resilience.py)
+#
+# Stages: outline, lesson_plan, youtube, lesson, quiz, db_save. Inside a
+# generation_run() block the same observations are also collected per run
+# and logged as one JSON record (logger "core.metrics") when it ends.
+
+STAGES = ("outline", "lesson_plan", "youtube", "lesson", "quiz", "db_save")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(tuple(labels[name] for name in self.labelnames), 0)
+
+    def collect(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (non-cumulative, last is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        entry = self._values.get(tuple(labels[name] for name in self.labelnames))
+        return sum(entry[0]) if entry else 0
+
+    def collect(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+CALL_SECONDS = Histogram(
+    "ai_academy_generation_call_seconds", "Latency of single generation pipeline calls.", ("stage",))
+STAGE_SECONDS = Histogram(
+    "ai_academy_generation_stage_seconds", "Wall-clock time of each pipeline stage within one run.", ("stage",))
+RUN_SECONDS = Histogram(
+    "ai_academy_generation_run_seconds", "Duration of whole generation runs.", ("kind", "status"),
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600))
+SLOT_WAIT_SECONDS = Histogram(
+    "ai_academy_slot_wait_seconds", "Time pipeline calls waited for a provider concurrency slot.", ("provider",))
+TOKENS = Counter("ai_academy_llm_tokens_total", "LLM tokens used, by provider.", ("provider", "type"))
+CACHE_REQUESTS = Counter(
+    "ai_academy_cache_requests_total", "LLM response and YouTube search cache lookups.", ("cache", "result"))
+
+REGISTRY = [CALL_SECONDS, STAGE_SECONDS, RUN_SECONDS, SLOT_WAIT_SECONDS, TOKENS, CACHE_REQUESTS]
+
+
+# --- Per-run collection ---
+class GenerationRun:
+    """The calls, tokens and cache lookups of one generation run. Thread-safe."""
+
+    def __init__(self, kind, **fields):
+        self.kind = kind
+        self.fields = fields
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.cache = {}
+        self._lock = threading.Lock()
+
+    def add_call(self, stage, start, end):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"calls": 0, "seconds": 0.0, "max": 0.0, "first": start, "last": end})
+            entry["calls"] += 1
+            entry["seconds"] += end - start
+            entry["max"] = max(entry["max"], end - start)
+            entry["first"] = min(entry["first"], start)
+            entry["last"] = max(entry["last"], end)
+
+    def add_tokens(self, prompt, completion):
+        with self._lock:
+            self.tokens["prompt"] += prompt
+            self.tokens["completion"] += completion
+
+    def add_cache_lookup(self, cache, hit):
+        with self._lock:
+            entry = self.cache.setdefault(cache, {"hits": 0, "misses": 0})
+            entry["hits" if hit else "misses"] += 1
+
+    def stage_wall_seconds(self):
+        """Per stage, the time from its first call starting to its last call ending."""
+        with self._lock:
+            return {stage: entry["last"] - entry["first"] for stage, entry in self.stages.items()}
+
+    def record(self, status, seconds):
+        with self._lock:
+            stages = {
+                stage: {
+                    "calls": entry["calls"],
+                    "wall_seconds": round(entry["last"] - entry["first"], 3),
+                    "call_seconds": round(entry["seconds"], 3),
+                    "max_call_seconds": round(entry["max"], 3),
+                }
+                for stage, entry in self.stages.items()
+            }
+            return {
+                "event": "generation_run",
+                "kind": self.kind,
+                **self.fields,
+                "status": status,
+                "seconds": round(seconds, 3),
+                "stages": stages,
+                "tokens": dict(self.tokens),
+                "cache": {name: dict(entry) for name, entry in self.cache.items()},
+            }
+
+
+_current_run = contextvars.ContextVar("generation_run", default=None)
+
+
+def current_run():
+    return _current_run.get()
+
+
+@contextmanager
+def generation_run(kind, **fields):
+    """
+    Collects the metrics of everything run inside the block (including work
+    handed to a PipelineExecutor, which copies the context) into one
+    GenerationRun, then observes its stage and run durations and logs it.
+    """
+    run = GenerationRun(kind, **fields)
+    token = _current_run.set(run)
+    status = "succeeded"
+    try:
+        yield run
+    except BaseException:
+        status = "failed"
+        raise
+    finally:
+        _current_run.reset(token)
+        seconds = time.perf_counter() - run.started
+        for stage, wall in run.stage_wall_seconds().items():
+            STAGE_SECONDS.observe(wall, stage=stage)
+        RUN_SECONDS.observe(seconds, kind=kind, status=status)
+        logger.info(json.dumps(run.record(status, seconds), default=str))
+
+
+# --- Recording helpers used by the pipeline ---
+def observe_call(stage, start, end):
+    CALL_SECONDS.observe(end - start, stage=stage)
+    run = _current_run.get()
+    if run is not None:
+        run.add_call(stage, start, end)
+
+
+@contextmanager
+def timed(stage):
+    """Times the block as one `stage` call, whether or not it succeeds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_call(stage, start, time.perf_counter())
+
+
+def record_tokens(provider, prompt, completion):
+    TOKENS.inc(prompt, provider=provider, type="prompt")
+    TOKENS.inc(completion, provider=provider, type="completion")
+    run = _current_run.get()
+    if run is not None:
+        run.add_tokens(prompt, completion)
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+    run = _current_run.get()
+    if run is not None:
+        run.add_cache_lookup(cache, hit)
+
+
+# --- Exposition ---
+def _resilience_lines():
+    name = "ai_academy_provider_events_total"
+    lines = [f"# HELP {name} Provider calls, retries, failures and circuit breaker rejections.",
+             f"# TYPE {name} counter"]
+    for (provider, event), value in sorted(resilience.snapshot().items()):
+        lines.append(f"{name}{_labels(('provider', 'event'), (provider, event))} {value}")
+    return lines
+
+
+def render():
+    """All metrics of this process in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    lines.extend(_resilience_lines())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def reset():
+    for metric in REGISTRY:
+        metric.clear()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, address=""):
+    """Serves render() over HTTP from a daemon thread, for processes without a web server (workers)."""
+    server = ThreadingHTTPServer((address, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
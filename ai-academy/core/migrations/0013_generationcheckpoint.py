@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('data', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='core.generationjob')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('job', 'key'), name='unique_generation_checkpoint')],
+            },
+        ),
+    ]
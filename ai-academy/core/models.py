@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
 # core/models.py
@@ -15,6 +16,54 @@ class Profile(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.role}"
 
+class CourseQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Admins see every course; everyone else sees published courses plus their own."""
+        if hasattr(user, 'profile') and user.profile.role == Profile.Role.ADMIN:
+            return self
+        return self.filter(models.Q(status=Course.Status.PUBLISHED) | models.Q(created_by=user))
+
+    def with_tree(self):
+        """
+        Loads everything CourseDetailSerializer touches (creator, modules,
+        lessons, quiz, questions) in a fixed number of queries, no matter
+        how many courses or modules there are.
+        """
+        return self.select_related('created_by').prefetch_related(
+            models.Prefetch(
+                'modules',
+                queryset=Module.objects.select_related('quiz').prefetch_related(
+                    models.Prefetch('lessons', queryset=Lesson.objects.order_by('order')),
+                    models.Prefetch('quiz__questions', queryset=Question.objects.order_by('order')),
+                ).order_by('order'),
+            ),
+        )
+
+    def with_progress(self, user):
+        """
+        Annotates completed_lesson_count for `user` as a correlated subquery,
+        so a whole page of courses costs one query. Pair with with_counts()
+        for percent-complete.
+        """
+        completed = (
+            LessonProgress.objects
+            .filter(user=user, completed_at__isnull=False, lesson__module__course=models.OuterRef('pk'))
+            .values('lesson__module__course')
+            .annotate(count=models.Count('pk'))
+            .values('count')
+        )
+        return self.annotate(
+            completed_lesson_count=Coalesce(models.Subquery(completed), 0),
+        )
+
+    def with_counts(self):
+        """Annotates module_count, lesson_count and quiz_count, computed in the database."""
+        return self.select_related('created_by').annotate(
+            module_count=models.Count('modules', distinct=True),
+            lesson_count=models.Count('modules__lessons', distinct=True),
+            quiz_count=models.Count('modules__quiz', distinct=True),
+        )
+
 class Course(models.Model):
     class Status(models.TextChoices):
         DRAFT = 'DRAFT', 'Draft'
@@ -24,6 +73,12 @@ class Course(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.DRAFT)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Bumped on every change to the course or its modules, lessons and
+    # quizzes (see core/signals.py); cached course trees are keyed by it.
+    content_version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CourseQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -101,4 +156,151 @@ class Question(models.Model):
         ordering = ['order']
 
     def __str__(self):
-        return self.question_text[:50]
\ No newline at end of file
+        return self.question_text[:50]
+
+# --- NEW MODEL ---
+class Attempt(models.Model):
+    """One graded submission of a quiz by a student."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_attempts')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='attempts')
+    score = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    submitted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-submitted_at']
+        indexes = [models.Index(fields=['user', 'quiz'])]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.quiz.title}: {self.score}/{self.total}"
+
+# --- NEW MODEL ---
+class Answer(models.Model):
+    """The option a student picked for one question of an Attempt."""
+    attempt = models.ForeignKey(Attempt, on_delete=models.CASCADE, related_name='answers')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='+')
+    selected_answer = models.CharField(max_length=255, blank=True)
+    is_correct = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.attempt_id} / {self.question_id}: {self.selected_answer}"
+
+# --- NEW MODEL ---
+class LessonProgress(models.Model):
+    """
+    How far a student has got with one lesson. Written in batches by
+    core.progress, never per request.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lesson_progress')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='progress')
+    seconds_watched = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'lesson'], name='unique_lesson_progress'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.lesson.title}{' (done)' if self.completed_at else ''}"
+
+# --- NEW MODEL ---
+class SearchDocument(models.Model):
+    """
+    One searchable item (course, module, lesson or question) as plain text.
+    Kept up to date by core.search; the full-text index over title and body
+    is created by migration 0012 (Postgres GIN, or SQLite FTS5).
+    """
+    class Kind(models.TextChoices):
+        COURSE = 'COURSE', 'Course'
+        MODULE = 'MODULE', 'Module'
+        LESSON = 'LESSON', 'Lesson'
+        QUESTION = 'QUESTION', 'Question'
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    title = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
+
+# --- NEW MODEL ---
+class GenerationJob(models.Model):
+    """
+    A queued AI course generation request. Jobs are picked up by the
+    `run_generation_worker` management command, which reports progress
+    back here so the browser can poll for it.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        SUCCEEDED = 'SUCCEEDED', 'Succeeded'
+        FAILED = 'FAILED', 'Failed'
+
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='generation_jobs')
+    # The original request payload, e.g. {"prompt": "...", "num_content_modules": 3}
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    stage = models.CharField(max_length=50, default='queued')
+    percent = models.PositiveSmallIntegerField(default=0)
+    # Set once the course has been saved
+    course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker on every progress update and checkpoint
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Job {self.pk}: {self.params.get('prompt', '')} ({self.status})"
+
+# --- NEW MODEL ---
+class GenerationCheckpoint(models.Model):
+    """
+    One finished pipeline step (outline, lesson plan, lesson, quiz) of a
+    generation job, saved as soon as it is done. A failed or interrupted
+    job is resumed from these instead of paying for every LLM call again.
+    """
+    job = models.ForeignKey(GenerationJob, on_delete=models.CASCADE, related_name='checkpoints')
+    # e.g. "outline", "plan:0", "lesson:0:2", "quiz:1", "ultimate_quiz"
+    key = models.CharField(max_length=100)
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'key'], name='unique_generation_checkpoint'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.job_id}: {self.key}"
+
+# --- NEW MODEL ---
+class LLMResponse(models.Model):
+    """
+    A cached LLM response, keyed by a hash of (model name, prompt, params).
+    Used by the database backend of core.llm_cache.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100)
+    response = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every hit; the least recently used entries are evicted first
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    hits = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.model_name} [{self.key[:12]}]"
@@ -0,0 +1,23 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+# core/pagination.py
+
+class CourseCatalogPagination(CursorPagination):
+    """
+    Cursor pagination for the course catalog. Stable while new courses
+    are being generated, and each page costs the same no matter how deep.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Numbered pages for search results, which are ordered by relevance
+    rather than by a column a cursor could follow.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 50
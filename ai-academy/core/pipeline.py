@@ -0,0 +1,927 @@
+import os
+import hashlib
+import threading
+import contextvars
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from .checkpoints import checkpointed, completed_future
+from .compaction import compact_course_content
+from .course_cache import invalidate_course
+from .executor import PipelineExecutor
+from .jsonextract import extract_json_from_text
+from .llm_cache import get_llm_cache
+from .metrics import record_cache_lookup, timed
+from .models import Course, Module, Lesson, Quiz, Question
+from .providers import get_provider
+from .resilience import CircuitOpenError, ResiliencePolicy
+from .search import document_for, index_documents
+from .similarity import CourseSimilarityIndex
+
+# core/pipeline.py
+
+# Load environment variables
+load_dotenv()
+YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+
+
+# ---------------------
+# AI Helpers (LLM providers)
+# ---------------------
+def run_llm_generation(stage, prompt_text):
+    """
+    Sends a prompt to the provider configured for `stage` ("outline",
+    "lesson_plan", "lesson" or "quiz"; see core/providers.py), going through
+    the LLM response cache.
+    """
+    provider = get_provider(stage)
+    cache = get_llm_cache()
+    if provider.cacheable:
+        cached = cache.get(provider.model, prompt_text, provider.cache_params)
+        record_cache_lookup("llm", cached is not None)
+        if cached is not None:
+            return cached
+
+    try:
+        with timed(stage):
+            raw_text = provider.generate(prompt_text)
+    except Exception as e:
+        print(f"{provider.name} generation error with model {provider.model}: {e}")
+        raise
+    if provider.cacheable:
+        cache.set(provider.model, prompt_text, raw_text, provider.cache_params)
+    return raw_text
+
+
+def discard_llm_response(stage, prompt_text):
+    """Drops a cached response that turned out to be unusable, so the next run asks again."""
+    provider = get_provider(stage)
+    get_llm_cache().discard(provider.model, prompt_text, provider.cache_params)
+
+
+# ==============================================================================
+#  NEW AI PIPELINE (HELPER FUNCTIONS)
+# ==============================================================================
+
+# === PIPELINE STEP 1: Get Module Titles ===
+def generate_course_outline(prompt, num_modules):
+    print(f"AI: Generating {num_modules} module titles for: {prompt}")
+    stage = "outline"
+    full_prompt = f"""
+Create a course outline for the topic: "{prompt}".
+The course must have exactly {num_modules} content modules in a logical learning order.
+Return ONLY a valid JSON object with a single key "modules", which is an array of objects.
+Each object in the array should have a "title" for the module.
+Example: {{"modules": [{{"title": "Introduction to AI"}}, {{"title": "Machine Learning Basics"}}]}}
+"""
+    raw = run_llm_generation(stage, full_prompt)
+    try:
+        parsed = extract_json_from_text(raw)
+        return parsed.get("modules", [])
+    except Exception as e:
+        print("Error parsing course outline JSON:", e)
+        discard_llm_response(stage, full_prompt)
+        return [{"title": f"Module {i+1}: {prompt} Part {i+1}"} for i in range(num_modules)]
+
+
+# === PIPELINE STEP 2: Get Lesson Titles for a Module ===
+def generate_lesson_plan_for_module(module_title, course_prompt, num_lessons):
+    print(f"AI: Generating {num_lessons} lesson titles for module: {module_title}")
+    stage = "lesson_plan"
+    full_prompt = f"""
+You are a course curriculum designer for a course on "{course_prompt}".
+Your task is to generate exactly {num_lessons} specific, teachable lesson titles 
+for the module titled: "{module_title}".
+
+Return ONLY a valid JSON object.
+
+STRICT JSON FORMAT:
+{{"lessons": [
+    {{"title": "Lesson 1.1 Title"}},
+    {{"title": "Lesson 1.2 Title"}},
+    {{"title": "Lesson 1.3 Title"}}
+]}}
+"""
+    raw = run_llm_generation(stage, full_prompt)
+    try:
+        parsed = extract_json_from_text(raw)
+        return parsed.get("lessons", [])
+    except Exception as e:
+        print("Error parsing lesson plan JSON:", e)
+        discard_llm_response(stage, full_prompt)
+        return [{"title": f"Lesson {i+1} for {module_title}"} for i in range(num_lessons)]
+
+
+# === PIPELINE STEP 3: Get In-Depth Lesson Content ===
+def generate_deep_lesson_content(lesson_title, module_title, course_prompt, video_candidates):
+    print(f"AI: Writing deep content for lesson: {lesson_title}")
+    stage = "lesson"
+
+    video_options_str = ""
+    if video_candidates:
+        video_options_str = "AVAILABLE VIDEO OPTIONS (You MUST select one):\n"
+        for i, vid in enumerate(video_candidates):
+            video_options_str += f"{i+1}. Title: {vid['title']}\n   Channel: {vid['channelTitle']}\n   ID: {vid['video_id']}\n   Description: {vid['description'][:200]}...\n\n"
+    else:
+        video_options_str = "No videos available."
+
+    full_prompt = f"""
+You are an expert technical writer and educator for a course on "{course_prompt}".
+Your current module is "{module_title}".
+
+YOUR TASK:
+1.  Review the list of AVAILABLE VIDEO OPTIONS below.
+2.  Select the ONE video that is most relevant to the lesson topic: "{lesson_title}".
+    Even if the video is only somewhat relevant, YOU MUST PICK ONE. Do not return null.
+3.  Write a comprehensive, in-depth lesson on the topic: "{lesson_title}".
+
+The lesson content MUST:
+- Start with a clear, one-paragraph overview.
+- Use simple HTML tags for formatting (e.g., <p>, <h2>, <h3>, <ul>, <li>, <code>, <pre>).
+- Be at least 400-600 words long.
+- Include detailed explanations, definitions, and analogies.
+- Include practical code examples (<pre><code>...</code></pre>) if the topic is technical.
+
+{video_options_str}
+
+Return ONLY a single, valid JSON object.
+
+STRICT JSON FORMAT:
+{{
+  "text_content": "<p>Detailed lesson content...</p>",
+  "video_id": "THE_ID_OF_THE_CHOSEN_VIDEO"
+}}
+"""
+    raw = run_llm_generation(stage, full_prompt)
+    try:
+        parsed = extract_json_from_text(raw)
+        text_content = parsed.get("text_content") or parsed.get("content") or ""
+        video_id = parsed.get("video_id")
+        
+        if (not video_id or str(video_id).lower() == "null") and video_candidates:
+            print(f"   -> AI returned null video. Forcing fallback to: {video_candidates[0]['title']}")
+            video_id = video_candidates[0]['video_id']
+            
+        return {"text_content": text_content, "video_id": video_id}
+    except Exception as e:
+        print("Error parsing deep lesson JSON:", e)
+        discard_llm_response(stage, full_prompt)
+        fallback_vid = video_candidates[0]['video_id'] if video_candidates else None
+        return {"text_content": f"<p>Content generation failed for {lesson_title}.</p>", "video_id": fallback_vid}
+
+
+# === PIPELINE STEP 3 (BATCHED): Several Lessons in One Call ===
+BATCH_VIDEO_CANDIDATES = 8
+MIN_LESSON_CHARS = 200
+
+
+def _validate_batch_lesson(item, video_candidates):
+    """Returns {"text_content", "video_id"} for a usable batch element, else None."""
+    if not isinstance(item, dict):
+        return None
+    text_content = item.get("text_content") or item.get("content")
+    if not isinstance(text_content, str) or len(text_content.strip()) < MIN_LESSON_CHARS:
+        return None
+
+    candidate_ids = [vid["video_id"] for vid in video_candidates]
+    video_id = item.get("video_id")
+    if video_id not in candidate_ids:
+        video_id = candidate_ids[0] if candidate_ids else None
+    return {"text_content": text_content, "video_id": video_id}
+
+
+def generate_lesson_batch_content(lesson_titles, module_title, course_prompt, video_candidate_lists):
+    """
+    Writes several lessons of one module in a single call. The course and
+    module framing is sent once, and each lesson gets a shorter list of
+    video options.
+
+    Returns one entry per lesson, in order: the lesson data, or None if that
+    element was missing or invalid (the caller retries those one by one).
+    """
+    print(f"AI: Writing deep content for {len(lesson_titles)} lessons of module: {module_title}")
+    stage = "lesson"
+
+    candidate_lists = [(candidates or [])[:BATCH_VIDEO_CANDIDATES] for candidates in video_candidate_lists]
+    lessons_str = ""
+    for n, (title, candidates) in enumerate(zip(lesson_titles, candidate_lists), start=1):
+        lessons_str += f'LESSON {n}: "{title}"\n'
+        if candidates:
+            lessons_str += "AVAILABLE VIDEO OPTIONS (You MUST select one):\n"
+            for i, vid in enumerate(candidates):
+                lessons_str += f"  {i+1}. Title: {vid['title']} | Channel: {vid['channelTitle']} | ID: {vid['video_id']}\n     Description: {vid['description'][:120]}...\n"
+        else:
+            lessons_str += "No videos available.\n"
+        lessons_str += "\n"
+
+    full_prompt = f"""
+You are an expert technical writer and educator for a course on "{course_prompt}".
+Your current module is "{module_title}".
+
+YOUR TASK, for EACH of the {len(lesson_titles)} lessons listed below:
+1.  Select the ONE video from that lesson's options that is most relevant to the lesson topic.
+    Even if the video is only somewhat relevant, YOU MUST PICK ONE. Do not return null.
+2.  Write a comprehensive, in-depth lesson on the lesson topic.
+
+Each lesson's content MUST:
+- Start with a clear, one-paragraph overview.
+- Use simple HTML tags for formatting (e.g., <p>, <h2>, <h3>, <ul>, <li>, <code>, <pre>).
+- Be at least 400-600 words long.
+- Include detailed explanations, definitions, and analogies.
+- Include practical code examples (<pre><code>...</code></pre>) if the topic is technical.
+
+{lessons_str}
+Return ONLY a single, valid JSON object with one element per lesson, in the same order.
+
+STRICT JSON FORMAT:
+{{
+  "lessons": [
+    {{
+      "lesson_number": 1,
+      "text_content": "<p>Detailed lesson content...</p>",
+      "video_id": "THE_ID_OF_THE_CHOSEN_VIDEO"
+    }}
+  ]
+}}
+"""
+    raw = run_llm_generation(stage, full_prompt)
+    try:
+        parsed = extract_json_from_text(raw)
+        items = parsed.get("lessons", []) if isinstance(parsed, dict) else parsed
+        if not isinstance(items, list):
+            raise ValueError("'lessons' is not a list")
+    except Exception as e:
+        print("Error parsing batched lesson JSON:", e)
+        discard_llm_response(stage, full_prompt)
+        return [None] * len(lesson_titles)
+
+    # Match elements by lesson_number when the model gives one, else by position.
+    by_number = {}
+    for position, item in enumerate(items, start=1):
+        try:
+            number = int(item.get("lesson_number", position)) if isinstance(item, dict) else position
+        except (TypeError, ValueError):
+            number = position
+        by_number.setdefault(number, item)
+
+    return [
+        _validate_batch_lesson(by_number.get(n), candidates)
+        for n, candidates in enumerate(candidate_lists, start=1)
+    ]
+
+
+# === PIPELINE STEP 4: Generate Contextual Quiz ===
+def generate_quiz_from_content(content_text, num_questions, suggested_title=""):
+    print(f"AI: Generating a {num_questions}-question quiz...")
+    stage = "quiz"
+    safe_content = content_text[:25000]
+
+    full_prompt = f"""
+CONTEXT: You are a quiz generation bot. You will be given a block of text
+that represents lessons from an online course OR a user prompt describing what to test.
+
+YOUR TASK:
+1.  Read the provided text content.
+2.  Generate a concise, professional 'quiz_title' based on the content.
+    (e.g., if content is about React Hooks, title should be "React Hooks Assessment").
+    Do NOT simply copy the content text as the title.
+3.  Generate a quiz with exactly {num_questions} multiple-choice questions
+    that are directly based on the provided text.
+4.  Each question must have 4 'options' (as a JSON list of strings).
+5.  One of these options must be the 'correct_answer' (as a string).
+6.  Return ONLY a single, valid JSON object.
+
+If a suggested title was provided: "{suggested_title}", use it ONLY if it is short and professional. 
+Otherwise, generate a better one.
+
+STRICT JSON FORMAT:
+{{
+  "quiz_title": "Generated Professional Title",
+  "questions": [
+    {{
+      "question_text": "Question?",
+      "options": ["A", "B", "C", "D"],
+      "correct_answer": "A"
+    }}
+  ]
+}}
+
+---
+CONTENT TO TEST:
+{safe_content}
+---
+"""
+    raw = run_llm_generation(stage, full_prompt)
+    try:
+        parsed = extract_json_from_text(raw)
+        if isinstance(parsed, list):
+            parsed = {"quiz_title": "Assessment", "questions": parsed}
+        elif "questions" not in parsed:
+            return {"quiz_title": "Assessment", "questions": []}
+        questions = parsed["questions"] if isinstance(parsed["questions"], list) else []
+        # Anything but a question object would break CourseGraphWriter when saving.
+        parsed["questions"] = [q for q in questions if isinstance(q, dict)]
+        return parsed
+    except Exception:
+        discard_llm_response(stage, full_prompt)
+        return {"quiz_title": "Assessment", "questions": []}
+
+
+# === YOUTUBE HELPERS ===
+_youtube_service = None
+_youtube_lock = threading.Lock()
+_youtube_http = threading.local()
+
+
+def get_youtube_service():
+    """
+    Returns the process-wide YouTube API client. Building it parses the
+    discovery document, so we only do that once per process.
+    """
+    global _youtube_service
+    if _youtube_service is None:
+        with _youtube_lock:
+            if _youtube_service is None:
+                import googleapiclient.discovery
+                _youtube_service = googleapiclient.discovery.build(
+                    "youtube", "v3", developerKey=YOUTUBE_API_KEY, cache_discovery=False
+                )
+    return _youtube_service
+
+
+def _youtube_thread_http():
+    # httplib2 connections are not thread-safe. Each pipeline thread keeps
+    # its own, which is reused across that thread's searches.
+    http = getattr(_youtube_http, "http", None)
+    if http is None:
+        import httplib2
+        http = _youtube_http.http = httplib2.Http(timeout=settings.AI_RESILIENCE['YOUTUBE_TIMEOUT'])
+    return http
+
+
+def normalize_youtube_query(query):
+    """
+    Lowercases the query, collapses whitespace and drops repeated words, so
+    near-identical searches share one cache entry. Also makes sure the
+    query ends with "tutorial".
+    """
+    words = []
+    for word in query.lower().split():
+        if word not in words:
+            words.append(word)
+    if "tutorial" in words:
+        words.remove("tutorial")
+    words.append("tutorial")
+    return " ".join(words)
+
+
+def search_youtube(query, max_results=20):
+    if not YOUTUBE_API_KEY:
+        print("YouTube API Key is not set.")
+        return []
+
+    normalized = normalize_youtube_query(query)
+    cache_key = "youtube-search:" + hashlib.sha1(f"{normalized}|{max_results}".encode("utf-8")).hexdigest()
+    cached = cache.get(cache_key)
+    record_cache_lookup("youtube", cached is not None)
+    if cached is not None:
+        return cached
+
+    def _search():
+        request = get_youtube_service().search().list(
+            part="snippet",
+            q=normalized,
+            type="video",
+            maxResults=max_results,
+            videoDefinition="high",
+        )
+        return request.execute(http=_youtube_thread_http())
+
+    # Transient failures are retried (core/resilience.py). Lessons can do
+    # without a video, so when YouTube stays down we carry on without one,
+    # but don't cache the empty result.
+    try:
+        with timed("youtube"):
+            response = ResiliencePolicy("youtube").call(_search)
+    except CircuitOpenError:
+        print("YouTube search skipped: too many recent failures.")
+        return []
+    except Exception as e:
+        print(f"An error occurred with YouTube API search: {e}")
+        return []
+
+    videos = []
+    for item in response.get("items", []):
+        snippet = item["snippet"]
+        videos.append(
+            {
+                "video_id": item["id"]["videoId"],
+                "title": snippet["title"],
+                "description": snippet["description"],
+                "channelTitle": snippet["channelTitle"],
+            }
+        )
+    cache.set(cache_key, videos, settings.YOUTUBE_SEARCH_CACHE_TTL)
+    return videos
+
+
+# === DB HELPER: BATCHED COURSE WRITER ===
+class CourseGraphWriter:
+    """
+    Builds modules, lessons, quizzes and questions for a course in memory,
+    then writes each table with a single bulk_create. Saving a course costs
+    a fixed handful of INSERTs instead of one per row.
+
+    Modules are numbered in the order they are added, starting at `next_order`.
+    """
+    def __init__(self, course, next_order=1):
+        self.course = course
+        self.next_order = next_order
+        self.modules = []
+        self.lessons = []
+        self.quizzes = []
+        self.questions = []
+
+    def _add_module(self, title, module_type):
+        module = Module(course=self.course, title=title, order=self.next_order, module_type=module_type)
+        self.next_order += 1
+        self.modules.append(module)
+        return module
+
+    def add_content_module(self, title, lessons, default_content="No content provided."):
+        module = self._add_module(title, Module.ModuleType.CONTENT)
+        for j, lesson_data in enumerate(lessons):
+            self.lessons.append(Lesson(
+                module=module,
+                title=lesson_data.get("title", "Untitled Lesson"),
+                content=lesson_data.get("text_content", default_content),
+                order=j + 1,
+                video_id=lesson_data.get("video_id"),
+            ))
+        return module
+
+    def add_assessment_module(self, title, quiz_data):
+        module = self._add_module(title, Module.ModuleType.ASSESSMENT)
+        quiz = Quiz(module=module, title=title)
+        self.quizzes.append(quiz)
+        for k, q_data in enumerate(quiz_data.get("questions", [])):
+            self.questions.append(Question(
+                quiz=quiz,
+                question_text=q_data.get("question_text"),
+                options=q_data.get("options"),
+                correct_answer=q_data.get("correct_answer"),
+                order=k + 1,
+            ))
+        return module
+
+    @transaction.atomic
+    def save(self):
+        with timed("db_save"):
+            # Each bulk_create fills in primary keys, which the next table's
+            # foreign keys pick up when they are saved.
+            Module.objects.bulk_create(self.modules)
+            Lesson.objects.bulk_create(self.lessons)
+            Quiz.objects.bulk_create(self.quizzes)
+            Question.objects.bulk_create(self.questions)
+            # bulk_create() sends no signals, so invalidate the cached tree and
+            # index the new content here.
+            invalidate_course(self.course.pk)
+            index_documents([
+                document_for(obj, self.course.pk)
+                for obj in (*self.modules, *self.lessons, *self.questions)
+            ])
+        return self.modules
+
+    @transaction.atomic
+    def append(self):
+        """
+        Saves the modules after the course's existing ones. The course row
+        is locked first, so concurrent appends never get the same order.
+        """
+        list(Course.objects.select_for_update().filter(pk=self.course.pk).values_list('pk'))
+        last_order = Module.objects.filter(course=self.course).aggregate(last=Max('order'))['last'] or 0
+        for i, module in enumerate(self.modules):
+            module.order = last_order + i + 1
+        return self.save()
+
+
+# === DB HELPER: COURSE LAYOUT ===
+def get_test_injection_points(num_content_modules, num_test_modules):
+    """Indexes of the content modules that are followed by an intermediate test."""
+    test_injection_points = []
+    if num_test_modules > 0 and num_content_modules > 0:
+        num_test_modules = min(num_test_modules, num_content_modules)
+        modules_per_test = num_content_modules // num_test_modules
+        for i in range(num_test_modules):
+            injection_index = (i + 1) * modules_per_test - 1
+            test_injection_points.append(injection_index)
+    return test_injection_points
+
+
+def plan_course_layout(num_content_modules, num_test_modules):
+    """
+    Works out every module's order up front, using the same injection rules
+    as save_course_pipeline, so modules can be saved as they finish.
+    Returns (content_orders, test_orders, ultimate_order).
+    """
+    test_injection_points = get_test_injection_points(num_content_modules, num_test_modules)
+    content_orders, test_orders = [], []
+    order = 1
+    for i in range(num_content_modules):
+        content_orders.append(order)
+        order += 1
+        if i in test_injection_points:
+            test_orders.append(order)
+            order += 1
+    return content_orders, test_orders, order
+
+
+# === DB HELPER: SAVE PIPELINE ===
+@transaction.atomic
+def save_course_pipeline(course_title, user, generated_modules, intermediate_quizzes, ultimate_quiz):
+    print("DB: Saving course...")
+    course = Course.objects.create(title=course_title, created_by=user)
+    writer = CourseGraphWriter(course)
+
+    test_injection_points = get_test_injection_points(len(generated_modules), len(intermediate_quizzes))
+    quiz_index = 0
+
+    for i, module_data in enumerate(generated_modules):
+        # 1. Content Module
+        writer.add_content_module(module_data["title"], module_data.get("lessons", []))
+
+        # 2. Inject Test Module
+        if i in test_injection_points and quiz_index < len(intermediate_quizzes):
+            quiz_data = intermediate_quizzes[quiz_index]
+            quiz_index += 1
+            writer.add_assessment_module(quiz_data.get("quiz_title", f"Test: {module_data['title']}"), quiz_data)
+
+    # 3. Ultimate Test
+    writer.add_assessment_module(ultimate_quiz.get("quiz_title", "Ultimate Final Test"), ultimate_quiz)
+
+    writer.save()
+    return course
+
+
+# ==============================================================================
+#  PIPELINE ORCHESTRATION (CONCURRENT)
+# ==============================================================================
+
+class PipelineProgress:
+    """
+    Thread-safe progress reporting for one pipeline run.
+
+    `callback(stage, percent)` is called each time a step finishes. Percent
+    is capped at 99; the caller reports 100 once the course is saved.
+    `on_event(name, payload)`, if given, receives each intermediate result
+    (outline, lesson plan, lesson, module, quiz) as soon as it is ready.
+    """
+    def __init__(self, callback, total_steps, on_event=None):
+        self._callback = callback
+        self._on_event = on_event
+        self._total = max(1, total_steps)
+        self._done = 0
+        self._lock = threading.Lock()
+
+    def step(self, stage):
+        if self._callback is None:
+            return
+        # The callback runs under the lock so reports never go backwards.
+        with self._lock:
+            self._done += 1
+            self._callback(stage, min(99, self._done * 100 // self._total))
+
+    def emit(self, event, payload):
+        if self._on_event is not None:
+            self._on_event(event, payload)
+
+    def track(self, future, stage=None, event=None, **payload):
+        """
+        Counts `future` as a `stage` step when it succeeds and, if `event`
+        is given, emits it with the result stored under the event's name.
+        """
+        def _done(f):
+            if f.cancelled() or f.exception() is not None:
+                return
+            if stage:
+                self.step(stage)
+            if event:
+                self.emit(event, {**payload, event: f.result()})
+        future.add_done_callback(_done)
+        return future
+
+
+class GenerationCancelled(Exception):
+    """The caller of a generation run went away; see cancel_on."""
+
+
+_cancel_event = contextvars.ContextVar("generation_cancel", default=None)
+
+
+@contextmanager
+def cancel_on(event):
+    """
+    Within this block, generation stops with GenerationCancelled once the
+    threading.Event `event` is set. Checked before and after every provider
+    call, so calls already in flight finish but nothing new starts.
+    """
+    token = _cancel_event.set(event)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+
+def _check_cancelled():
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise GenerationCancelled()
+
+
+@contextmanager
+def _provider_slot(executor, provider):
+    _check_cancelled()
+    with executor.slot(provider):
+        _check_cancelled()
+        yield
+
+
+def _llm_slot(executor, stage):
+    """Holds one concurrency slot of the provider that serves `stage`."""
+    return _provider_slot(executor, get_provider(stage).name)
+
+
+def _search_videos(executor, lesson_title, course_title):
+    # Include COURSE TITLE in search to prevent context loss
+    # e.g., "Setting up env Intro to Django tutorial" instead of "Setting up env tutorial"
+    with _provider_slot(executor, "youtube"):
+        return search_youtube(f"{lesson_title} {course_title} tutorial", max_results=20)
+
+
+def _finish_lesson(lesson_data, lesson_title, video_candidates, similarity):
+    lesson_data["title"] = lesson_title
+    if similarity is not None:
+        lesson_data["video_id"] = similarity.claim_video(video_candidates, lesson_data.get("video_id"))
+    return lesson_data
+
+
+def _build_lesson(executor, lesson_title, module_title, course_title, similarity=None):
+    """Search for videos, then write the lesson. Both calls respect the provider caps."""
+    video_candidates = _search_videos(executor, lesson_title, course_title)
+    if similarity is not None:
+        video_candidates = similarity.unused_videos(video_candidates)
+
+    with _llm_slot(executor, "lesson"):
+        lesson_data = generate_deep_lesson_content(lesson_title, module_title, course_title, video_candidates)
+
+    return _finish_lesson(lesson_data, lesson_title, video_candidates, similarity)
+
+
+def _build_lesson_batch(video_candidate_lists, executor, lesson_titles, module_title, course_title,
+                        similarity=None, checkpoints=None, keys=()):
+    """
+    Writes a batch of lessons in one call, retrying invalid elements one by
+    one. Each finished lesson is checkpointed under its entry in `keys`.
+    """
+    if similarity is not None:
+        video_candidate_lists = [similarity.unused_videos(candidates) for candidates in video_candidate_lists]
+
+    with _llm_slot(executor, "lesson"):
+        results = generate_lesson_batch_content(lesson_titles, module_title, course_title, video_candidate_lists)
+
+    lessons = []
+    for n, (lesson_title, video_candidates, lesson_data) in enumerate(zip(lesson_titles, video_candidate_lists, results)):
+        if lesson_data is None:
+            print(f"   -> Batched content for '{lesson_title}' was unusable. Generating it on its own.")
+            with _llm_slot(executor, "lesson"):
+                lesson_data = generate_deep_lesson_content(lesson_title, module_title, course_title, video_candidates)
+        lesson_data = _finish_lesson(lesson_data, lesson_title, video_candidates, similarity)
+        if checkpoints is not None:
+            checkpoints.save(keys[n], lesson_data)
+        lessons.append(lesson_data)
+    return lessons
+
+
+def _restore_lesson(lesson_data, similarity):
+    """A lesson from a checkpoint. Its video still counts towards the course's duplicates."""
+    if similarity is not None:
+        similarity.claim_video(None, lesson_data.get("video_id"))
+    return lesson_data
+
+
+def _submit_lessons(executor, lesson_titles, module_title, course_title, similarity=None, checkpoints=None):
+    """
+    Schedules every lesson of a module and returns one future per lesson.
+    With settings.AI_LESSON_BATCH_SIZE above 1, lessons are written that
+    many per Gemini call; their video searches still run in parallel.
+
+    With `checkpoints` (keyed by lesson index), finished lessons are saved
+    as they complete and lessons that already have a checkpoint are not
+    written again.
+    """
+    titles = [lesson_info["title"] for lesson_info in lesson_titles]
+    futures = [None] * len(titles)
+    pending = []
+    for j in range(len(titles)):
+        if checkpoints is not None and j in checkpoints:
+            futures[j] = completed_future(_restore_lesson(checkpoints.get(j), similarity))
+        else:
+            pending.append(j)
+
+    batch_size = settings.AI_LESSON_BATCH_SIZE
+    if batch_size <= 1:
+        for j in pending:
+            futures[j] = executor.submit(
+                checkpointed, checkpoints, j, _build_lesson, executor, titles[j], module_title, course_title, similarity
+            )
+        return futures
+
+    for start in range(0, len(pending), batch_size):
+        indexes = pending[start:start + batch_size]
+        batch = [titles[j] for j in indexes]
+        searches = [executor.submit(_search_videos, executor, title, course_title) for title in batch]
+        written = executor.after(
+            searches, _build_lesson_batch, executor, batch, module_title, course_title,
+            similarity, checkpoints, indexes,
+        )
+        for j, future in zip(indexes, executor.split(written, len(batch))):
+            futures[j] = future
+    return futures
+
+
+def _plan_lessons(executor, module_title, course_title, num_lessons):
+    with _llm_slot(executor, "lesson_plan"):
+        return generate_lesson_plan_for_module(module_title, course_title, num_lessons)
+
+
+def _drop_duplicate_lessons(generated_lessons, similarity=None):
+    """
+    Leaves out lessons that nearly repeat an earlier one, unless that would
+    empty the module. Lessons are checked in plan order, once all are written,
+    so the same output always keeps the same lessons however threads finish.
+    """
+    if similarity is None:
+        return generated_lessons
+    kept = []
+    for lesson in generated_lessons:
+        duplicate_of = similarity.check_lesson_text(lesson.get("title", ""), lesson.get("text_content", ""))
+        if duplicate_of is None:
+            kept.append(lesson)
+        else:
+            print(f"   -> Lesson '{lesson.get('title')}' nearly repeats '{duplicate_of}'.")
+    return kept or generated_lessons
+
+
+def _assemble_module(results, module_title, num_lessons, similarity=None):
+    # `results` may end with the previous module, which is only there so
+    # modules are deduplicated in course order.
+    return {"title": module_title, "lessons": _drop_duplicate_lessons(results[:num_lessons], similarity)}
+
+
+def _build_quiz(generated_modules, executor, num_questions, suggested_title, skip_if_empty=True):
+    if skip_if_empty and not any(m["lessons"] for m in generated_modules):
+        return None
+    # Plain-text, deduplicated summaries of every module instead of raw
+    # lesson HTML, so even the ultimate test covers the whole course.
+    content = compact_course_content(generated_modules, settings.AI_QUIZ_CONTEXT_TOKENS)
+    with _llm_slot(executor, "quiz"):
+        return generate_quiz_from_content(content, num_questions, suggested_title)
+
+
+def generate_module_lessons(executor, module_title, course_title, num_lessons, similarity=None):
+    """
+    Plans the lessons for one module, then writes all of them in parallel.
+    Returns the generated lessons in plan order.
+
+    `similarity`, a CourseSimilarityIndex, skips lessons and videos the
+    course already has (see CourseSimilarityIndex.for_course).
+    """
+    lesson_titles = _plan_lessons(executor, module_title, course_title, num_lessons)
+    if similarity is not None:
+        lesson_titles = similarity.filter_lessons(lesson_titles)
+    futures = _submit_lessons(executor, lesson_titles, module_title, course_title, similarity)
+    return _drop_duplicate_lessons([f.result() for f in futures], similarity)
+
+
+def _outline(executor, prompt, num_content_modules):
+    with _llm_slot(executor, "outline"):
+        return generate_course_outline(prompt, num_content_modules)
+
+
+def _checkpointed_after(results, checkpoints, key, fn, *args, **kwargs):
+    # executor.after() passes the dependencies' results first.
+    return checkpointed(checkpoints, key, fn, results, *args, **kwargs)
+
+
+def generate_course_content(prompt, num_content_modules, num_lessons_per_module, num_test_modules,
+                            progress=None, on_event=None, checkpoints=None):
+    """
+    Runs the full generation pipeline as a dependency graph:
+
+        outline -> lesson plan (per module) -> search + write (per lesson)
+                -> intermediate quiz (per module group) / ultimate quiz
+
+    Independent branches run concurrently, so wall-clock time tracks the
+    longest chain rather than the total number of calls. Lessons and videos
+    that repeat others in the course are skipped; see core/similarity.py.
+
+    `progress`, if given, is called as progress(stage, percent) as steps finish.
+    `on_event`, if given, is called as on_event(name, payload) with each
+    intermediate result; see PipelineProgress. Both may be called from
+    pool threads.
+
+    `checkpoints`, a CheckpointStore, saves every finished step and skips
+    the steps it already holds, so a failed run can be resumed.
+
+    Returns (course_title, generated_modules, intermediate_quizzes, ultimate_quiz),
+    ready to be passed to `save_course_pipeline`.
+    """
+    course_title = prompt
+    num_quizzes = max(0, min(num_test_modules, num_content_modules))
+    tracker = PipelineProgress(
+        progress,
+        1 + num_content_modules * (1 + num_lessons_per_module) + num_quizzes + 1,
+        on_event=on_event,
+    )
+    similarity = CourseSimilarityIndex()
+
+    with PipelineExecutor() as executor:
+        print("✅ [1/5] Generating course outline...")
+        module_outline = checkpointed(checkpoints, "outline", _outline, executor, prompt, num_content_modules)
+        tracker.step("outline")
+        tracker.emit("outline", {"modules": [m["title"] for m in module_outline]})
+        _check_cancelled()
+
+        print("✅ [2/5] Generating all lesson content (concurrently)...")
+        plan_futures = {}
+        for i, module_info in enumerate(module_outline):
+            if checkpoints is not None and f"plan:{i}" in checkpoints:
+                future = completed_future(checkpoints.get(f"plan:{i}"))
+            else:
+                future = executor.submit(_plan_lessons, executor, module_info["title"], prompt, num_lessons_per_module)
+            plan_futures[tracker.track(future, "lesson_plan")] = i
+        module_futures = [None] * len(module_outline)
+        # Fan out each module's lessons once its plan, and every earlier
+        # module's plan, has arrived: repeated titles are dropped in course
+        # order, so reruns over the same LLM output keep the same lessons.
+        for plan_future, i in plan_futures.items():
+            module_title = module_outline[i]["title"]
+            lesson_titles = similarity.filter_lessons(plan_future.result())
+            _check_cancelled()
+            if checkpoints is not None:
+                # Saved after filtering, so a resumed run keeps the same lessons.
+                checkpoints.save(f"plan:{i}", lesson_titles)
+            tracker.emit("lesson_plan", {"module_index": i, "lessons": [l["title"] for l in lesson_titles]})
+            lesson_futures = [
+                tracker.track(future, "lesson", event="lesson", module_index=i, lesson_index=j)
+                for j, future in enumerate(_submit_lessons(
+                    executor, lesson_titles, module_title, prompt, similarity,
+                    checkpoints.scope(f"lesson:{i}") if checkpoints is not None else None,
+                ))
+            ]
+            # Chained to the previous module so lesson texts are compared in course order too.
+            previous = [module_futures[i - 1]] if i else []
+            module_futures[i] = tracker.track(
+                executor.after(lesson_futures + previous, _assemble_module, module_title, len(lesson_futures), similarity),
+                event="module", module_index=i,
+            )
+
+        _check_cancelled()
+        print(f"✅ [3/5] Generating {num_test_modules} intermediate quizzes...")
+        # Group the modules the outline actually returned, so tests line up
+        # with the injection points used when the course is saved.
+        num_content_modules = len(module_outline)
+        quiz_futures = []
+        if num_test_modules > 0 and num_content_modules > 0:
+            num_test_modules = min(num_test_modules, num_content_modules)
+            modules_per_test = num_content_modules // num_test_modules
+
+            for i in range(num_test_modules):
+                start_index = i * modules_per_test
+                end_index = (i + 1) * modules_per_test if (i < num_test_modules - 1) else num_content_modules
+                quiz_title = f"Test: Modules {start_index+1}-{end_index}"
+                quiz_futures.append(tracker.track(
+                    executor.after(
+                        module_futures[start_index:end_index], _checkpointed_after, checkpoints, f"quiz:{i}",
+                        _build_quiz, executor, 5, quiz_title,
+                    ),
+                    "quiz",
+                    event="quiz", quiz_index=i,
+                ))
+
+        print("✅ [4.5] Generating ultimate final test...")
+        ultimate_future = tracker.track(executor.after(
+            module_futures, _checkpointed_after, checkpoints, "ultimate_quiz",
+            _build_quiz, executor, 10, f"Ultimate Final Test: {prompt}", skip_if_empty=False,
+        ), "quiz", event="ultimate_quiz")
+
+        generated_modules = [f.result() for f in module_futures]
+        intermediate_quizzes = [q for q in (f.result() for f in quiz_futures) if q is not None]
+        ultimate_quiz = ultimate_future.result()
+
+    return course_title, generated_modules, intermediate_quizzes, ultimate_quiz
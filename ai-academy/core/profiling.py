@@ -0,0 +1,203 @@
+import re
+import json
+import time
+import random
+import logging
+import contextvars
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# core/profiling.py
+
+# ==============================================================================
+#  REQUEST PROFILING
+# ==============================================================================
+# Opt-in (settings.PROFILING). For each API request, ProfilingMiddleware
+# records the SQL queries and their total time, the time spent in DRF
+# serializers, and the response size. Queries that repeat with only their
+# parameters changing are flagged as N+1 suspects. In DEBUG the profile is
+# sent back in X-Profile / Server-Timing headers; in production a sample of
+# requests is logged as JSON by the "core.profiling" logger.
+#
+# Tests use the same profiler through profile() or QueryProfileAssertions,
+# so a view that starts issuing a query per row fails CI.
+
+logger = logging.getLogger(__name__)
+
+_current_profile = contextvars.ContextVar("request_profile", default=None)
+
+_PLACEHOLDER_LIST = re.compile(r"%s(\s*,\s*%s)+")
+_NUMBER = re.compile(r"\b\d+\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """The shape of a query: placeholder lists and inline numbers collapsed, so N+1 queries look alike."""
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _PLACEHOLDER_LIST.sub("%s, ...", sql)
+    return _NUMBER.sub("?", sql)
+
+
+class RequestProfile:
+    """What one request (or profiled block) cost."""
+
+    def __init__(self):
+        self.queries = []   # (sql, seconds)
+        self.serializer_time = 0.0
+        self.response_size = None
+        self.duration = None
+        self._started = time.perf_counter()
+        self._serializing = False
+
+    def record_query(self, execute, sql, params, many, context):
+        # A connection.execute_wrapper(); sees every query, DEBUG or not.
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._started
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def db_time(self):
+        return sum(seconds for _, seconds in self.queries)
+
+    def n_plus_one_suspects(self, threshold=None):
+        """Query shapes run at least `threshold` times, most repeated first: [(sql, count)]."""
+        if threshold is None:
+            threshold = settings.PROFILING['N_PLUS_ONE_THRESHOLD']
+        counts = Counter(normalize_sql(sql) for sql, _ in self.queries)
+        return [(sql, count) for sql, count in counts.most_common() if count >= threshold]
+
+    def as_dict(self):
+        return {
+            "queries": self.query_count,
+            "db_ms": round(self.db_time * 1000, 2),
+            "serializer_ms": round(self.serializer_time * 1000, 2),
+            "total_ms": round((self.duration or 0) * 1000, 2),
+            "response_bytes": self.response_size,
+            "n_plus_one": [{"sql": sql, "count": count} for sql, count in self.n_plus_one_suspects()],
+        }
+
+    def header_value(self):
+        data = self.as_dict()
+        return (f"queries={data['queries']}; db={data['db_ms']}ms; serializer={data['serializer_ms']}ms; "
+                f"total={data['total_ms']}ms; size={data['response_bytes']}; n+1={len(data['n_plus_one'])}")
+
+    def server_timing(self):
+        return (f"db;dur={self.db_time * 1000:.2f}, serializer;dur={self.serializer_time * 1000:.2f}, "
+                f"total;dur={(self.duration or 0) * 1000:.2f}")
+
+
+_serializer_timing_installed = False
+
+
+def install_serializer_timing():
+    """
+    Times BaseSerializer.data, which Serializer.data and ListSerializer.data
+    both go through. Nested serializers are inside the outermost call, so
+    only that one is counted. Costs nothing outside a profiled block.
+    """
+    global _serializer_timing_installed
+    if _serializer_timing_installed:
+        return
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data.fget
+
+    def data(self):
+        profile = _current_profile.get()
+        if profile is None or profile._serializing:
+            return original(self)
+        profile._serializing = True
+        start = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            profile.serializer_time += time.perf_counter() - start
+            profile._serializing = False
+
+    BaseSerializer.data = property(data)
+    _serializer_timing_installed = True
+
+
+@contextmanager
+def profile():
+    """Profiles the queries and serializers run by this thread inside the block."""
+    install_serializer_timing()
+    request_profile = RequestProfile()
+    token = _current_profile.set(request_profile)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(request_profile.record_query))
+            yield request_profile
+    finally:
+        request_profile.finish()
+        _current_profile.reset(token)
+
+
+class ProfilingMiddleware:
+    """Profiles requests under PROFILING['PATH_PREFIX']. Removed from the stack unless PROFILING['ENABLED']."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = settings.PROFILING
+        if not request.path.startswith(config['PATH_PREFIX']):
+            return self.get_response(request)
+
+        with profile() as request_profile:
+            response = self.get_response(request)
+        # Streamed bodies are produced after we return, so their size is unknown.
+        if not response.streaming:
+            request_profile.response_size = len(response.content)
+
+        if settings.DEBUG:
+            response['X-Profile'] = request_profile.header_value()
+            response['Server-Timing'] = request_profile.server_timing()
+            suspects = request_profile.n_plus_one_suspects()
+            if suspects:
+                response['X-Profile-N-Plus-One'] = " | ".join(f"{count}x {sql[:200]}" for sql, count in suspects[:3])
+        elif random.random() < config['SAMPLE_RATE']:
+            logger.info(json.dumps({
+                "event": "request_profile",
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                **request_profile.as_dict(),
+            }))
+        return response
+
+
+class QueryProfileAssertions:
+    """
+    TestCase mixin:
+
+        with self.assertNoNPlusOne(max_queries=6):
+            self.client.get("/api/courses/")
+    """
+
+    @contextmanager
+    def assertNoNPlusOne(self, max_queries=None, threshold=None):
+        with profile() as request_profile:
+            yield request_profile
+        suspects = request_profile.n_plus_one_suspects(threshold)
+        if suspects:
+            self.fail("N+1 query suspects:\n" + "\n".join(f"  {count}x {sql}" for sql, count in suspects))
+        if max_queries is not None and request_profile.query_count > max_queries:
+            self.fail(f"{request_profile.query_count} queries, expected at most {max_queries}:\n"
+                      + "\n".join(f"  {sql}" for sql, _ in request_profile.queries))
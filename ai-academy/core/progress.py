@@ -0,0 +1,127 @@
+import time
+import atexit
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Lesson, LessonProgress
+
+# core/progress.py
+
+# ==============================================================================
+#  STUDENT PROGRESS (WRITE-COALESCING BUFFER)
+# ==============================================================================
+# The lesson viewer pings progress every few seconds. Watch-time pings are
+# merged in an in-process buffer, one entry per (user, lesson), and flushed
+# with one bulk INSERT and at most one bulk UPDATE once the buffer holds
+# PROGRESS_BUFFER_MAX_ENTRIES entries or its oldest entry is
+# PROGRESS_FLUSH_INTERVAL seconds old (checked on the next ping).
+#
+# Completions are written through straight away, so course progress and
+# percent complete are right whichever process serves the read. Buffered
+# watch time is only eventually consistent: another process may show an
+# older seconds_watched until this one flushes, and a hard kill (SIGKILL,
+# OOM) loses whatever had not been flushed. Reads in the same process
+# flush first.
+
+
+def percent_complete(completed_lessons, total_lessons):
+    return round(100 * completed_lessons / total_lessons) if total_lessons else 0
+
+
+class ProgressBuffer:
+    def __init__(self, max_entries=None, flush_interval=None):
+        self.max_entries = max_entries if max_entries is not None else settings.PROGRESS_BUFFER_MAX_ENTRIES
+        self.flush_interval = flush_interval if flush_interval is not None else settings.PROGRESS_FLUSH_INTERVAL
+        self._pending = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def record(self, user_id, lesson_id, seconds_watched=0, completed=False):
+        """
+        Merges one progress ping into the buffer, flushing it if it is due.
+        A completion is written at once, with any watch time buffered for it.
+        """
+        key = (user_id, lesson_id)
+        seconds_watched = int(seconds_watched or 0)
+        with self._lock:
+            if completed:
+                entry = self._pending.pop(key, None) or {"seconds_watched": 0}
+                entry = {"seconds_watched": max(entry["seconds_watched"], seconds_watched),
+                         "completed_at": timezone.now()}
+                due = False
+            else:
+                entry = self._pending.get(key)
+                if entry is None:
+                    entry = self._pending[key] = {"seconds_watched": 0, "completed_at": None}
+                entry["seconds_watched"] = max(entry["seconds_watched"], seconds_watched)
+                if self._oldest is None:
+                    self._oldest = time.monotonic()
+                due = len(self._pending) >= self.max_entries or time.monotonic() - self._oldest >= self.flush_interval
+
+        if completed:
+            self._write({key: entry})
+        elif due:
+            self.flush()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Writes every buffered entry. Returns the number of rows upserted."""
+        with self._lock:
+            pending, self._pending, self._oldest = self._pending, {}, None
+        return self._write(pending)
+
+    def _write(self, pending):
+        if not pending:
+            return 0
+
+        # Pings for lessons deleted meanwhile would fail the whole batch.
+        valid = set(Lesson.objects.filter(pk__in={lesson_id for _, lesson_id in pending}).values_list('pk', flat=True))
+        pending = {key: entry for key, entry in pending.items() if key[1] in valid}
+        if not pending:
+            return 0
+        now = timezone.now()
+
+        # Rows are only ever moved forward: seconds_watched keeps its maximum
+        # and completed_at its first value, so a completion (which carries no
+        # seconds) or a late ping from another tab cannot undo progress. New
+        # rows are inserted as they are; existing ones are locked, merged and
+        # written back in one bulk UPDATE.
+        with transaction.atomic():
+            LessonProgress.objects.bulk_create([
+                LessonProgress(user_id=user_id, lesson_id=lesson_id, updated_at=now, **entry)
+                for (user_id, lesson_id), entry in pending.items()
+            ], ignore_conflicts=True)
+
+            rows = LessonProgress.objects.select_for_update().filter(
+                user_id__in={user_id for user_id, _ in pending},
+                lesson_id__in={lesson_id for _, lesson_id in pending},
+            ).only('pk', 'user_id', 'lesson_id', 'seconds_watched', 'completed_at')
+            changed = []
+            for row in rows:
+                entry = pending.get((row.user_id, row.lesson_id))
+                if entry is None:
+                    continue
+                seconds_watched = max(row.seconds_watched, entry["seconds_watched"])
+                completed_at = row.completed_at or entry["completed_at"]
+                if (seconds_watched, completed_at) != (row.seconds_watched, row.completed_at):
+                    row.seconds_watched, row.completed_at, row.updated_at = seconds_watched, completed_at, now
+                    changed.append(row)
+            if changed:
+                LessonProgress.objects.bulk_update(changed, ['seconds_watched', 'completed_at', 'updated_at'])
+        return len(pending)
+
+progress_buffer = ProgressBuffer()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        progress_buffer.flush()
+    except Exception as e:
+        print(f"Could not flush buffered lesson progress: {e}")
@@ -0,0 +1,373 @@
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .compaction import estimate_tokens
+from .metrics import record_tokens
+from .resilience import ResiliencePolicy
+
+# core/providers.py
+
+# ==============================================================================
+#  LLM PROVIDERS
+# ==============================================================================
+# Every pipeline stage ("outline", "lesson_plan", "lesson", "quiz") asks
+# get_provider(stage) for its model. Providers are configured in
+# settings.AI_PROVIDERS; AI_PROVIDER picks the default one and
+# AI_STAGE_PROVIDERS routes single stages elsewhere, e.g. quizzes to a
+# cheaper model. Each provider spaces its requests to stay under its
+# REQUESTS_PER_MINUTE; its concurrency cap is the provider's entry in
+# AI_PROVIDER_CONCURRENCY, enforced by PipelineExecutor.slot(). Calls are
+# retried and circuit-broken per provider by core/resilience.py, and their
+# token usage is counted in core/metrics.py.
+#
+# The "stub" backend answers offline with deterministic, well-formed output
+# (or recorded fixtures), so the whole pipeline can be load-tested and
+# benchmarked without network access or API keys.
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Spaces calls evenly so no more than `per_minute` start in any minute. 0 disables it."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def pause(self, seconds):
+        """Holds back every caller for `seconds`, e.g. after the provider answered 429."""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+class LLMProvider:
+    """
+    Base class. Subclasses implement _generate(prompt) and may override
+    _stream(prompt) with real streaming; the rest is shared.
+    """
+    # Whether responses go through the LLM response cache.
+    cacheable = True
+
+    def __init__(self, name, model, requests_per_minute=0, generation_config=None, **options):
+        self.name = name
+        self.model = model
+        # Sampling / output options sent with every request, e.g. temperature.
+        self.generation_config = dict(generation_config or {})
+        self.timeout = settings.AI_RESILIENCE['TIMEOUT']
+        self.limiter = RateLimiter(requests_per_minute)
+        self.policy = ResiliencePolicy(name, on_throttle=self.limiter.pause)
+
+    @property
+    def cache_params(self):
+        """Everything besides the model and prompt that shapes a response; part of the LLM cache key."""
+        return {"backend": type(self).__name__, **self.generation_config}
+
+    @property
+    def concurrency(self):
+        return max(1, int(settings.AI_PROVIDER_CONCURRENCY.get(self.name, 1)))
+
+    def generate(self, prompt):
+        """Returns the model's full text response to `prompt`, retrying transient failures."""
+        return self.policy.call(self._attempt, prompt)
+
+    def _attempt(self, prompt):
+        self.limiter.wait()
+        return self._generate(prompt)
+
+    def stream(self, prompt):
+        """
+        Yields the response to `prompt` in chunks as they arrive. Only opening
+        the stream is retried; chunks already yielded can't be taken back.
+        """
+        chunks = self.policy.call(self._open_stream, prompt)
+        yield from chunks
+
+    def _open_stream(self, prompt):
+        self.limiter.wait()
+        chunks = iter(self._stream(prompt))
+        first = next(chunks, None)
+        return chunks if first is None else _prepend(first, chunks)
+
+    async def agenerate(self, prompt):
+        return await asyncio.to_thread(self.generate, prompt)
+
+    def batch(self, prompts):
+        """Generates several prompts concurrently, up to the provider's cap. Results are in order."""
+        prompts = list(prompts)
+        if not prompts:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(prompts))) as pool:
+            return list(pool.map(self.generate, prompts))
+
+    def _generate(self, prompt):
+        raise NotImplementedError
+
+    def _record_usage(self, prompt_tokens, completion_tokens):
+        record_tokens(self.name, prompt_tokens or 0, completion_tokens or 0)
+
+    def _stream(self, prompt):
+        yield self._generate(prompt)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}:{self.model}>"
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+
+# --- Gemini ---
+# The client library takes most of a second to import, so it is loaded on
+# first use rather than when the app starts.
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    """Returns the configured google.generativeai module, importing it on first use."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    logger.warning("GEMINI_API_KEY is not set in environment variables.")
+                genai.configure(api_key=api_key)
+                _genai = genai
+    return _genai
+
+
+class GeminiProvider(LLMProvider):
+    def _generate(self, prompt):
+        response = get_genai().GenerativeModel(self.model).generate_content(
+            prompt, generation_config=self.generation_config or None, request_options={"timeout": self.timeout}
+        )
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self._record_usage(usage.prompt_token_count, usage.candidates_token_count)
+        text = getattr(response, "text", None)
+        return text if text is not None else str(response)
+
+    def _stream(self, prompt):
+        stream = get_genai().GenerativeModel(self.model).generate_content(
+            prompt, stream=True, generation_config=self.generation_config or None,
+            request_options={"timeout": self.timeout},
+        )
+        for chunk in stream:
+            if getattr(chunk, "text", None):
+                yield chunk.text
+
+
+# --- OpenAI ---
+class OpenAIProvider(LLMProvider):
+    def __init__(self, name, model, requests_per_minute=0, generation_config=None, **options):
+        super().__init__(name, model, requests_per_minute, generation_config)
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    # Retries are ours (core/resilience.py), not the client's.
+                    self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        return self._client
+
+    def _messages(self, prompt):
+        return [{"role": "user", "content": prompt}]
+
+    def _generate(self, prompt):
+        response = self.client.chat.completions.create(
+            model=self.model, messages=self._messages(prompt), timeout=self.timeout, **self.generation_config
+        )
+        if response.usage is not None:
+            self._record_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content or ""
+
+    def _stream(self, prompt):
+        stream = self.client.chat.completions.create(
+            model=self.model, messages=self._messages(prompt), stream=True, timeout=self.timeout,
+            **self.generation_config,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+# --- Offline stub ---
+_VOCABULARY = """
+abstraction algorithm argument array boolean branch buffer cache callback class closure compiler
+condition constant context data debugger decorator dependency dictionary element encapsulation
+event exception expression field function generator graph hash heap index inheritance instance
+interface iterator key lambda library list loop memory method module mutable namespace node object
+operator package parameter pattern pointer polymorphism process queue recursion reference runtime
+scope sequence server set signature stack statement stream string syntax template thread token tree
+tuple type value variable vector
+""".split()
+
+
+class StubProvider(LLMProvider):
+    """
+    Deterministic offline model. Answers are derived from the prompt, so the
+    same prompt always gets the same answer, and are shaped like what each
+    pipeline stage asks for. If FIXTURES is a directory, a file named
+    <sha256 of the prompt>.txt in it is returned instead. LATENCY adds a
+    fixed delay per call, to mimic a real provider in load tests.
+    """
+    cacheable = False
+
+    def __init__(self, name, model="stub", requests_per_minute=0, latency=0.0, fixtures="", **options):
+        super().__init__(name, model, requests_per_minute)
+        self.latency = latency
+        self.fixtures = fixtures
+
+    def _generate(self, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        text = None
+        if self.fixtures:
+            path = os.path.join(self.fixtures, hashlib.sha256(prompt.encode("utf-8")).hexdigest() + ".txt")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    text = f.read()
+        if text is None:
+            text = json.dumps(self._answer(prompt))
+        # Estimated, so load tests still report token counts.
+        self._record_usage(estimate_tokens(prompt), estimate_tokens(text))
+        return text
+
+    def _stream(self, prompt):
+        text = self._generate(prompt)
+        for i in range(0, len(text), 256):
+            yield text[i:i + 256]
+
+    @staticmethod
+    def _count(pattern, prompt, default):
+        match = re.search(pattern, prompt)
+        return int(match.group(1)) if match else default
+
+    @staticmethod
+    def _lesson_text(title):
+        rng = random.Random(title)
+        sentences = [f"<p>This lesson covers {title}.</p>"]
+        for _ in range(12):
+            words = rng.sample(_VOCABULARY, 8)
+            sentences.append(f"<p>The {words[0]} uses a {words[1]} to {words[2]} each {words[3]} "
+                             f"before the {words[4]} reaches the {words[5]} or {words[6]} {words[7]}.</p>")
+        return "".join(sentences)
+
+    def _answer(self, prompt):
+        if "course outline" in prompt:
+            topic = re.search(r'for the topic: "(.*?)"', prompt)
+            topic = topic.group(1) if topic else "Course"
+            count = self._count(r"exactly (\d+) content modules", prompt, 3)
+            return {"modules": [{"title": f"{topic}: Part {i + 1}"} for i in range(count)]}
+
+        if "lesson titles" in prompt:
+            module = re.search(r'for the module titled: "(.*?)"', prompt)
+            module = module.group(1) if module else "Module"
+            count = self._count(r"exactly (\d+) specific", prompt, 3)
+            # Distinct topics per lesson, so they don't read as duplicates (core/similarity.py).
+            return {"lessons": [
+                {"title": " and ".join(w.title() for w in random.Random(f"{module}|{i}").sample(_VOCABULARY, 2))}
+                for i in range(count)
+            ]}
+
+        if "multiple-choice questions" in prompt:
+            count = self._count(r"exactly (\d+) multiple-choice", prompt, 5)
+            title = re.search(r'suggested title was provided: "(.*?)"', prompt)
+            return {
+                "quiz_title": (title.group(1) if title else "") or "Assessment",
+                "questions": [
+                    {"question_text": f"Question {i + 1}?", "options": ["A", "B", "C", "D"], "correct_answer": "A"}
+                    for i in range(count)
+                ],
+            }
+
+        if "for EACH of the" in prompt:
+            # [preamble, number, title, options, number, title, options, ...]
+            parts = re.split(r'LESSON (\d+): "(.*?)"\n', prompt)
+            lessons = []
+            for i in range(1, len(parts) - 2, 3):
+                video = re.search(r"ID: (\S+)", parts[i + 2])
+                lessons.append({
+                    "lesson_number": int(parts[i]),
+                    "text_content": self._lesson_text(parts[i + 1]),
+                    "video_id": video.group(1) if video else None,
+                })
+            return {"lessons": lessons}
+
+        topic = re.search(r'in-depth lesson on the topic: "(.*?)"', prompt)
+        video = re.search(r"ID: (\S+)", prompt)
+        return {
+            "text_content": self._lesson_text(topic.group(1) if topic else prompt[:80]),
+            "video_id": video.group(1) if video else None,
+        }
+
+
+BACKENDS = {
+    "gemini": GeminiProvider,
+    "openai": OpenAIProvider,
+    "stub": StubProvider,
+}
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def _build_provider(name):
+    config = settings.AI_PROVIDERS.get(name)
+    if config is None:
+        raise ValueError(f"Unknown AI provider: {name!r}")
+    backend = BACKENDS[config["BACKEND"]]
+    options = {key.lower(): value for key, value in config.items() if key != "BACKEND"}
+    return backend(name, **options)
+
+
+def get_provider(stage=None):
+    """
+    Returns the provider for a pipeline stage (or the default provider).
+    Instances are shared process-wide, so their rate limits apply to every
+    request and worker thread together.
+    """
+    name = settings.AI_STAGE_PROVIDERS.get(stage) or settings.AI_PROVIDER
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(name)
+            if provider is None:
+                provider = _providers[name] = _build_provider(name)
+    return provider
+
+
+@receiver(setting_changed)
+def _reset_providers(setting, **kwargs):
+    if setting in ("AI_PROVIDERS", "AI_PROVIDER", "AI_STAGE_PROVIDERS"):
+        _providers.clear()
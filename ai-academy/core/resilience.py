@@ -0,0 +1,218 @@
+import time
+import random
+import threading
+from collections import Counter
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+
+# core/resilience.py
+
+# ==============================================================================
+#  RETRIES, BACKOFF AND CIRCUIT BREAKERS FOR PROVIDER CALLS
+# ==============================================================================
+# Gemini, OpenAI and YouTube calls go through a ResiliencePolicy:
+#
+#   - transient failures (timeouts, connection errors, 408/429/5xx) are
+#     retried with jittered exponential backoff, waiting at least as long as
+#     the provider's Retry-After says;
+#   - a 429 also pauses the provider's other callers (via `on_throttle`), so
+#     parallel pipeline threads back off together instead of piling on;
+#   - after BREAKER_FAILURES calls in a row fail, the provider's circuit
+#     opens and calls fail fast with CircuitOpenError for BREAKER_RESET
+#     seconds; then one trial call decides whether it closes again.
+#
+# Everything is counted per provider in `counters` (see snapshot()).
+# Configured with settings.AI_RESILIENCE.
+
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+# Exception class names that mean the call never got a proper answer.
+_TRANSIENT_NAMES = frozenset({
+    "APIConnectionError", "APITimeoutError", "DeadlineExceeded", "ServiceUnavailable",
+    "InternalServerError", "ResourceExhausted", "TooManyRequests", "RateLimitError",
+    "ServerNotFoundError", "RemoteDisconnected",
+})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def count(provider, event, amount=1):
+    with _counters_lock:
+        _counters[(provider, event)] += amount
+
+
+def snapshot():
+    """Returns {(provider, event): count} for calls, successes, failures, retries, throttled, timeouts, rejected."""
+    with _counters_lock:
+        return dict(_counters)
+
+
+def reset_counters():
+    with _counters_lock:
+        _counters.clear()
+
+
+def status_code(exc):
+    """The HTTP status of a provider exception, if it has one."""
+    for attr in ("status_code", "code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    resp = getattr(exc, "resp", None)  # googleapiclient.errors.HttpError
+    if resp is not None and isinstance(getattr(resp, "status", None), int):
+        return resp.status
+    return None
+
+
+def retry_after(exc):
+    """Seconds the provider asked us to wait (Retry-After), or None."""
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        for holder in (getattr(getattr(exc, "response", None), "headers", None), getattr(exc, "resp", None)):
+            if holder is not None and hasattr(holder, "get"):
+                value = holder.get("retry-after") or holder.get("Retry-After")
+                if value is not None:
+                    break
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        try:
+            return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def is_timeout(exc):
+    return isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__ or type(exc).__name__ == "DeadlineExceeded"
+
+
+def is_transient(exc):
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (TimeoutError, ConnectionError)) or type(exc).__name__ in _TRANSIENT_NAMES:
+        return True
+    return status_code(exc) in RETRYABLE_STATUS
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        """Whether a call may go ahead. While half-open, only one trial call is let through."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider):
+    """The process-wide circuit breaker for `provider`."""
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(provider)
+            if breaker is None:
+                config = settings.AI_RESILIENCE
+                breaker = _breakers[provider] = CircuitBreaker(config['BREAKER_FAILURES'], config['BREAKER_RESET'])
+    return breaker
+
+
+class ResiliencePolicy:
+    """
+    Calls a provider with retries and its circuit breaker. `on_throttle(seconds)`,
+    if given, is told how long the provider asked callers to back off after a 429.
+    """
+
+    def __init__(self, provider, max_attempts=None, base_delay=None, max_delay=None,
+                 breaker=None, on_throttle=None, sleep=time.sleep):
+        config = settings.AI_RESILIENCE
+        self.provider = provider
+        self.max_attempts = max(1, max_attempts if max_attempts is not None else config['MAX_ATTEMPTS'])
+        self.base_delay = base_delay if base_delay is not None else config['BASE_DELAY']
+        self.max_delay = max_delay if max_delay is not None else config['MAX_DELAY']
+        self.breaker = breaker or get_breaker(provider)
+        self.on_throttle = on_throttle
+        self.sleep = sleep
+
+    def backoff(self, attempt, exc):
+        """Full-jitter exponential backoff, but never shorter than Retry-After."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        wait = retry_after(exc)
+        return max(delay, min(wait, self.max_delay)) if wait is not None else delay
+
+    def call(self, fn, *args, **kwargs):
+        for attempt in range(self.max_attempts):
+            if not self.breaker.allow():
+                count(self.provider, "rejected")
+                raise CircuitOpenError(f"{self.provider} is unavailable (circuit open)")
+
+            count(self.provider, "calls")
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                transient = is_transient(exc)
+                if is_timeout(exc):
+                    count(self.provider, "timeouts")
+                if transient:
+                    self.breaker.record_failure()
+                else:
+                    # The provider answered; the request itself was bad.
+                    self.breaker.record_success()
+                count(self.provider, "failures")
+                if not transient or attempt == self.max_attempts - 1:
+                    raise
+
+                delay = self.backoff(attempt, exc)
+                if status_code(exc) == 429:
+                    count(self.provider, "throttled")
+                    if self.on_throttle is not None:
+                        self.on_throttle(delay)
+                count(self.provider, "retries")
+                print(f"   -> {self.provider} call failed ({type(exc).__name__}: {exc}); "
+                      f"retry {attempt + 1}/{self.max_attempts - 1} in {delay:.1f}s")
+                self.sleep(delay)
+            else:
+                self.breaker.record_success()
+                count(self.provider, "successes")
+                return result
@@ -0,0 +1,203 @@
+import re
+
+from django.db import connection, transaction
+
+from .compaction import strip_html
+from .models import Course, Module, Lesson, Question, SearchDocument
+
+# core/search.py
+
+# ==============================================================================
+#  FULL-TEXT SEARCH
+# ==============================================================================
+# Every course, module, lesson and question has one SearchDocument row with
+# its plain text (lesson HTML stripped). The rows are written on save (see
+# core/signals.py and CourseGraphWriter.save()) and indexed by migration
+# 0012: a GIN index on a weighted tsvector in Postgres, an FTS5 table in
+# SQLite. Queries only ever touch the index and the matching rows, so their
+# cost follows the number of hits, not the size of the library.
+
+# Must match the expression of the GIN index in migration 0012.
+_POSTGRES_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(d.title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(d.body, '')), 'B')"
+)
+_TERM = re.compile(r"\w+", re.UNICODE)
+_MAX_TERMS = 16
+
+
+# ==============================================================================
+#  INDEXING
+# ==============================================================================
+
+def _question_body(question):
+    options = question.options if isinstance(question.options, list) else []
+    return "\n".join([question.question_text or ""] + [str(o) for o in options])
+
+
+def document_for(instance, course_id):
+    """Returns the unsaved SearchDocument for a course, module, lesson or question."""
+    Kind = SearchDocument.Kind
+    if isinstance(instance, Course):
+        kind, title, body = Kind.COURSE, instance.title, ""
+    elif isinstance(instance, Module):
+        kind, title, body = Kind.MODULE, instance.title, ""
+    elif isinstance(instance, Lesson):
+        kind, title, body = Kind.LESSON, instance.title, strip_html(instance.content)
+    elif isinstance(instance, Question):
+        kind, title, body = Kind.QUESTION, "", _question_body(instance)
+    else:
+        return None
+    return SearchDocument(
+        kind=kind, object_id=instance.pk, course_id=course_id,
+        title=(title or "")[:255], body=body or "",
+    )
+
+
+def index_documents(documents):
+    """Inserts or refreshes SearchDocuments with a single upsert."""
+    if documents:
+        SearchDocument.objects.bulk_create(
+            documents, update_conflicts=True, unique_fields=['kind', 'object_id'],
+            update_fields=['course', 'title', 'body', 'updated_at'],
+        )
+
+
+def remove_document(instance):
+    document = document_for(instance, None)
+    if document is not None:
+        SearchDocument.objects.filter(kind=document.kind, object_id=instance.pk).delete()
+
+
+def rebuild_index():
+    """Reindexes every course from scratch. Returns the number of documents."""
+    documents = [document_for(c, c.pk) for c in Course.objects.all()]
+    documents += [document_for(m, m.course_id) for m in Module.objects.all()]
+    documents += [
+        document_for(l, l.module.course_id)
+        for l in Lesson.objects.select_related('module').only('title', 'content', 'module__course_id')
+    ]
+    documents += [
+        document_for(q, q.quiz.module.course_id)
+        for q in Question.objects.select_related('quiz__module')
+    ]
+    # One transaction, so searches never see an empty or half-built index
+    # and a failure part-way leaves the old one in place.
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for start in range(0, len(documents), 500):
+            index_documents(documents[start:start + 500])
+    return len(documents)
+
+
+# ==============================================================================
+#  QUERYING
+# ==============================================================================
+
+def _terms(query):
+    return _TERM.findall(query or "")[:_MAX_TERMS]
+
+
+class SearchResults:
+    """
+    Lazy, sliceable result set for a search, so DRF's paginators can use it
+    like a queryset: count() runs one COUNT over the index, and slicing runs
+    one ranked query for just that page.
+    """
+
+    def __init__(self, query, user):
+        self.terms = _terms(query)
+        self.user = user
+        self._count = None
+
+    def _visible_courses(self):
+        return Course.objects.visible_to(self.user).values('id').query.sql_with_params()
+
+    def _match(self):
+        """Returns (FROM/WHERE sql, params, rank expression, snippet expression)."""
+        visible_sql, visible_params = self._visible_courses()
+        vendor = connection.vendor
+
+        if vendor == 'postgresql':
+            sql = (
+                "FROM core_searchdocument d JOIN core_course c ON c.id = d.course_id "
+                "CROSS JOIN websearch_to_tsquery('english', %s) q "
+                f"WHERE ({_POSTGRES_VECTOR}) @@ q AND d.course_id IN ({visible_sql})"
+            )
+            return (
+                sql, [" ".join(self.terms), *visible_params],
+                f"ts_rank({_POSTGRES_VECTOR}, q)",
+                "ts_headline('english', d.body, q, 'MaxWords=30, MinWords=10, StartSel=<mark>, StopSel=</mark>')",
+            )
+
+        if vendor == 'sqlite':
+            # Each term quoted (no FTS5 syntax from users) and prefix-matched.
+            match = " ".join(f'"{term}"*' for term in self.terms)
+            sql = (
+                "FROM core_searchdocument_fts JOIN core_searchdocument d ON d.id = core_searchdocument_fts.rowid "
+                "JOIN core_course c ON c.id = d.course_id "
+                f"WHERE core_searchdocument_fts MATCH %s AND d.course_id IN ({visible_sql})"
+            )
+            return (
+                sql, [match, *visible_params],
+                # bm25() is lower for better matches; titles count ten times as much.
+                "-bm25(core_searchdocument_fts, 10.0, 1.0)",
+                "snippet(core_searchdocument_fts, 1, '<mark>', '</mark>', '...', 24)",
+            )
+
+        # Other databases: unindexed substring match on every term.
+        conditions = " AND ".join("(d.title LIKE %s OR d.body LIKE %s)" for _ in self.terms)
+        params = [f"%{term}%" for term in self.terms for _ in range(2)]
+        return (
+            "FROM core_searchdocument d JOIN core_course c ON c.id = d.course_id "
+            f"WHERE {conditions} AND d.course_id IN ({visible_sql})",
+            [*params, *visible_params], "0", "substr(d.body, 1, 200)",
+        )
+
+    def count(self):
+        if self._count is None:
+            if not self.terms:
+                self._count = 0
+            else:
+                sql, params, _, _ = self._match()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"SELECT COUNT(*) {sql}", params)
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset = index.start or 0
+        limit = (index.stop if index.stop is not None else self.count()) - offset
+        if not self.terms or limit <= 0:
+            return []
+
+        sql, params, rank, snippet = self._match()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT d.kind, d.object_id, d.course_id, c.title, d.title, {snippet} "
+                f"{sql} "
+                f"ORDER BY {rank} DESC, d.id LIMIT %s OFFSET %s",
+                [*params, limit, offset],
+            )
+            rows = cursor.fetchall()
+
+        return [
+            {
+                "kind": kind,
+                "id": object_id,
+                "course_id": course_id,
+                "course_title": course_title,
+                "title": title,
+                "snippet": snippet_text or "",
+            }
+            for kind, object_id, course_id, course_title, title, snippet_text in rows
+        ]
+
+
+def search(query, user):
+    return SearchResults(query, user)
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import Course, Module, Lesson, Profile, Quiz, Question
+from .progress import percent_complete
+from .models import Course, Module, Lesson, Profile, Quiz, Question, GenerationJob, Attempt
 
 # =====================================================================
 #  AUTHENTICATION & USER SERIALIZERS
@@ -87,6 +88,37 @@ class ModuleSerializer(serializers.ModelSerializer):
         # Added 'module_type' and 'quiz'
         fields = ['id', 'title', 'order', 'module_type', 'lessons', 'quiz']
 
+class CourseSummarySerializer(serializers.ModelSerializer):
+    """
+    Lightweight course card for the catalog list. No lesson bodies or
+    questions; the counts come from `Course.objects.with_counts()`.
+    """
+    creator_username = serializers.CharField(source='created_by.username', read_only=True)
+    module_count = serializers.IntegerField(read_only=True)
+    lesson_count = serializers.IntegerField(read_only=True)
+    quiz_count = serializers.IntegerField(read_only=True)
+    # From `Course.objects.with_progress(user)`
+    completed_lesson_count = serializers.IntegerField(read_only=True, default=0)
+    percent_complete = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Course
+        fields = [
+            'id',
+            'title',
+            'status',
+            'creator_username',
+            'created_at',
+            'module_count',
+            'lesson_count',
+            'quiz_count',
+            'completed_lesson_count',
+            'percent_complete',
+        ]
+
+    def get_percent_complete(self, obj):
+        return percent_complete(getattr(obj, 'completed_lesson_count', 0), getattr(obj, 'lesson_count', 0))
+
 class CourseDetailSerializer(serializers.ModelSerializer):
     """
     The main serializer for the entire course structure.
@@ -105,6 +137,49 @@ class CourseDetailSerializer(serializers.ModelSerializer):
             'modules'
         ]
 
+# =====================================================================
+#  STUDENT SERIALIZERS (No answers; quizzes are graded on the server)
+# =====================================================================
+
+class StudentQuestionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Question
+        fields = ['id', 'question_text', 'options', 'order']
+
+class StudentQuizSerializer(QuizSerializer):
+    questions = StudentQuestionSerializer(many=True, read_only=True)
+
+class StudentModuleSerializer(ModuleSerializer):
+    quiz = StudentQuizSerializer(read_only=True)
+
+class StudentCourseDetailSerializer(CourseDetailSerializer):
+    """Same tree as CourseDetailSerializer, minus every correct_answer."""
+    modules = StudentModuleSerializer(many=True, read_only=True)
+
+class AttemptSerializer(serializers.ModelSerializer):
+    """
+    A graded attempt. The per-question results come from `record_attempt()`
+    and say only whether each answer was right: the correct answers are
+    never sent, since attempts are unlimited and would give the key away.
+    """
+    attempt_id = serializers.IntegerField(source='id', read_only=True)
+    quiz_id = serializers.IntegerField(read_only=True)
+    results = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Attempt
+        fields = ['attempt_id', 'quiz_id', 'score', 'total', 'submitted_at', 'results']
+
+    def get_results(self, obj):
+        return [
+            {
+                'question_id': question_id,
+                'selected_answer': selected,
+                'is_correct': is_correct,
+            }
+            for question_id, selected, is_correct in getattr(obj, 'results', [])
+        ]
+
 # =====================================================================
 #  WRITEABLE SERIALIZERS (For Admin Editor)
 # =====================================================================
@@ -143,4 +218,31 @@ class QuestionWriteSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Question
-        fields = ['id', 'quiz', 'question_text', 'options', 'correct_answer', 'order']
\ No newline at end of file
+        fields = ['id', 'quiz', 'question_text', 'options', 'correct_answer', 'order']
+
+# =====================================================================
+#  GENERATION JOBS
+# =====================================================================
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    """
+    Read-only status of a background course generation job.
+    The browser polls this until `status` is SUCCEEDED or FAILED.
+    """
+    job_id = serializers.IntegerField(source='id', read_only=True)
+    course_id = serializers.PrimaryKeyRelatedField(source='course', read_only=True)
+
+    class Meta:
+        model = GenerationJob
+        fields = [
+            'job_id',
+            'status',
+            'stage',
+            'percent',
+            'course_id',
+            'error',
+            'created_at',
+            'started_at',
+            'finished_at',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .course_cache import invalidate_course
+from .models import Course, Module, Lesson, Quiz, Question
+from .search import document_for, index_documents, remove_document
+
+# core/signals.py
+
+# ==============================================================================
+#  COURSE CONTENT VERSIONING AND SEARCH INDEXING
+# ==============================================================================
+# Any save or delete inside a course bumps its content version, which
+# invalidates the cached course tree. bulk_create() and update() do not send
+# these signals; see CourseGraphWriter.save(). The version also keys the
+# answer maps used for grading (see core/grading.py). The search index entry
+# of the saved or deleted item is refreshed (see core/search.py).
+
+
+def _course_id_for(instance):
+    if isinstance(instance, Course):
+        return instance.pk
+    if isinstance(instance, Module):
+        return instance.course_id
+    if isinstance(instance, (Lesson, Quiz)):
+        return Module.objects.filter(pk=instance.module_id).values_list('course_id', flat=True).first()
+    if isinstance(instance, Question):
+        return Module.objects.filter(quiz__pk=instance.quiz_id).values_list('course_id', flat=True).first()
+    return None
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Module)
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Quiz)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Module)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_delete, sender=Question)
+def bump_course_version(sender, instance, **kwargs):
+    course_id = _course_id_for(instance)
+    if course_id is not None:
+        invalidate_course(course_id)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Module)
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Question)
+def index_search_document(sender, instance, **kwargs):
+    course_id = _course_id_for(instance)
+    if course_id is not None:
+        index_documents([document_for(instance, course_id)])
+
+
+@receiver(post_delete, sender=Module)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Question)
+def remove_search_document(sender, instance, **kwargs):
+    # Course deletes take their documents with them (foreign key cascade).
+    remove_document(instance)
@@ -0,0 +1,202 @@
+import hashlib
+import random
+import re
+import threading
+
+from .compaction import strip_html
+
+# core/similarity.py
+
+# ==============================================================================
+#  DUPLICATE LESSONS AND VIDEOS ACROSS A COURSE
+# ==============================================================================
+# Every lesson is planned and written on its own, so modules with
+# overlapping topics ("Python Lists" / "Working with Lists in Python") get
+# near-identical lessons, and lessons keep landing on the same top video.
+# A CourseSimilarityIndex is shared by one generation run:
+#
+#   - planned lesson titles that repeat an earlier lesson are dropped before
+#     any search or LLM call is made for them;
+#   - written lessons whose text nearly repeats an earlier lesson are flagged;
+#   - videos already used in the course are hidden from later lessons'
+#     options and never picked twice while an unused candidate is left.
+#
+# Similarity is Jaccard over word sets (titles) and word 3-grams (lesson
+# text), looked up through MinHash signatures with LSH banding, so each
+# check only compares against the few lessons likely to match.
+
+TITLE_THRESHOLD = 0.75
+TEXT_THRESHOLD = 0.5
+# Texts shorter than this (placeholders, failed generations) are not compared.
+MIN_TEXT_SHINGLES = 20
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+_ROWS = NUM_PERMUTATIONS // BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#]*")
+_STOPWORDS = frozenset("""
+a an and are as at be by for from how in into is it its of on or the to with your you using
+introduction intro basics overview understanding working lesson part getting started
+""".split())
+
+
+def _stem(word):
+    # Just enough to match "list"/"lists" and "loop"/"loops".
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def title_features(title):
+    return {_stem(w) for w in _WORD.findall((title or "").lower()) if w not in _STOPWORDS}
+
+
+def text_features(html):
+    words = _WORD.findall(strip_html(html).lower())
+    return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def _hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash(features):
+    hashes = [_hash(f) for f in features]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+class MinHashIndex:
+    """
+    Feature sets indexed by MinHash bands. find() returns the key of an
+    indexed set whose exact Jaccard similarity is at least `threshold`.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self._features = {}
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self._features)
+
+    def _bands(self, features):
+        signature = minhash(features)
+        return [(band, tuple(signature[band * _ROWS:(band + 1) * _ROWS])) for band in range(BANDS)]
+
+    def find(self, features, bands=None):
+        if not features:
+            return None
+        candidates = set()
+        for band in bands or self._bands(features):
+            candidates.update(self._buckets.get(band, ()))
+        best, best_score = None, self.threshold
+        for key in candidates:
+            score = jaccard(features, self._features[key])
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def add(self, key, features, bands=None):
+        if not features:
+            return
+        self._features[key] = features
+        for band in bands or self._bands(features):
+            self._buckets.setdefault(band, []).append(key)
+
+    def find_or_add(self, key, features):
+        """Returns the matching key if there is one; otherwise indexes `features` under `key`."""
+        bands = self._bands(features) if features else None
+        match = self.find(features, bands)
+        if match is None:
+            self.add(key, features, bands)
+        return match
+
+
+class CourseSimilarityIndex:
+    """Lesson titles, lesson texts and video ids already in one course. Thread-safe."""
+
+    def __init__(self):
+        self._titles = MinHashIndex(TITLE_THRESHOLD)
+        self._texts = MinHashIndex(TEXT_THRESHOLD)
+        self._videos = set()
+        self._lock = threading.Lock()
+        self.skipped_titles = 0
+        self.duplicate_texts = 0
+
+    @classmethod
+    def for_course(cls, course):
+        """An index seeded with the lessons a course already has, for adding a module to it."""
+        from .models import Lesson
+
+        index = cls()
+        lessons = Lesson.objects.filter(module__course=course).order_by('module__order', 'order')
+        for title, content, video_id in lessons.values_list('title', 'content', 'video_id'):
+            index._titles.add(title, title_features(title))
+            features = text_features(content)
+            if len(features) >= MIN_TEXT_SHINGLES:
+                index._texts.add(title, features)
+            if video_id:
+                index._videos.add(video_id)
+        return index
+
+    def filter_lessons(self, lesson_titles):
+        """
+        Drops planned lessons ({"title": ...}) that repeat a lesson already in
+        the course, keeping at least the first one so no module ends up empty.
+        """
+        kept, skipped = [], []
+        with self._lock:
+            for lesson in lesson_titles:
+                title = lesson.get("title", "")
+                match = self._titles.find_or_add(title, title_features(title))
+                if match is None:
+                    kept.append(lesson)
+                else:
+                    skipped.append((lesson, match))
+            if not kept and skipped:
+                kept.append(skipped.pop(0)[0])
+            self.skipped_titles += len(skipped)
+
+        for lesson, match in skipped:
+            print(f"   -> Skipping lesson '{lesson.get('title')}': already covered by '{match}'.")
+        return kept
+
+    def check_lesson_text(self, title, html):
+        """Indexes a written lesson. Returns the title of an earlier lesson it nearly repeats, or None."""
+        features = text_features(html)
+        if len(features) < MIN_TEXT_SHINGLES:
+            return None
+        with self._lock:
+            match = self._texts.find_or_add(title, features)
+            if match is not None:
+                self.duplicate_texts += 1
+        return match
+
+    def unused_videos(self, video_candidates):
+        """The candidates not used yet, or all of them if every one has been used."""
+        with self._lock:
+            unused = [vid for vid in video_candidates or [] if vid["video_id"] not in self._videos]
+        return unused or video_candidates
+
+    def claim_video(self, video_candidates, video_id):
+        """
+        Records the video a lesson uses. If another lesson claimed it in the
+        meantime, switches to the first unused candidate instead.
+        """
+        with self._lock:
+            if video_id and video_id not in self._videos:
+                self._videos.add(video_id)
+                return video_id
+            for vid in video_candidates or []:
+                if vid["video_id"] not in self._videos:
+                    self._videos.add(vid["video_id"])
+                    return vid["video_id"]
+        return video_id
@@ -0,0 +1,183 @@
+import json
+import queue
+import threading
+import traceback
+from contextlib import nullcontext
+
+from django.db import connections
+from django.db.models import F
+from rest_framework.renderers import BaseRenderer
+
+from .course_cache import invalidate_course
+from .llm_cache import bypass_llm_cache
+from .metrics import generation_run
+from .models import Course, Module
+from .pipeline import (
+    CourseGraphWriter, GenerationCancelled, cancel_on, generate_course_content, plan_course_layout,
+)
+
+# core/streaming.py
+
+# ==============================================================================
+#  STREAMING COURSE GENERATION (SERVER-SENT EVENTS)
+# ==============================================================================
+# The pipeline runs in a background thread and reports each result as soon
+# as it is ready. The response generator, running in the request thread,
+# saves every finished module right away and forwards each step to the
+# browser as an SSE event:
+#
+#   outline      -> course created, module titles known
+#   lesson_plan  -> lesson titles for one module
+#   lesson       -> one lesson written
+#   module       -> a content module saved
+#   quiz         -> an intermediate or final test saved
+#   progress     -> stage / percent, same as the job endpoint
+#   complete     -> everything saved
+#   error        -> generation failed (modules already saved are kept)
+#
+# If the client disconnects, the generator is closed and the pipeline is
+# told to stop: provider calls already running finish, nothing new starts.
+
+_FINISHED = "_finished"
+_CLOSED = "_closed"
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets SSE clients (Accept: text/event-stream) through content negotiation.
+    Only plain responses such as validation errors go through here; they are
+    sent as a single `error` event.
+    """
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return sse_event("error", data).encode(self.charset)
+
+
+def _run_pipeline(events, params, cancelled):
+    try:
+        with generation_run("stream"), cancel_on(cancelled), \
+                bypass_llm_cache() if params.get("bypass_cache") else nullcontext():
+            generate_course_content(
+                params["prompt"],
+                params["num_content_modules"],
+                params["num_lessons_per_module"],
+                params["num_test_modules"],
+                progress=lambda stage, percent: events.put(("progress", {"stage": stage, "percent": percent})),
+                on_event=lambda name, payload: events.put((name, payload)),
+            )
+        events.put((_FINISHED, None))
+    except GenerationCancelled:
+        print("Streamed course generation stopped: the client disconnected.")
+    except Exception as e:
+        traceback.print_exc()
+        events.put(("error", {"error": str(e)}))
+    finally:
+        connections.close_all()
+        events.put((_CLOSED, None))
+
+
+def _course_order(planned, skipped):
+    """A planned module order, closed up over the slots of skipped quizzes."""
+    return planned - sum(1 for slot in skipped if slot < planned)
+
+
+def stream_course_generation(user, params):
+    """
+    Generator of SSE messages for one course generation run. Saves the
+    course module by module, so partial results are visible straight away.
+    Closing the generator (the client went away) cancels the run.
+    """
+    events = queue.Queue()
+    cancelled = threading.Event()
+    threading.Thread(target=_run_pipeline, args=(events, params, cancelled), name="ai-stream", daemon=True).start()
+    try:
+        yield from _stream_events(events, user, params)
+    finally:
+        cancelled.set()
+
+
+def _stream_events(events, user, params):
+    course = None
+    content_orders, test_orders, ultimate_order = [], [], None
+    # Planned slots of quizzes that were skipped. Orders are worked out as
+    # each module is saved, so a skipped quiz leaves no gap in the course.
+    skipped = []
+
+    while True:
+        event, payload = events.get()
+
+        if event == _CLOSED:
+            return
+
+        if event == "outline":
+            course = Course.objects.create(title=params["prompt"], created_by=user)
+            content_orders, test_orders, ultimate_order = plan_course_layout(
+                len(payload["modules"]), params["num_test_modules"]
+            )
+            yield sse_event("outline", {"course_id": course.pk, **payload})
+
+        elif event == "module":
+            module_data = payload["module"]
+            order = _course_order(content_orders[payload["module_index"]], skipped)
+            writer = CourseGraphWriter(course, next_order=order)
+            module = writer.add_content_module(module_data["title"], module_data["lessons"])
+            writer.save()
+            yield sse_event("module", {
+                "module_index": payload["module_index"],
+                "module_id": module.pk,
+                "title": module.title,
+                "order": module.order,
+                "lessons": [lesson.get("title") for lesson in module_data["lessons"]],
+            })
+
+        elif event in ("quiz", "ultimate_quiz"):
+            quiz_data = payload[event]
+            slot = test_orders[payload["quiz_index"]] if event == "quiz" else ultimate_order
+            if quiz_data is None:
+                # Close the gap under modules that were saved after it.
+                Module.objects.filter(course=course, order__gt=_course_order(slot, skipped)).update(order=F("order") - 1)
+                invalidate_course(course.pk)
+                skipped.append(slot)
+                continue
+            if event == "quiz":
+                title = quiz_data.get("quiz_title", "Module Test")
+            else:
+                title = quiz_data.get("quiz_title", "Ultimate Final Test")
+            writer = CourseGraphWriter(course, next_order=_course_order(slot, skipped))
+            module = writer.add_assessment_module(title, quiz_data)
+            writer.save()
+            yield sse_event("quiz", {
+                "final": event == "ultimate_quiz",
+                "module_id": module.pk,
+                "title": title,
+                "order": module.order,
+                "num_questions": len(quiz_data.get("questions", [])),
+            })
+
+        elif event == "lesson":
+            lesson = payload["lesson"]
+            yield sse_event("lesson", {
+                "module_index": payload["module_index"],
+                "lesson_index": payload["lesson_index"],
+                "title": lesson.get("title"),
+                "video_id": lesson.get("video_id"),
+            })
+
+        elif event == _FINISHED:
+            print("🎉 Course generation complete!")
+            yield sse_event("complete", {"course_id": course.pk})
+
+        elif event == "error":
+            yield sse_event("error", {**payload, "course_id": course.pk if course else None})
+
+        else:
+            yield sse_event(event, payload)
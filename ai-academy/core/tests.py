@@ -1,3 +1,1582 @@
-from django.test import TestCase
+import os
+import json
+import asyncio
+import time
+import tempfile
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+from concurrent.futures import Future
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.models import F, QuerySet
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .progress import ProgressBuffer, progress_buffer
+from .course_cache import invalidate_course
+from .profiling import QueryProfileAssertions, normalize_sql, profile
+from .compaction import compact_course_content, estimate_tokens, strip_html, summarize_module
+from .jsonextract import StreamingJSONExtractor, extract_json_from_text
+from .similarity import CourseSimilarityIndex
+from .search import rebuild_index
+from .providers import RateLimiter, get_provider
+from . import metrics
+from .resilience import CircuitBreaker, CircuitOpenError, ResiliencePolicy, reset_counters, snapshot
+from .management.commands.benchmark_api import compare, run_benchmark, seed_data
+from .management.commands.benchmark_startup import measure_startup, provider_imports
+from .llm_cache import DatabaseBackend, FileSystemBackend, LLMResponseCache, bypass_llm_cache
+from .models import (
+    Profile, Course, Module, Lesson, Quiz, Question, LLMResponse, Attempt, Answer, LessonProgress, SearchDocument,
+    GenerationJob, GenerationCheckpoint,
+)
+from .executor import PipelineExecutor
+from .checkpoints import CheckpointStore, completed_future
+from .jobs import claim_next_job, enqueue_course_generation, resume_job, run_job, update_job_progress
+from .pipeline import (
+    CourseGraphWriter, generate_course_content, generate_module_lessons, generate_quiz_from_content, run_llm_generation,
+    save_course_pipeline, search_youtube,
+)
+
+
+def make_course(user, num_modules=2, num_lessons=2, num_questions=2, status=Course.Status.PUBLISHED):
+    """Creates a course with content modules plus one assessment module."""
+    course = Course.objects.create(title="Sample Course", created_by=user, status=status)
+    for i in range(num_modules):
+        module = Module.objects.create(course=course, title=f"Module {i + 1}", order=i + 1)
+        for j in range(num_lessons):
+            Lesson.objects.create(module=module, title=f"Lesson {j + 1}", content="<p>Body</p>", order=j + 1)
+
+    test_module = Module.objects.create(
+        course=course, title="Final Test", order=num_modules + 1, module_type=Module.ModuleType.ASSESSMENT
+    )
+    quiz = Quiz.objects.create(module=test_module, title="Final Test")
+    for k in range(num_questions):
+        Question.objects.create(
+            quiz=quiz, question_text=f"Question {k + 1}?", options=["A", "B"], correct_answer="A", order=k + 1
+        )
+    return course
+
+
+class CourseQueryCountTests(TestCase):
+    """The course endpoints must not issue a query per course, module or quiz."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="student", password="pass")
+        Profile.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_course_list_query_count_is_constant(self):
+        make_course(self.user, num_modules=1)
+        baseline = self.count_queries("/api/courses/")
+
+        for _ in range(5):
+            make_course(self.user, num_modules=4, num_lessons=3)
+        self.assertEqual(self.count_queries("/api/courses/"), baseline)
+
+    def test_course_detail_query_count_is_constant(self):
+        small = make_course(self.user, num_modules=1, num_lessons=1)
+        large = make_course(self.user, num_modules=8, num_lessons=5, num_questions=10)
+
+        self.assertEqual(
+            self.count_queries(f"/api/courses/{large.pk}/"),
+            self.count_queries(f"/api/courses/{small.pk}/"),
+        )
+
+    def test_course_detail_returns_nested_tree(self):
+        course = make_course(self.user, num_modules=2, num_lessons=3, num_questions=4)
+        data = self.client.get(f"/api/courses/{course.pk}/").data
+
+        self.assertEqual(data["creator_username"], "student")
+        self.assertEqual([m["order"] for m in data["modules"]], [1, 2, 3])
+        self.assertEqual(len(data["modules"][0]["lessons"]), 3)
+        self.assertIsNone(data["modules"][0]["quiz"])
+        self.assertEqual(len(data["modules"][2]["quiz"]["questions"]), 4)
+
+
+PROFILING_ON = {'ENABLED': True, 'PATH_PREFIX': '/api/', 'SAMPLE_RATE': 1.0, 'N_PLUS_ONE_THRESHOLD': 3}
+
+
+class RequestProfilingTests(QueryProfileAssertions, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="admin", password="pass")
+        Profile.objects.create(user=self.user, role="ADMIN")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.course = make_course(self.user, num_modules=4, num_lessons=3)
+
+    def test_repeated_query_shapes_are_n_plus_one_suspects(self):
+        self.assertEqual(
+            normalize_sql('SELECT * FROM "core_lesson" WHERE "id" IN (%s, %s, %s) LIMIT 21'),
+            normalize_sql('SELECT * FROM  "core_lesson" WHERE "id" IN (%s, %s) LIMIT 21'),
+        )
+        with self.assertRaisesMessage(AssertionError, "N+1 query suspects"):
+            with self.assertNoNPlusOne():
+                for module in Module.objects.all():
+                    module.course.title
+
+    def test_course_endpoints_have_no_n_plus_one(self):
+        lesson = Lesson.objects.filter(module__course=self.course).first()
+        for url in ("/api/courses/", f"/api/courses/{self.course.pk}/", f"/api/lessons/{lesson.pk}/"):
+            with self.subTest(url=url), self.assertNoNPlusOne(max_queries=10):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(PROFILING=PROFILING_ON, DEBUG=True)
+    def test_middleware_reports_in_headers_in_debug(self):
+        response = self.client.get(f"/api/courses/{self.course.pk}/")
+        self.assertRegex(response["X-Profile"], r"^queries=\d+; db=[\d.]+ms; serializer=[\d.]+ms; "
+                                                r"total=[\d.]+ms; size=\d+; n\+1=0$")
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertNotIn("X-Profile-N-Plus-One", response)
+
+    @override_settings(PROFILING=PROFILING_ON, DEBUG=False)
+    def test_middleware_logs_sampled_requests_in_production(self):
+        with self.assertLogs("core.profiling", "INFO") as logs:
+            response = self.client.get("/api/courses/")
+        self.assertNotIn("X-Profile", response)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record["path"], record["status"]), ("/api/courses/", 200))
+        self.assertEqual(record["response_bytes"], len(response.content))
+        self.assertGreater(record["queries"], 0)
+        self.assertGreater(record["serializer_ms"], 0)
+
+
+class CourseTreeCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username="admin", password="pass")
+        Profile.objects.create(user=self.admin, role=Profile.Role.ADMIN)
+        self.student = User.objects.create_user(username="student", password="pass")
+        Profile.objects.create(user=self.student)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_hot_course_is_served_from_one_course_row_query(self):
+        course = make_course(self.admin, num_modules=3)
+        url = f"/api/courses/{course.pk}/"
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["modules"]), 4)
+        course_queries = [q["sql"] for q in ctx.captured_queries if "core_" in q["sql"]]
+        self.assertEqual(len(course_queries), 1)
+        self.assertIn('FROM "core_course"', course_queries[0])
+
+    def test_changes_from_other_processes_are_seen(self):
+        # update() sends no signals and, like a write in another process,
+        # leaves this process's cache untouched.
+        course = make_course(self.admin, num_modules=1, num_lessons=1)
+        url = f"/api/courses/{course.pk}/"
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        Lesson.objects.filter(module__course=course).update(title="Renamed")
+        Course.objects.filter(pk=course.pk).update(content_version=F("content_version") + 1)
+        self.assertEqual(self.client.get(url).data["modules"][0]["lessons"][0]["title"], "Renamed")
+
+        Course.objects.filter(pk=course.pk).update(status=Course.Status.DRAFT)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_edits_invalidate_the_cached_tree(self):
+        course = make_course(self.admin, num_modules=1, num_lessons=1)
+        url = f"/api/courses/{course.pk}/"
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.filter(module__course=course).get().delete()
+        self.assertEqual(self.client.get(url).data["modules"][0]["lessons"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            writer = CourseGraphWriter(course)
+            writer.add_content_module("Bulk", [{"title": "L", "text_content": "<p>x</p>"}])
+            writer.append()
+        self.assertEqual(self.client.get(url).data["modules"][-1]["title"], "Bulk")
+
+    def test_cached_drafts_stay_hidden_from_students(self):
+        course = make_course(self.admin, status=Course.Status.DRAFT)
+        url = f"/api/courses/{course.pk}/"
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="student", password="pass")
+        Profile.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_course_detail_revalidates_with_etag(self):
+        course = make_course(self.user, num_modules=2)
+        url = f"/api/courses/{course.pk}/"
+        first = self.client.get(url)
+        self.assertIn("Last-Modified", first)
+
+        with CaptureQueriesContext(connection) as ctx:
+            unchanged = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(unchanged.content, b"")
+        self.assertEqual(len([q for q in ctx.captured_queries if "core_" in q["sql"]]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.filter(quiz__module__course=course).first().delete()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+
+    def test_etag_follows_the_database_row(self):
+        # Course.objects.update() bypasses signals, like a write made by
+        # another process whose cache invalidation this process never sees.
+        course = make_course(self.user, num_modules=1)
+        url = f"/api/courses/{course.pk}/"
+        etag = self.client.get(url)["ETag"]
+
+        Course.objects.filter(pk=course.pk).update(content_version=F("content_version") + 1)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+        Course.objects.filter(pk=course.pk).update(status=Course.Status.DRAFT)
+        student = User.objects.create_user(username="other", password="pass")
+        Profile.objects.create(user=student)
+        self.client.force_authenticate(student)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=changed["ETag"]).status_code, 404)
+
+    def test_catalog_revalidates_with_etag(self):
+        course = make_course(self.user, num_modules=1)
+        first = self.client.get("/api/courses/")
+        self.assertEqual(self.client.get("/api/courses/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        Lesson.objects.create(module=course.modules.first(), title="New", content="<p>x</p>", order=9)
+        changed = self.client.get("/api/courses/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data["results"][0]["lesson_count"], 3)
+
+
+class QuizGradingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username="admin", password="pass")
+        Profile.objects.create(user=self.admin, role=Profile.Role.ADMIN)
+        self.student = User.objects.create_user(username="student", password="pass")
+        Profile.objects.create(user=self.student)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def quiz_for(self, course):
+        return Quiz.objects.get(module__course=course)
+
+    def test_students_do_not_receive_correct_answers(self):
+        course = make_course(self.admin)
+        question = self.client.get(f"/api/courses/{course.pk}/").data["modules"][-1]["quiz"]["questions"][0]
+        self.assertNotIn("correct_answer", question)
+
+        self.client.force_authenticate(self.admin)
+        question = self.client.get(f"/api/courses/{course.pk}/").data["modules"][-1]["quiz"]["questions"][0]
+        self.assertEqual(question["correct_answer"], "A")
+
+    def test_submission_is_graded_and_recorded(self):
+        quiz = self.quiz_for(make_course(self.admin, num_questions=3))
+        q1, q2, q3 = quiz.questions.order_by("order")
+        response = self.client.post(
+            f"/api/quizzes/{quiz.pk}/submit/", {"answers": {str(q1.pk): "A", str(q2.pk): "B"}}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["score"], response.data["total"]), (1, 3))
+        self.assertEqual([r["is_correct"] for r in response.data["results"]], [True, False, False])
+        attempt = Attempt.objects.get(pk=response.data["attempt_id"])
+        self.assertEqual(attempt.user, self.student)
+        self.assertEqual(attempt.answers.filter(is_correct=True).count(), 1)
+
+    def test_submit_response_never_contains_correct_answers(self):
+        quiz = self.quiz_for(make_course(self.admin, num_questions=3))
+        q1 = quiz.questions.order_by("order").first()
+        for answers in ({}, {str(q1.pk): "B"}, {str(q1.pk): "A"}):
+            response = self.client.post(f"/api/quizzes/{quiz.pk}/submit/", {"answers": answers}, format="json")
+            self.assertEqual(response.status_code, 201)
+            self.assertNotIn("correct_answer", json.dumps(response.data, default=str))
+            self.assertEqual(set(response.data["results"][0]), {"question_id", "selected_answer", "is_correct"})
+
+    def test_grading_queries_do_not_grow_with_question_count(self):
+        def submit(num_questions):
+            quiz = self.quiz_for(make_course(self.admin, num_questions=num_questions))
+            answers = {str(pk): "A" for pk in quiz.questions.values_list("pk", flat=True)}
+            self.client.post(f"/api/quizzes/{quiz.pk}/submit/", {"answers": answers}, format="json")  # warm the map
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(f"/api/quizzes/{quiz.pk}/submit/", {"answers": answers}, format="json")
+            self.assertEqual(response.data["score"], num_questions)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(submit(30), submit(2))
+
+    def test_bulk_submission_for_a_classroom(self):
+        quiz = self.quiz_for(make_course(self.admin, num_questions=4))
+        question_ids = list(quiz.questions.values_list("pk", flat=True))
+        for i in range(5):
+            User.objects.create_user(username=f"pupil{i}", password="pass")
+        submissions = [
+            {"username": f"pupil{i}", "answers": {str(pk): ("A" if j < i else "B") for j, pk in enumerate(question_ids)}}
+            for i in range(5)
+        ]
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(f"/api/quizzes/{quiz.pk}/submit/bulk/", {"submissions": submissions}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([a["score"] for a in response.data["attempts"]], [0, 1, 2, 3, 4])
+        self.assertEqual(Answer.objects.filter(attempt__quiz=quiz).count(), 20)
+
+        response = self.client.post(
+            f"/api/quizzes/{quiz.pk}/submit/bulk/", {"submissions": [{"username": "nobody", "answers": {}}]}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_malformed_bulk_submissions_are_rejected(self):
+        quiz = self.quiz_for(make_course(self.admin, num_questions=1))
+        self.client.force_authenticate(self.admin)
+        url = f"/api/quizzes/{quiz.pk}/submit/bulk/"
+        for submissions in (
+            [{"username": ["student"], "answers": {}}],
+            [{"username": {"a": 1}, "answers": {}}],
+            [{"answers": {}}],
+            ["student"],
+            [None],
+            "student",
+        ):
+            with self.subTest(submissions=submissions):
+                response = self.client.post(url, {"submissions": submissions}, format="json")
+                self.assertEqual(response.status_code, 400)
+
+    def test_editing_a_question_refreshes_the_answer_map(self):
+        quiz = self.quiz_for(make_course(self.admin, num_questions=1))
+        question = quiz.questions.get()
+        url = f"/api/quizzes/{quiz.pk}/submit/"
+        self.client.post(url, {"answers": {str(question.pk): "B"}}, format="json")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            question.correct_answer = "B"
+            question.save()
+        self.assertEqual(self.client.post(url, {"answers": {str(question.pk): "B"}}, format="json").data["score"], 1)
+
+    def test_answer_changed_by_another_process_is_graded_correctly(self):
+        # update() sends no signals, like an edit saved by another worker
+        # whose cache this process never shares.
+        course = make_course(self.admin, num_questions=1)
+        quiz = self.quiz_for(course)
+        question = quiz.questions.get()
+        url = f"/api/quizzes/{quiz.pk}/submit/"
+        self.assertEqual(self.client.post(url, {"answers": {str(question.pk): "B"}}, format="json").data["score"], 0)
+
+        Question.objects.filter(pk=question.pk).update(correct_answer="B")
+        invalidate_course(course.pk)
+        self.assertEqual(self.client.post(url, {"answers": {str(question.pk): "B"}}, format="json").data["score"], 1)
+
+        cache.clear()
+        self.assertEqual(self.client.post(url, {"answers": {str(question.pk): "B"}}, format="json").data["score"], 1)
+
+
+class LessonProgressTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(username="student", password="pass")
+        Profile.objects.create(user=self.student)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.course = make_course(self.student, num_modules=2, num_lessons=2)
+        self.lessons = list(Lesson.objects.filter(module__course=self.course).order_by("module__order", "order"))
+
+    def test_pings_are_coalesced_into_one_bulk_upsert(self):
+        buffer = ProgressBuffer(max_entries=1000, flush_interval=3600)
+        for second in range(0, 300, 5):
+            for lesson in self.lessons:
+                buffer.record(self.student.pk, lesson.pk, seconds_watched=second)
+        self.assertEqual(buffer.pending_count(), 4)
+        self.assertFalse(LessonProgress.objects.exists())
+
+        # Completions are written through, with the watch time buffered so far.
+        buffer.record(self.student.pk, self.lessons[0].pk, completed=True)
+        self.assertEqual(buffer.pending_count(), 3)
+        self.assertEqual(LessonProgress.objects.get().seconds_watched, 295)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(buffer.flush(), 3)
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(set(LessonProgress.objects.values_list("seconds_watched", flat=True)), {295})
+
+        # A later ping must not undo the completion.
+        buffer.record(self.student.pk, self.lessons[0].pk, seconds_watched=10)
+        buffer.flush()
+        self.assertIsNotNone(LessonProgress.objects.get(lesson=self.lessons[0]).completed_at)
+
+    def test_completion_is_visible_to_other_processes_at_once(self):
+        # A separate buffer stands in for another worker's; this one never flushes.
+        buffer = ProgressBuffer(max_entries=1000, flush_interval=3600)
+        with mock.patch("core.views.progress_buffer", buffer):
+            self.assertEqual(self.client.post(f"/api/lessons/{self.lessons[0].pk}/complete/").status_code, 202)
+        progress = self.client.get(f"/api/courses/{self.course.pk}/progress/").data
+        self.assertEqual(progress["percent_complete"], 25)
+
+    def test_flush_never_moves_progress_backwards(self):
+        buffer = ProgressBuffer(max_entries=1000, flush_interval=3600)
+        lesson = self.lessons[0]
+        buffer.record(self.student.pk, lesson.pk, seconds_watched=120)
+        buffer.flush()
+
+        buffer.record(self.student.pk, lesson.pk, completed=True)
+        buffer.flush()
+        progress = LessonProgress.objects.get(lesson=lesson)
+        self.assertEqual(progress.seconds_watched, 120)
+        completed_at = progress.completed_at
+        self.assertIsNotNone(completed_at)
+
+        # A late ping from another tab, then a second completion.
+        buffer.record(self.student.pk, lesson.pk, seconds_watched=30)
+        buffer.flush()
+        buffer.record(self.student.pk, lesson.pk, seconds_watched=150, completed=True)
+        buffer.flush()
+        progress.refresh_from_db()
+        self.assertEqual((progress.seconds_watched, progress.completed_at), (150, completed_at))
+
+    def test_pings_for_hidden_or_missing_lessons_are_rejected(self):
+        other = User.objects.create_user(username="author", password="pass")
+        draft = make_course(other, num_modules=1, num_lessons=1, status=Course.Status.DRAFT)
+        hidden = Lesson.objects.get(module__course=draft)
+        for pk in (hidden.pk, 999999):
+            response = self.client.post(f"/api/lessons/{pk}/progress/", {"seconds_watched": 5}, format="json")
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(self.client.post(f"/api/lessons/{pk}/complete/").status_code, 404)
+        progress_buffer.flush()
+        self.assertFalse(LessonProgress.objects.exists())
+
+    def test_buffer_flushes_when_full(self):
+        buffer = ProgressBuffer(max_entries=2, flush_interval=3600)
+        buffer.record(self.student.pk, self.lessons[0].pk, seconds_watched=5)
+        self.assertEqual(buffer.pending_count(), 1)
+        buffer.record(self.student.pk, self.lessons[1].pk, seconds_watched=5)
+        self.assertEqual(buffer.pending_count(), 0)
+        self.assertEqual(LessonProgress.objects.count(), 2)
+
+    def test_percent_complete_in_catalog_and_course_progress(self):
+        self.assertEqual(self.client.post(f"/api/lessons/{self.lessons[0].pk}/complete/").status_code, 202)
+        self.client.post(f"/api/lessons/{self.lessons[1].pk}/progress/", {"seconds_watched": 42}, format="json")
+
+        course = self.client.get("/api/courses/").data["results"][0]
+        self.assertEqual((course["completed_lesson_count"], course["percent_complete"]), (1, 25))
+
+        progress = self.client.get(f"/api/courses/{self.course.pk}/progress/").data
+        self.assertEqual(progress["percent_complete"], 25)
+        self.assertTrue(progress["lessons"][self.lessons[0].pk]["completed"])
+        self.assertEqual(progress["lessons"][self.lessons[1].pk]["seconds_watched"], 42)
+
+
+class CourseCatalogTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="student", password="pass")
+        Profile.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_catalog_returns_summaries_with_counts(self):
+        make_course(self.user, num_modules=3, num_lessons=2, num_questions=5)
+        data = self.client.get("/api/courses/").data
+
+        course = data["results"][0]
+        self.assertNotIn("modules", course)
+        self.assertEqual(course["module_count"], 4)
+        self.assertEqual(course["lesson_count"], 6)
+        self.assertEqual(course["quiz_count"], 1)
+        self.assertEqual(course["creator_username"], "student")
+
+    def test_catalog_is_cursor_paginated(self):
+        for _ in range(3):
+            make_course(self.user, num_modules=1)
+
+        first = self.client.get("/api/courses/", {"page_size": 2}).data
+        self.assertEqual(len(first["results"]), 2)
+        self.assertIsNotNone(first["next"])
+
+        second = self.client.get(first["next"]).data
+        self.assertEqual(len(second["results"]), 1)
+        self.assertIsNone(second["next"])
+        seen = {c["id"] for c in first["results"]} | {c["id"] for c in second["results"]}
+        self.assertEqual(len(seen), 3)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="student", password="pass")
+        self.author = User.objects.create_user(username="author", password="pass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, q, **params):
+        return self.client.get("/api/search/", {"q": q, **params})
+
+    def test_finds_lessons_by_text_without_markup(self):
+        course = make_course(self.author, num_modules=1, num_lessons=1)
+        lesson = Lesson.objects.get(module__course=course)
+        lesson.content = "<h2>Closures</h2><p>A <code>closure</code> captures variables.</p>"
+        lesson.save()
+
+        results = self.search("captures")
+        self.assertEqual(results.status_code, 200)
+        self.assertEqual(results.data["count"], 1)
+        hit = results.data["results"][0]
+        self.assertEqual((hit["kind"], hit["id"], hit["course_id"]), ("LESSON", lesson.pk, course.pk))
+        self.assertNotIn("<code>", hit["snippet"])
+        self.assertEqual(self.search("code").data["count"], 0)
+
+    def test_ranks_titles_above_bodies_and_searches_questions(self):
+        course = make_course(self.author, num_modules=1, num_lessons=1)
+        module = course.modules.get(order=1)
+        Lesson.objects.create(module=module, title="Recursion basics", content="<p>Intro.</p>", order=2)
+        Lesson.objects.create(module=module, title="Loops", content="<p>Loops versus recursion.</p>", order=3)
+        question = Question.objects.get(quiz__module__course=course, order=1)
+        question.question_text = "Which pattern is a Fibonacci memoization example?"
+        question.save()
+
+        hits = self.search("recursion").data["results"]
+        self.assertEqual([h["title"] for h in hits], ["Recursion basics", "Loops"])
+        self.assertEqual(self.search("fibonacci").data["results"][0]["id"], question.pk)
+
+    def test_only_searches_visible_courses_and_follows_deletes(self):
+        make_course(self.author, status=Course.Status.DRAFT).modules.filter(order=1).update(title="Secret")
+        course = make_course(self.author)
+        self.assertEqual(self.search("sample").data["count"], 1)
+
+        course.delete()
+        self.assertEqual(self.search("sample").data["count"], 0)
+        self.assertFalse(SearchDocument.objects.filter(course_id=course.pk).exists())
+
+    def test_paginates_and_query_cost_is_flat(self):
+        course = make_course(self.author, num_modules=3, num_lessons=10)
+
+        first = self.search("lesson", page_size=5)
+        self.assertEqual(first.data["count"], 30)
+        self.assertEqual(len(first.data["results"]), 5)
+        self.assertIsNotNone(first.data["next"])
+
+        with CaptureQueriesContext(connection) as small:
+            self.search("lesson", page_size=5, page=2)
+        make_course(self.author, num_modules=5, num_lessons=10)
+        with CaptureQueriesContext(connection) as large:
+            self.search("lesson", page_size=5, page=2)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_generated_courses_are_indexed_in_one_statement(self):
+        writer = CourseGraphWriter(Course.objects.create(title="Generated", created_by=self.author,
+                                                         status=Course.Status.PUBLISHED))
+        writer.add_content_module("Generators", [{"title": f"Yield {i}", "text_content": "<p>x</p>"} for i in range(5)])
+        with CaptureQueriesContext(connection) as queries:
+            writer.save()
+        self.assertEqual(sum("core_searchdocument" in q["sql"] for q in queries.captured_queries), 1)
+        self.assertEqual(self.search("yield").data["count"], 5)
+
+    def test_failed_rebuild_keeps_the_old_index(self):
+        make_course(self.author, num_modules=1, num_lessons=1)
+        indexed = SearchDocument.objects.count()
+        with mock.patch("core.search.index_documents", side_effect=DatabaseError("disk full")):
+            with self.assertRaises(DatabaseError):
+                rebuild_index()
+        self.assertEqual(SearchDocument.objects.count(), indexed)
+        self.assertEqual(rebuild_index(), indexed)
+        self.assertEqual(self.search("sample").data["count"], 1)
+
+    def test_query_syntax_is_not_interpreted(self):
+        make_course(self.author)
+        self.assertEqual(self.search('sample" OR NEAR(').status_code, 200)
+        self.assertEqual(self.search("").status_code, 400)
+
+
+class SaveCoursePipelineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="admin", password="pass")
+
+    def generated(self, num_modules, num_lessons, num_quizzes):
+        modules = [
+            {"title": f"M{i + 1}", "lessons": [{"title": f"L{i + 1}.{j + 1}", "text_content": "<p>x</p>", "video_id": "vid"}
+                                               for j in range(num_lessons)]}
+            for i in range(num_modules)
+        ]
+        quizzes = [
+            {"quiz_title": f"T{k + 1}", "questions": [{"question_text": "Q?", "options": ["A", "B"], "correct_answer": "A"}]}
+            for k in range(num_quizzes)
+        ]
+        ultimate = {"quiz_title": "Final", "questions": [{"question_text": "Q?", "options": ["A"], "correct_answer": "A"}] * 3}
+        return modules, quizzes, ultimate
+
+    def test_preserves_module_order_and_test_injection(self):
+        modules, quizzes, ultimate = self.generated(num_modules=4, num_lessons=2, num_quizzes=2)
+        course = save_course_pipeline("Course", self.user, modules, quizzes, ultimate)
+
+        saved = list(course.modules.order_by("order").values_list("title", "order", "module_type"))
+        self.assertEqual(saved, [
+            ("M1", 1, "CONTENT"), ("M2", 2, "CONTENT"), ("T1", 3, "ASSESSMENT"),
+            ("M3", 4, "CONTENT"), ("M4", 5, "CONTENT"), ("T2", 6, "ASSESSMENT"),
+            ("Final", 7, "ASSESSMENT"),
+        ])
+        m3 = course.modules.get(title="M3")
+        self.assertEqual(list(m3.lessons.values_list("title", "order")), [("L3.1", 1), ("L3.2", 2)])
+        self.assertEqual(course.modules.get(title="Final").quiz.questions.count(), 3)
+
+    def test_statement_count_does_not_grow_with_course_size(self):
+        with CaptureQueriesContext(connection) as small:
+            save_course_pipeline("Small", self.user, *self.generated(1, 1, 1))
+        with CaptureQueriesContext(connection) as large:
+            save_course_pipeline("Large", self.user, *self.generated(6, 5, 3))
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_append_orders_after_highest_existing_module(self):
+        course = Course.objects.create(title="Course", created_by=self.user)
+        Module.objects.create(course=course, title="First", order=1)
+        Module.objects.create(course=course, title="Moved", order=5)
+
+        writer = CourseGraphWriter(course)
+        writer.add_content_module("New", [{"title": "L1", "text_content": "<p>x</p>"}])
+        writer.append()
+
+        self.assertEqual(course.modules.get(title="New").order, 6)
+
+
+class LLMResponseCacheTests(TestCase):
+    def backends(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return [
+            DatabaseBackend(ttl=3600, max_entries=2),
+            FileSystemBackend(ttl=3600, max_entries=2, location=tmp.name),
+        ]
+
+    def test_hit_miss_and_bypass(self):
+        for backend in self.backends():
+            cache = LLMResponseCache(backend)
+            self.assertIsNone(cache.get("model", "prompt"))
+            cache.set("model", "prompt", "response")
+            self.assertEqual(cache.get("model", "prompt"), "response")
+            self.assertIsNone(cache.get("other-model", "prompt"))
+            self.assertIsNone(cache.get("model", "prompt", params={"temperature": 1}))
+            with bypass_llm_cache():
+                self.assertIsNone(cache.get("model", "prompt"))
+            self.assertEqual(cache.stats()["hits"], 1)
+            self.assertEqual(cache.stats()["misses"], 3)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for backend in self.backends():
+            cache = LLMResponseCache(backend)
+            cache.set("model", "a", "A")
+            cache.set("model", "b", "B")
+            if isinstance(backend, DatabaseBackend):
+                LLMResponse.objects.update(last_used_at=timezone.now() - timedelta(minutes=5))
+            else:
+                for path, _ in backend._entries():
+                    os.utime(path, (time.time() - 300, time.time() - 300))
+            cache.get("model", "a")  # "b" is now the least recently used
+            cache.set("model", "c", "C")
+
+            self.assertEqual(cache.get("model", "a"), "A")
+            self.assertIsNone(cache.get("model", "b"))
+            self.assertEqual(cache.get("model", "c"), "C")
+
+    def test_size_limit_is_enforced_every_n_writes(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        db_backend = DatabaseBackend(ttl=3600, max_entries=2, evict_every=3)
+        fs_backend = FileSystemBackend(ttl=3600, max_entries=2, location=tmp.name, evict_every=3)
+        with mock.patch.object(LLMResponse.objects, "count", wraps=LLMResponse.objects.count) as count, \
+                mock.patch.object(fs_backend, "_entries", wraps=fs_backend._entries) as scan:
+            for backend in (db_backend, fs_backend):
+                cache = LLMResponseCache(backend)
+                for prompt in "abcd":
+                    cache.set("model", prompt, prompt.upper())
+                # Trimmed to 2 on the third write; the fourth is kept until the sixth.
+                self.assertEqual(sum(cache.get("model", prompt) is not None for prompt in "abcd"), 3)
+        self.assertEqual((count.call_count, scan.call_count), (1, 1))
+
+    def test_expired_entries_are_misses(self):
+        cache = LLMResponseCache(DatabaseBackend(ttl=60, max_entries=10))
+        cache.set("model", "prompt", "response")
+        LLMResponse.objects.update(created_at=timezone.now() - timedelta(minutes=2))
+        self.assertIsNone(cache.get("model", "prompt"))
+        self.assertFalse(LLMResponse.objects.exists())
+
+    @override_settings(AI_PROVIDER="gemini")
+    def test_generation_config_is_part_of_the_key(self):
+        cache = LLMResponseCache(DatabaseBackend(ttl=3600, max_entries=10))
+        model = mock.Mock()
+        model.generate_content.return_value = SimpleNamespace(text='{"modules": []}', usage_metadata=None)
+        with mock.patch("core.pipeline.get_llm_cache", return_value=cache), \
+                mock.patch("core.providers.get_genai") as get_genai:
+            get_genai.return_value.GenerativeModel.return_value = model
+            run_llm_generation("outline", "outline prompt")
+            get_provider("outline").generation_config["temperature"] = 0.2
+            run_llm_generation("outline", "outline prompt")
+            run_llm_generation("outline", "outline prompt")
+        self.assertEqual(model.generate_content.call_count, 2)
+        self.assertEqual(model.generate_content.call_args.kwargs["generation_config"], {"temperature": 0.2})
+
+    def test_repeated_generation_skips_the_model(self):
+        cache = LLMResponseCache(DatabaseBackend(ttl=3600, max_entries=10))
+        model = mock.Mock()
+        model.generate_content.return_value = SimpleNamespace(text='{"modules": []}', usage_metadata=None)
+        with mock.patch("core.pipeline.get_llm_cache", return_value=cache), \
+                mock.patch("core.providers.get_genai") as get_genai:
+            get_genai.return_value.GenerativeModel.return_value = model
+            run_llm_generation("outline", "outline prompt")
+            self.assertEqual(run_llm_generation("outline", "outline prompt"), '{"modules": []}')
+        self.assertEqual(model.generate_content.call_count, 1)
+
+
+class StartupImportTests(SimpleTestCase):
+    def test_api_startup_does_not_import_provider_clients(self):
+        startup = measure_startup("core.urls")
+        self.assertIn("core.pipeline", startup["imports"])
+        self.assertEqual(provider_imports(startup["imports"]), [])
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class APIBenchmarkTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.seed = seed_data(courses=2, modules=2, lessons=2, questions=3)
+
+    def test_scenarios_run_without_errors(self):
+        # Writers one at a time: the in-memory test database can't take concurrent writes.
+        results = run_benchmark(self.seed, ["course_list", "course_detail", "lesson_crud", "generate_job",
+                                            "generate_module", "generate_stream"], clients=1, requests=3, slow_requests=1)
+        results.update(run_benchmark(self.seed, ["course_list", "course_detail"], clients=3, requests=6, slow_requests=1))
+
+        self.assertEqual(results["lesson_crud"]["requests"], 12)
+        for name, result in results.items():
+            with self.subTest(scenario=name):
+                self.assertEqual(result["errors"], 0)
+                self.assertGreater(result["max_queries"], 0)
+                self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+                self.assertLessEqual(result["p95_ms"], result["p99_ms"])
+
+    def test_regressions_against_baseline(self):
+        result = {"p95_ms": 10.0, "max_queries": 5, "errors": 0}
+        baseline = {"scenarios": {"course_list": {"p95_ms": 10.0, "max_queries": 5, "errors": 0}}}
+        self.assertEqual(compare({"course_list": result}, baseline, 0.25), [])
+        self.assertEqual(compare({"course_list": {**result, "p95_ms": 11.5}}, baseline, 0.25), [])
+
+        regressions = compare({"course_list": {**result, "p95_ms": 20.0, "max_queries": 6}}, baseline, 0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn("p95 20.0 ms", regressions[0])
+        self.assertIn("6 queries per request", regressions[1])
+
+
+@override_settings(AI_PROVIDER="stub", AI_STAGE_PROVIDERS={})
+class LLMProviderTests(SimpleTestCase):
+    def videos(self, query, max_results=20):
+        return [{"video_id": f"{query[:12]}-{i}", "title": "t", "description": "", "channelTitle": "c"} for i in range(3)]
+
+    def test_whole_pipeline_runs_offline_on_the_stub(self):
+        for batch_size in (0, 2):
+            with self.subTest(batch_size=batch_size), override_settings(AI_LESSON_BATCH_SIZE=batch_size), \
+                    mock.patch("core.pipeline.search_youtube", self.videos):
+                title, modules, quizzes, ultimate = generate_course_content("Python", 2, 3, 1)
+
+            self.assertEqual([m["title"] for m in modules], ["Python: Part 1", "Python: Part 2"])
+            lessons = [l for m in modules for l in m["lessons"]]
+            self.assertEqual(len(lessons), 6)
+            self.assertTrue(all(len(l["text_content"]) > 200 for l in lessons))
+            self.assertEqual(len({l["video_id"] for l in lessons}), 6)
+            self.assertEqual(len(quizzes[0]["questions"]), 5)
+            self.assertEqual(len(ultimate["questions"]), 10)
+
+    def test_stub_answers_are_deterministic_in_every_mode(self):
+        provider = get_provider("lesson")
+        prompt = 'Write a comprehensive, in-depth lesson on the topic: "Closures".'
+        text = provider.generate(prompt)
+        self.assertEqual(provider.generate(prompt), text)
+        self.assertEqual("".join(provider.stream(prompt)), text)
+        self.assertEqual(provider.batch([prompt, prompt]), [text, text])
+        self.assertEqual(asyncio.run(provider.agenerate(prompt)), text)
+
+    @override_settings(AI_PROVIDER="gemini", AI_STAGE_PROVIDERS={"quiz": "stub"})
+    def test_stages_can_be_routed_to_other_providers(self):
+        self.assertEqual(get_provider("quiz").name, "stub")
+        self.assertEqual(get_provider("lesson").name, "gemini")
+        self.assertEqual(get_provider("lesson").model, "gemini-2.5-flash")
+
+    def test_rate_limiter_spaces_requests(self):
+        limiter = RateLimiter(per_minute=1200)
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+
+class JSONExtractionTests(SimpleTestCase):
+    RESPONSES = [
+        '```json\n{"text_content": "<pre>def f(): return {1: 2}</pre>", "video_id": null}\n```',
+        'Here is {the} lesson:\n{"text_content": "a \\" } quote", "items": [{"x": "]"}]} Enjoy {it}!',
+        '[{"title": "Variables"}, {"title": "Loops"}]',
+    ]
+
+    def test_braces_inside_strings_are_ignored(self):
+        self.assertEqual(
+            extract_json_from_text(self.RESPONSES[0]),
+            {"text_content": "<pre>def f(): return {1: 2}</pre>", "video_id": None},
+        )
+        self.assertEqual(extract_json_from_text(self.RESPONSES[1])["items"], [{"x": "]"}])
+        with self.assertRaises(json.JSONDecodeError):
+            extract_json_from_text("No JSON {here}")
+
+    def test_streaming_matches_one_shot_for_any_chunking(self):
+        for text in self.RESPONSES:
+            for size in (1, 2, 5, 64):
+                extractor = StreamingJSONExtractor()
+                for i in range(0, len(text), size):
+                    if extractor.feed(text[i:i + size]):
+                        break
+                self.assertEqual(extractor.result(), extract_json_from_text(text))
+
+    def test_malformed_json_is_an_error_not_an_inner_fragment(self):
+        text = '{"text_content": "Use {} for dicts and [1, 2] lists", "video_id": "x",}'
+        for size in (len(text), 3):
+            extractor = StreamingJSONExtractor()
+            for i in range(0, len(text), size):
+                extractor.feed(text[i:i + size])
+            with self.assertRaises(json.JSONDecodeError):
+                extractor.result()
+        with self.assertRaises(json.JSONDecodeError):
+            extract_json_from_text(text)
+        with self.assertRaises(json.JSONDecodeError):
+            extract_json_from_text('{"modules": [{"title": "A"}')
+        self.assertEqual(extract_json_from_text('a { b {"x": 1}'), {"x": 1})
+
+    def test_objects_win_over_arrays_in_prose(self):
+        text = 'Note (see [1]): {"a": 2}'
+        for size in (len(text), 1, 4):
+            extractor = StreamingJSONExtractor()
+            for i in range(0, len(text), size):
+                extractor.feed(text[i:i + size])
+            self.assertEqual(extractor.result(), {"a": 2})
+        self.assertEqual(extract_json_from_text('["x"] then {"questions": []}'), {"questions": []})
+        self.assertEqual(extract_json_from_text('Sources: [1], [2]'), [1])
+
+    def test_quiz_keeps_only_question_objects(self):
+        question = {"question_text": "Q?", "options": ["A", "B"], "correct_answer": "A"}
+        for raw in ('Note (see [1]): {"quiz_title": "T", "questions": [1, "two", %s]}' % json.dumps(question),
+                    '[1, %s]' % json.dumps(question)):
+            with mock.patch("core.pipeline.run_llm_generation", return_value=raw), \
+                    mock.patch("core.pipeline.discard_llm_response"):
+                quiz = generate_quiz_from_content("content", 3)
+            self.assertEqual(quiz["questions"], [question])
+
+    def test_deep_nesting_is_a_decode_error(self):
+        for text in ("[" * 50000, "[" * 50000 + "]" * 50000):
+            with self.assertRaises(json.JSONDecodeError):
+                extract_json_from_text(text)
+
+    def test_streaming_stops_once_the_value_is_complete(self):
+        extractor = StreamingJSONExtractor()
+        self.assertFalse(extractor.feed('{"modules": [{"title": "A"}'))
+        self.assertTrue(extractor.feed(']} and then some trailing chatter'))
+        self.assertEqual(extractor.result(), {"modules": [{"title": "A"}]})
+
+
+class PipelineExecutorTests(SimpleTestCase):
+    def test_after_passes_results_in_dependency_order(self):
+        first, second = Future(), Future()
+        with PipelineExecutor(max_workers=2) as executor:
+            combined = executor.after([first, second], lambda results, suffix: [*results, suffix], "c")
+            second.set_result("b")
+            self.assertFalse(combined.done())
+            first.set_result("a")
+            self.assertEqual(combined.result(timeout=5), ["a", "b", "c"])
+
+    def test_after_propagates_a_failed_dependency_without_running_fn(self):
+        fn = mock.Mock()
+        failing = Future()
+        with PipelineExecutor(max_workers=2) as executor:
+            chained = executor.after([completed_future(1), failing], fn)
+            failing.set_exception(ConnectionError("down"))
+            with self.assertRaises(ConnectionError):
+                chained.result(timeout=5)
+        fn.assert_not_called()
+
+    def test_after_does_not_block_a_pool_thread(self):
+        pending = Future()
+        with PipelineExecutor(max_workers=1) as executor:
+            chained = executor.after([pending], lambda results: results[0] * 2)
+            # With one worker, this only runs if nothing is parked waiting on `pending`.
+            self.assertEqual(executor.submit(lambda: "free").result(timeout=5), "free")
+            pending.set_result(21)
+            self.assertEqual(chained.result(timeout=5), 42)
+
+    def test_split_resolves_one_part_per_item(self):
+        batch = Future()
+        with PipelineExecutor(max_workers=1) as executor:
+            parts = executor.split(batch, 3)
+            batch.set_result(["a", "b", "c"])
+        self.assertEqual([p.result(timeout=5) for p in parts], ["a", "b", "c"])
+
+    def test_split_fails_every_part_on_a_short_result(self):
+        batch = Future()
+        with PipelineExecutor(max_workers=1) as executor:
+            parts = executor.split(batch, 3)
+            batch.set_result(["a", "b"])
+        for part in parts:
+            with self.assertRaises(ValueError):
+                part.result(timeout=5)
+
+    def test_split_propagates_failure_to_every_part(self):
+        batch = Future()
+        with PipelineExecutor(max_workers=1) as executor:
+            parts = executor.split(batch, 2)
+            batch.set_exception(ConnectionError("down"))
+        for part in parts:
+            with self.assertRaises(ConnectionError):
+                part.result(timeout=5)
+
+    def test_concurrent_pipeline_builds_the_same_course_graph(self):
+        # Lessons finish in opposite orders in the two runs; the graph must not change.
+        topics = ["Closures", "Generators", "Decorators", "Iterators", "Context managers",
+                  "Descriptors", "Metaclasses", "Coroutines", "Type hints"]
+
+        def run(delay):
+            def write(lesson_title, *args):
+                time.sleep(delay(topics.index(lesson_title)))
+                return {"text_content": f"<p>{lesson_title}</p>", "video_id": None}
+
+            with mock.patch.multiple(
+                "core.pipeline",
+                generate_course_outline=lambda prompt, n: [{"title": f"M{i + 1}"} for i in range(n)],
+                generate_lesson_plan_for_module=lambda module, course, n: [
+                    {"title": topics[(int(module[1:]) - 1) * n + j]} for j in range(n)],
+                search_youtube=lambda query, max_results=20: [],
+                generate_deep_lesson_content=write,
+                generate_quiz_from_content=lambda *args, **kwargs: {
+                    "quiz_title": "Quiz", "questions": [{"question_text": "Q?", "options": ["A"], "correct_answer": "A"}]},
+            ):
+                return generate_course_content("Python", 3, 3, 2)
+
+        forwards = run(lambda n: n / 200)
+        backwards = run(lambda n: (len(topics) - n) / 200)
+        self.assertEqual(forwards, backwards)
+        _, modules, intermediate_quizzes, ultimate_quiz = forwards
+        self.assertEqual([m["title"] for m in modules], ["M1", "M2", "M3"])
+        self.assertEqual([l["title"] for m in modules for l in m["lessons"]], topics)
+        self.assertEqual(len(intermediate_quizzes), 2)
+        self.assertIsNotNone(ultimate_quiz)
+
+
+class BatchedLessonGenerationTests(SimpleTestCase):
+    @override_settings(AI_LESSON_BATCH_SIZE=3)
+    def test_one_call_per_batch_and_fallback_only_for_invalid_lessons(self):
+        long_text = "<p>" + "Lesson body. " * 30 + "</p>"
+        batch_response = json.dumps({"lessons": [
+            {"lesson_number": 1, "text_content": long_text, "video_id": "v-L1"},
+            {"lesson_number": 2, "text_content": "<p>...</p>", "video_id": "v-L2"},
+            {"lesson_number": 3, "text_content": long_text, "video_id": "made-up"},
+        ]})
+        plan = [{"title": f"L{i}"} for i in range(1, 5)]
+        single = mock.Mock(side_effect=lambda *args: {"text_content": "<p>single</p>", "video_id": None})
+
+        with mock.patch("core.pipeline.generate_lesson_plan_for_module", return_value=plan), \
+                mock.patch("core.pipeline.search_youtube", side_effect=lambda query, max_results: [
+                    {"video_id": f"v-{query.split()[0]}", "title": "t", "description": "", "channelTitle": "c"}
+                ]), \
+                mock.patch("core.pipeline.run_llm_generation", side_effect=lambda stage, prompt: (
+                    "Sorry, I cannot help with that." if '"L4"' in prompt else batch_response
+                )) as batch_call, \
+                mock.patch("core.pipeline.get_llm_cache", return_value=LLMResponseCache()), \
+                mock.patch("core.pipeline.generate_deep_lesson_content", single), \
+                PipelineExecutor(max_workers=4) as executor:
+            lessons = generate_module_lessons(executor, "Module", "Course", 4)
+
+        self.assertEqual(batch_call.call_count, 2)  # lessons 1-3, then lesson 4
+        self.assertEqual([l["title"] for l in lessons], ["L1", "L2", "L3", "L4"])
+        self.assertEqual(lessons[0]["video_id"], "v-L1")
+        self.assertEqual(lessons[2]["video_id"], "v-L3")  # unknown id replaced by the first candidate
+        retried = [c.args[0] for c in single.call_args_list]
+        self.assertEqual(sorted(retried), ["L2", "L4"])
+
+
+class LessonDeduplicationTests(SimpleTestCase):
+    def videos(self, *ids):
+        return [{"video_id": v, "title": v, "description": "", "channelTitle": "c"} for v in ids]
+
+    def test_repeated_lesson_titles_are_skipped_before_any_call(self):
+        plans = {
+            "Data Structures": [{"title": "Python Lists"}, {"title": "Dictionaries"}],
+            "Collections": [{"title": "Working with Lists in Python"}, {"title": "Sets"}],
+        }
+        written = []
+
+        def write(lesson_title, *args):
+            written.append(lesson_title)
+            return {"text_content": f"<p>{lesson_title}</p>", "video_id": None}
+
+        with mock.patch.multiple(
+            "core.pipeline",
+            generate_course_outline=lambda prompt, n: [{"title": "Data Structures"}, {"title": "Collections"}],
+            generate_lesson_plan_for_module=lambda module, course, n: plans[module],
+            search_youtube=lambda query, max_results=20: [],
+            generate_deep_lesson_content=write,
+            generate_quiz_from_content=lambda *args, **kwargs: {"quiz_title": "T", "questions": []},
+        ):
+            _, modules, _, _ = generate_course_content("Python", 2, 2, 0)
+
+        self.assertEqual(len(written), 3)
+        lesson_titles = [l["title"] for m in modules for l in m["lessons"]]
+        self.assertEqual(sorted(lesson_titles), sorted(written))
+        self.assertIn("Sets", lesson_titles)
+
+    def test_module_keeps_a_lesson_even_if_all_repeat(self):
+        index = CourseSimilarityIndex()
+        index.filter_lessons([{"title": "Loops"}])
+        self.assertEqual(index.filter_lessons([{"title": "For Loops"}, {"title": "loops"}]), [{"title": "For Loops"}])
+        self.assertEqual(index.filter_lessons([{"title": "Loops!"}]), [{"title": "Loops!"}])
+
+    def test_videos_are_not_reused_while_unused_candidates_remain(self):
+        index = CourseSimilarityIndex()
+        candidates = self.videos("a", "b", "c")
+        self.assertEqual(index.claim_video(candidates, "a"), "a")
+        self.assertEqual([v["video_id"] for v in index.unused_videos(candidates)], ["b", "c"])
+        # A concurrent lesson that picked "a" from stale options is moved on.
+        self.assertEqual(index.claim_video(candidates, "a"), "b")
+        self.assertEqual(index.claim_video(candidates, None), "c")
+        self.assertEqual(index.unused_videos(candidates), candidates)
+
+    def test_near_duplicate_lesson_text_is_flagged(self):
+        body = " ".join(f"Sentence {i} explains how list comprehensions build lists." for i in range(12))
+        index = CourseSimilarityIndex()
+        self.assertIsNone(index.check_lesson_text("Comprehensions", f"<p>{body}</p>"))
+        self.assertEqual(index.check_lesson_text("List Tricks", f"<h2>Recap</h2><p>{body} One more line.</p>"),
+                         "Comprehensions")
+        self.assertIsNone(index.check_lesson_text("Generators", "<p>" + " ".join(
+            f"Generator {i} yields values lazily one at a time." for i in range(12)) + "</p>"))
+
+
+    def test_duplicates_are_dropped_in_course_order_whatever_finishes_first(self):
+        body = " ".join(f"Sentence {i} explains how list comprehensions build lists." for i in range(12))
+        plans = {
+            "Lists": [{"title": "Python Lists"}, {"title": "Comprehensions"}],
+            "Collections": [{"title": "Working with Lists in Python"}, {"title": "List Tricks"}],
+        }
+
+        def run(slow_module):
+            def plan(module, course, n):
+                time.sleep(0.05 if module == slow_module else 0)
+                return plans[module]
+
+            def write(lesson_title, module_title, *args):
+                time.sleep(0.05 if module_title == slow_module else 0)
+                text = body if lesson_title in ("Comprehensions", "List Tricks") else f"<p>{lesson_title}</p>"
+                return {"text_content": text, "video_id": None}
+
+            with mock.patch.multiple(
+                "core.pipeline",
+                generate_course_outline=lambda prompt, n: [{"title": "Lists"}, {"title": "Collections"}],
+                generate_lesson_plan_for_module=plan,
+                search_youtube=lambda query, max_results=20: [],
+                generate_deep_lesson_content=write,
+                generate_quiz_from_content=lambda *args, **kwargs: {"quiz_title": "T", "questions": []},
+            ):
+                _, modules, _, _ = generate_course_content("Python", 2, 2, 0)
+            return [[l["title"] for l in m["lessons"]] for m in modules]
+
+        expected = [["Python Lists", "Comprehensions"], ["List Tricks"]]
+        self.assertEqual(run(slow_module="Lists"), expected)
+        self.assertEqual(run(slow_module="Collections"), expected)
+
+
+class ContextCompactionTests(SimpleTestCase):
+    BOILERPLATE = "<p>In this lesson you will learn the key ideas step by step.</p>"
+
+    def course(self, num_modules=12, num_lessons=4):
+        return [
+            {"title": f"Module {m}", "lessons": [
+                {"title": f"Lesson {m}.{l}", "text_content": (
+                    f"<h2>Overview</h2><p>Topic{m}x{l} is the subject of lesson {m}.{l}.</p>"
+                    + self.BOILERPLATE
+                    + "".join(f"<p>Detail {d} about topic{m}x{l} and module{m} concepts.</p>" for d in range(40))
+                    + "<pre><code>print({'a': 1})</code></pre>"
+                )}
+                for l in range(1, num_lessons + 1)
+            ]}
+            for m in range(1, num_modules + 1)
+        ]
+
+    def test_every_module_and_lesson_is_covered_within_budget(self):
+        modules = self.course()
+        raw_size = sum(len(l["text_content"]) for m in modules for l in m["lessons"])
+        self.assertGreater(raw_size, 25000)  # the old cut-off would have dropped the last modules
+
+        content = compact_course_content(modules, token_budget=3000)
+
+        self.assertLessEqual(estimate_tokens(content), 3000)
+        for m in range(1, 13):
+            self.assertIn(f"## Module: Module {m}\n", content)
+            for l in range(1, 5):
+                self.assertIn(f"Topic{m}x{l} is the subject", content)
+
+    def test_every_lesson_keeps_its_overview_when_titles_use_up_the_budget(self):
+        module = self.course(num_modules=1, num_lessons=20)[0]
+        for lesson in module["lessons"]:
+            lesson["title"] += " with a title long enough to eat a small budget on its own"
+        summary = summarize_module(module, token_budget=50)
+        for l in range(2, 21):
+            self.assertIn(f"Topic1x{l} is the subject", summary)
+        self.assertNotIn("Detail", summary)
+
+    def test_markup_is_stripped_and_repeated_sentences_kept_once(self):
+        content = compact_course_content(self.course(num_modules=2, num_lessons=2), token_budget=5000)
+        self.assertNotIn("<p>", content)
+        self.assertNotIn("<h2>", content)
+        self.assertEqual(content.count("you will learn the key ideas"), 1)
+        self.assertEqual(strip_html("<p>a &amp; b</p><ul><li>one</li><li>two</li></ul>"), "a & b\none\ntwo")
+
+    def test_sentences_left_out_for_budget_can_appear_later(self):
+        shared = "Generators yield values lazily one at a time."
+        first = {"title": "A", "lessons": [{"title": "A.1", "text_content": f"<p>Intro to A.</p><p>{shared}</p>"}]}
+        second = {"title": "B", "lessons": [{"title": "B.1", "text_content": f"<p>{shared}</p>"}]}
+        seen = set()
+
+        self.assertNotIn(shared, summarize_module(first, token_budget=1, seen=seen))
+        self.assertIn(shared, summarize_module(second, token_budget=100, seen=seen))
+
+
+@override_settings(AI_PROVIDER="stub", AI_STAGE_PROVIDERS={})
+class PipelineMetricsTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.user = User.objects.create_user(username="admin", password="pass")
+
+    def videos(self, query, max_results=20):
+        with metrics.timed("youtube"):
+            return [{"video_id": f"{query[:12]}-{i}", "title": "t", "description": "", "channelTitle": "c"}
+                    for i in range(3)]
+
+    def test_generation_run_records_stages_tokens_and_cache(self):
+        with self.assertLogs("core.metrics", "INFO") as logs, \
+                mock.patch("core.pipeline.search_youtube", self.videos):
+            with metrics.generation_run("test", job_id=7):
+                save_course_pipeline("Python", self.user, *generate_course_content("Python", 2, 2, 1)[1:])
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["event"], "generation_run")
+        self.assertEqual((record["kind"], record["job_id"], record["status"]), ("test", 7, "succeeded"))
+        self.assertEqual(set(record["stages"]), {"outline", "lesson_plan", "youtube", "lesson", "quiz", "db_save"})
+        self.assertEqual(record["stages"]["lesson"]["calls"], 4)
+        self.assertEqual(record["stages"]["quiz"]["calls"], 2)
+        self.assertGreater(record["tokens"]["prompt"], 0)
+        self.assertGreater(record["tokens"]["completion"], 0)
+        self.assertEqual(metrics.CALL_SECONDS.count(stage="lesson"), 4)
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage="lesson"), 1)
+        self.assertEqual(metrics.RUN_SECONDS.count(kind="test", status="succeeded"), 1)
+
+    def test_failed_runs_are_recorded_as_failed(self):
+        with self.assertLogs("core.metrics", "INFO") as logs, self.assertRaises(ValueError):
+            with metrics.generation_run("test"):
+                raise ValueError("boom")
+        self.assertEqual(json.loads(logs.records[0].getMessage())["status"], "failed")
+
+    def test_llm_cache_hits_are_counted(self):
+        with mock.patch("core.providers.StubProvider.cacheable", True):
+            run_llm_generation("quiz", "Prompt")
+            run_llm_generation("quiz", "Prompt")
+        self.assertEqual(metrics.CACHE_REQUESTS.get(cache="llm", result="miss"), 1)
+        self.assertEqual(metrics.CACHE_REQUESTS.get(cache="llm", result="hit"), 1)
+
+    def test_metrics_endpoint_serves_prometheus_text(self):
+        reset_counters()
+        metrics.CALL_SECONDS.observe(0.2, stage="outline")
+        ResiliencePolicy("test", breaker=CircuitBreaker(5, 30)).call(lambda: "ok")
+
+        with override_settings(DEBUG=True):
+            response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn('ai_academy_generation_call_seconds_bucket{stage="outline",le="0.25"} 1', body)
+        self.assertIn('ai_academy_generation_call_seconds_bucket{stage="outline",le="+Inf"} 1', body)
+        self.assertIn('ai_academy_generation_call_seconds_count{stage="outline"} 1', body)
+        self.assertIn('ai_academy_provider_events_total{provider="test",event="successes"} 1', body)
+
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        with override_settings(METRICS_TOKEN="secret"):
+            self.assertEqual(self.client.get("/metrics").status_code, 401)
+            self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+            self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret").status_code, 200)
+
+
+class YouTubeSearchCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_near_identical_queries_share_one_api_call(self):
+        service = mock.Mock()
+        service.search.return_value.list.return_value.execute.return_value = {"items": [{
+            "id": {"videoId": "abc"},
+            "snippet": {"title": "Intro", "description": "", "channelTitle": "Channel"},
+        }]}
+        with mock.patch("core.pipeline.YOUTUBE_API_KEY", "key"), \
+                mock.patch("core.pipeline.get_youtube_service", return_value=service):
+            first = search_youtube("Variables Intro to Python tutorial")
+            second = search_youtube("variables  intro to python tutorial tutorial")
+
+        self.assertEqual(first, second)
+        self.assertEqual(first[0]["video_id"], "abc")
+        self.assertEqual(service.search.return_value.list.call_count, 1)
+        self.assertEqual(
+            service.search.return_value.list.call_args.kwargs["q"], "variables intro to python tutorial"
+        )
+
+
+class FakeProviderError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.response = SimpleNamespace(headers={"retry-after": retry_after} if retry_after else {})
+
+
+class ResilienceTests(SimpleTestCase):
+    def setUp(self):
+        reset_counters()
+        self.sleeps = []
+
+    def policy(self, breaker=None, **kwargs):
+        return ResiliencePolicy("test", max_attempts=4, base_delay=0.5, max_delay=30,
+                                breaker=breaker or CircuitBreaker(5, 60), sleep=self.sleeps.append, **kwargs)
+
+    def test_transient_errors_are_retried_honoring_retry_after(self):
+        paused = []
+        fn = mock.Mock(side_effect=[FakeProviderError(429, "7"), TimeoutError(), "ok"])
+        self.assertEqual(self.policy(on_throttle=paused.append).call(fn), "ok")
+
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(self.sleeps[0], 7.0)
+        self.assertEqual(paused, [7.0])
+        self.assertLessEqual(self.sleeps[1], 1.0)
+        counters = snapshot()
+        self.assertEqual((counters[("test", "retries")], counters[("test", "throttled")], counters[("test", "timeouts")]),
+                         (2, 1, 1))
+        self.assertEqual(counters[("test", "successes")], 1)
+
+    def test_bad_requests_are_not_retried(self):
+        fn = mock.Mock(side_effect=FakeProviderError(400))
+        with self.assertRaises(FakeProviderError):
+            self.policy().call(fn)
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_circuit_opens_then_lets_one_trial_through(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        failing = mock.Mock(side_effect=ConnectionError("down"))
+        with self.assertRaises(CircuitOpenError):
+            self.policy(breaker).call(failing)
+        self.assertEqual(failing.call_count, 2)
+        self.assertEqual(breaker.state, "open")
+        self.assertEqual(snapshot()[("test", "rejected")], 1)
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, "half-open")
+        self.assertEqual(self.policy(breaker).call(lambda: "back"), "back")
+        self.assertEqual(breaker.state, "closed")
+
+    def test_youtube_search_retries_and_does_not_cache_failures(self):
+        cache.clear()
+        service = mock.Mock()
+        execute = service.search.return_value.list.return_value.execute
+        execute.side_effect = [FakeProviderError(503), {"items": []}, FakeProviderError(500)]
+        with mock.patch("core.pipeline.YOUTUBE_API_KEY", "key"), \
+                mock.patch("core.pipeline.get_youtube_service", return_value=service), \
+                mock.patch("core.pipeline.ResiliencePolicy", lambda name: self.policy()):
+            self.assertEqual(search_youtube("closures"), [])
+            self.assertEqual(execute.call_count, 2)
+
+            execute.side_effect = FakeProviderError(500)
+            search_youtube("generators")
+            self.assertEqual(execute.call_count, 6)
+            search_youtube("generators")
+            self.assertEqual(execute.call_count, 10)
+
+
+class GenerationJobQueueTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="pass")
+        Profile.objects.create(user=self.owner)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_each_claim_takes_the_oldest_pending_job_once(self):
+        first = enqueue_course_generation(self.owner, {"prompt": "First"})
+        second = enqueue_course_generation(self.owner, {"prompt": "Second"})
+
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual((claimed.status, claimed.stage), (GenerationJob.Status.RUNNING, "starting"))
+        self.assertIsNotNone(claimed.started_at)
+        self.assertEqual(claim_next_job().pk, second.pk)
+        self.assertIsNone(claim_next_job())
+
+    def test_a_job_claimed_by_another_worker_is_skipped(self):
+        first = enqueue_course_generation(self.owner, {"prompt": "First"})
+        second = enqueue_course_generation(self.owner, {"prompt": "Second"})
+        original_first = QuerySet.first
+        calls = []
+
+        def first_then_lose_the_race(queryset):
+            job = original_first(queryset)
+            if not calls:
+                # Another worker claims the job between our SELECT and UPDATE.
+                GenerationJob.objects.filter(pk=job.pk).update(status=GenerationJob.Status.RUNNING)
+            calls.append(job)
+            return job
+
+        with mock.patch.object(QuerySet, "first", first_then_lose_the_race):
+            claimed = claim_next_job()
+        self.assertEqual(claimed.pk, second.pk)
+        self.assertEqual([job.pk for job in calls], [first.pk, second.pk])
+
+    def test_failure_is_recorded_on_the_job(self):
+        enqueue_course_generation(self.owner, {"prompt": "Python"})
+        job = claim_next_job()
+        with mock.patch("core.jobs.generate_course_content", side_effect=ConnectionError("provider went away")):
+            job = run_job(job)
+
+        self.assertEqual(job.status, GenerationJob.Status.FAILED)
+        self.assertEqual(job.error, "provider went away")
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(job.course)
+
+    def test_checkpoint_errors_fail_the_job(self):
+        enqueue_course_generation(self.owner, {"prompt": "Python"})
+        job = claim_next_job()
+        with mock.patch("core.jobs.CheckpointStore", side_effect=DatabaseError("checkpoints unavailable")):
+            job = run_job(job)
+
+        self.assertEqual(job.status, GenerationJob.Status.FAILED)
+        self.assertEqual(job.error, "checkpoints unavailable")
+
+    def test_status_endpoint_is_visible_to_the_owner_only(self):
+        response = self.client.post("/api/courses/generate/", {"prompt": "Python"}, format="json")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data["job_id"]
+
+        response = self.client.get(f"/api/courses/generate/{job_id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {
+            "job_id", "status", "stage", "percent", "course_id", "error", "created_at", "started_at", "finished_at",
+        })
+        self.assertEqual((response.data["status"], response.data["percent"]), ("PENDING", 0))
+        self.assertIsNone(response.data["course_id"])
+
+        stranger = User.objects.create_user(username="stranger", password="pass")
+        Profile.objects.create(user=stranger)
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get(f"/api/courses/generate/{job_id}/").status_code, 404)
+
+        admin = User.objects.create_user(username="admin", password="pass")
+        Profile.objects.create(user=admin, role="ADMIN")
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get(f"/api/courses/generate/{job_id}/").status_code, 200)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(f"/api/courses/generate/{job_id}/").status_code, 401)
+
+
+class ResumableGenerationTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="admin", password="pass")
+        Profile.objects.create(user=self.user, role="ADMIN")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.broken = {"M2.L2"}
+
+    def write_lesson(self, lesson_title, *args):
+        if lesson_title in self.broken:
+            raise ConnectionError("provider went away")
+        return {"text_content": f"<p>{lesson_title}</p>", "video_id": None}
+
+    def pipeline_mocks(self):
+        quiz = {"quiz_title": "Test", "questions": [{"question_text": "Q?", "options": ["A", "B"], "correct_answer": "A"}]}
+        return {
+            "generate_course_outline": mock.Mock(side_effect=lambda prompt, n: [{"title": f"M{i + 1}"} for i in range(n)]),
+            "generate_lesson_plan_for_module": mock.Mock(
+                side_effect=lambda module, course, n: [{"title": f"{module}.L{j + 1}"} for j in range(n)]),
+            "generate_deep_lesson_content": mock.Mock(side_effect=self.write_lesson),
+            "generate_quiz_from_content": mock.Mock(side_effect=lambda *args, **kwargs: quiz),
+            "search_youtube": lambda query, max_results=20: [],
+        }
+
+    def run_next_job(self, mocks):
+        with mock.patch.multiple("core.pipeline", **mocks):
+            return run_job(claim_next_job())
+
+    def test_failed_job_resumes_without_regenerating_finished_steps(self):
+        job = enqueue_course_generation(self.user, {
+            "prompt": "Python", "num_content_modules": 2, "num_lessons_per_module": 2, "num_test_modules": 1,
+        })
+        first = self.pipeline_mocks()
+        job = self.run_next_job(first)
+        self.assertEqual(job.status, GenerationJob.Status.FAILED)
+        saved = set(job.checkpoints.values_list("key", flat=True))
+        self.assertTrue({"outline", "plan:0", "plan:1", "lesson:0:0", "lesson:0:1", "lesson:1:0"} <= saved)
+        self.assertNotIn("lesson:1:1", saved)
+
+        response = self.client.post(f"/api/courses/generate/{job.pk}/resume/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "PENDING")
+
+        self.broken = set()
+        second = self.pipeline_mocks()
+        job = self.run_next_job(second)
+        self.assertEqual(job.status, GenerationJob.Status.SUCCEEDED)
+        self.assertEqual(second["generate_course_outline"].call_count, 0)
+        self.assertEqual(second["generate_lesson_plan_for_module"].call_count, 0)
+        self.assertEqual([c.args[0] for c in second["generate_deep_lesson_content"].call_args_list], ["M2.L2"])
+        self.assertEqual(
+            list(Lesson.objects.filter(module__course=job.course).order_by("module__order", "order")
+                 .values_list("title", flat=True)),
+            ["M1.L1", "M1.L2", "M2.L1", "M2.L2"],
+        )
+        self.assertFalse(GenerationCheckpoint.objects.filter(job=job).exists())
+
+    def test_only_failed_jobs_can_be_resumed(self):
+        job = enqueue_course_generation(self.user, {"prompt": "Python"})
+        response = self.client.post(f"/api/courses/generate/{job.pk}/resume/")
+        self.assertEqual(response.status_code, 409)
+
+    def test_long_running_job_with_a_fresh_heartbeat_is_not_resumed(self):
+        enqueue_course_generation(self.user, {"prompt": "Python"})
+        job = claim_next_job()
+        long_ago = timezone.now() - timedelta(seconds=settings.GENERATION_JOB_STALE_AFTER * 3)
+        GenerationJob.objects.filter(pk=job.pk).update(started_at=long_ago, heartbeat_at=long_ago)
+
+        CheckpointStore(job.pk).save("outline", [{"title": "M1"}])
+        self.assertFalse(resume_job(job))
+        self.assertEqual(job.status, GenerationJob.Status.RUNNING)
+
+        GenerationJob.objects.filter(pk=job.pk).update(heartbeat_at=long_ago)
+        update_job_progress(job.pk, "lessons", 40)
+        self.assertFalse(resume_job(job))
+
+        GenerationJob.objects.filter(pk=job.pk).update(heartbeat_at=long_ago)
+        self.assertTrue(resume_job(job))
+        self.assertEqual(job.status, GenerationJob.Status.PENDING)
+
+
+class CourseGenerationStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="admin", password="pass")
+        Profile.objects.create(user=self.user, role="ADMIN")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_modules_are_streamed_and_saved_in_course_order(self):
+        quiz = {"quiz_title": "Test", "questions": [{"question_text": "Q?", "options": ["A", "B"], "correct_answer": "A"}]}
+        with mock.patch.multiple(
+            "core.pipeline",
+            generate_course_outline=lambda prompt, n: [{"title": f"M{i + 1}"} for i in range(n)],
+            generate_lesson_plan_for_module=lambda module, course, n: [{"title": f"{module}.L{j + 1}"} for j in range(n)],
+            search_youtube=lambda query, max_results=20: [],
+            generate_deep_lesson_content=lambda *args: {"text_content": "<p>x</p>", "video_id": None},
+            generate_quiz_from_content=lambda *args, **kwargs: quiz,
+        ):
+            response = self.client.post(
+                "/api/courses/generate/stream/",
+                {"prompt": "Python", "num_content_modules": 2, "num_lessons_per_module": 1, "num_test_modules": 1},
+                format="json",
+                HTTP_ACCEPT="text/event-stream",
+            )
+            body = b"".join(response.streaming_content).decode()
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = [line[len("event: "):] for line in body.splitlines() if line.startswith("event: ")]
+        self.assertEqual(events[1], "outline")
+        self.assertEqual(events.count("module"), 2)
+        self.assertEqual(events[-1], "complete")
+
+        course = Course.objects.get(title="Python")
+        self.assertEqual(
+            list(course.modules.order_by("order").values_list("order", "module_type")),
+            [(1, "CONTENT"), (2, "CONTENT"), (3, "ASSESSMENT"), (4, "ASSESSMENT")],
+        )
+
+    def _stream(self, **fakes):
+        defaults = dict(
+            generate_course_outline=lambda prompt, n: [{"title": f"M{i + 1}"} for i in range(n)],
+            generate_lesson_plan_for_module=lambda module, course, n: [{"title": f"{module}.L{j + 1}"} for j in range(n)],
+            search_youtube=lambda query, max_results=20: [],
+            generate_deep_lesson_content=lambda *args: {"text_content": "<p>x</p>", "video_id": None},
+            generate_quiz_from_content=lambda *args, **kwargs: {
+                "quiz_title": "Test", "questions": [{"question_text": "Q?", "options": ["A", "B"], "correct_answer": "A"}],
+            },
+        )
+        return mock.patch.multiple("core.pipeline", **{**defaults, **fakes})
+
+    def _post(self, modules, tests):
+        return self.client.post(
+            "/api/courses/generate/stream/",
+            {"prompt": "Python", "num_content_modules": modules, "num_lessons_per_module": 1, "num_test_modules": tests},
+            format="json",
+            HTTP_ACCEPT="text/event-stream",
+        )
+
+    def test_a_skipped_quiz_leaves_no_gap_in_module_order(self):
+        # M1 ends up empty, so the test covering it is skipped.
+        def plan(module, course, n):
+            return [] if module == "M1" else [{"title": f"{module}.L1"}]
+
+        with self._stream(generate_lesson_plan_for_module=plan):
+            response = self._post(modules=3, tests=2)
+            b"".join(response.streaming_content)
+
+        course = Course.objects.get(title="Python")
+        self.assertEqual(
+            list(course.modules.order_by("order").values_list("order", "title")),
+            [(1, "M1"), (2, "M2"), (3, "Test"), (4, "M3"), (5, "Test")],
+        )
+
+    def test_disconnecting_stops_the_pipeline(self):
+        plan_started, disconnected = threading.Event(), threading.Event()
+        lessons_written = []
+
+        def plan(module, course, n):
+            plan_started.set()
+            disconnected.wait(5)
+            return [{"title": f"{module}.L1"}]
+
+        def write(*args):
+            lessons_written.append(args[0])
+            return {"text_content": "<p>x</p>", "video_id": None}
+
+        with self._stream(generate_lesson_plan_for_module=plan, generate_deep_lesson_content=write):
+            response = self._post(modules=2, tests=0)
+            stream = iter(response.streaming_content)
+            while b"event: outline" not in next(stream):
+                pass
+            self.assertTrue(plan_started.wait(5))
+            response.close()
+            disconnected.set()
+            for thread in threading.enumerate():
+                if thread.name == "ai-stream":
+                    thread.join(5)
+
+        self.assertEqual(lessons_written, [])
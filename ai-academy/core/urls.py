@@ -6,6 +6,9 @@ from rest_framework_simplejwt.views import (
 from .views import (
     RegisterView,
     CourseGenerateAPIView,
+    CourseGenerateStreamAPIView,
+    GenerationJobDetailAPIView,
+    GenerationJobResumeAPIView,
     CourseListAPIView,
     CourseDetailAPIView,
     generate_single_module,
@@ -17,7 +20,13 @@ from .views import (
     QuizCreateAPIView,
     QuizDetailAPIView,
     QuestionCreateAPIView,
-    QuestionDetailAPIView
+    QuestionDetailAPIView,
+    QuizSubmitAPIView,
+    QuizBulkSubmitAPIView,
+    LessonProgressAPIView,
+    LessonCompleteAPIView,
+    CourseProgressAPIView,
+    SearchAPIView,
 )
 
 urlpatterns = [
@@ -28,8 +37,12 @@ urlpatterns = [
     
     # --- Course URLs ---
     path('courses/generate/', CourseGenerateAPIView.as_view(), name='course-generate'),
+    path('courses/generate/stream/', CourseGenerateStreamAPIView.as_view(), name='course-generate-stream'),
+    path('courses/generate/<int:job_id>/', GenerationJobDetailAPIView.as_view(), name='generation-job-detail'),
+    path('courses/generate/<int:job_id>/resume/', GenerationJobResumeAPIView.as_view(), name='generation-job-resume'),
     path('courses/', CourseListAPIView.as_view(), name='course-list'),
     path('courses/<int:pk>/', CourseDetailAPIView.as_view(), name='course-detail'),
+    path('courses/<int:pk>/progress/', CourseProgressAPIView.as_view(), name='course-progress'),
     
     # --- AI URL ---
     path('courses/<int:course_pk>/generate-module/', generate_single_module, name='generate-single-module'),
@@ -41,12 +54,19 @@ urlpatterns = [
     # --- LESSON CRUD URLS ---
     path('lessons/', LessonCreateAPIView.as_view(), name='lesson-create'),
     path('lessons/<int:pk>/', LessonDetailAPIView.as_view(), name='lesson-detail'),
+    path('lessons/<int:pk>/progress/', LessonProgressAPIView.as_view(), name='lesson-progress'),
+    path('lessons/<int:pk>/complete/', LessonCompleteAPIView.as_view(), name='lesson-complete'),
 
     # --- QUIZ CRUD URLS ---
     path('quizzes/', QuizCreateAPIView.as_view(), name='quiz-create'),
     path('quizzes/<int:pk>/', QuizDetailAPIView.as_view(), name='quiz-detail'),
+    path('quizzes/<int:pk>/submit/', QuizSubmitAPIView.as_view(), name='quiz-submit'),
+    path('quizzes/<int:pk>/submit/bulk/', QuizBulkSubmitAPIView.as_view(), name='quiz-submit-bulk'),
 
     # --- QUESTION CRUD URLS ---
     path('questions/', QuestionCreateAPIView.as_view(), name='question-create'),
     path('questions/<int:pk>/', QuestionDetailAPIView.as_view(), name='question-detail'),
+
+    # --- SEARCH URL ---
+    path('search/', SearchAPIView.as_view(), name='search'),
 ]
\ No newline at end of file